@@ -0,0 +1,196 @@
+# app/core/invalidation_bus.py
+"""
+Cross-worker invalidation bus for the in-process caches.
+
+With `uvicorn --workers N` every worker holds its own response cache, rating
+summaries, SWR aggregates... A write only reaches the caches of the worker that
+served it, so the caches publish every invalidation on this bus (after the
+commit, where they are already invalidated locally) and every other worker
+applies it as soon as it is delivered.
+
+Caches subscribe a handler per channel that invalidates *locally only*:
+
+    invalidation_bus.subscribe("response_cache.invalidate", self._invalidate_local)
+    ...
+    def invalidate(self, *tags):
+        self._invalidate_local(*tags)
+        invalidation_bus.publish("response_cache.invalidate", *tags)
+
+Transports are pluggable (publish / start / stop):
+- LocalTransport: single process, publishing is a no-op (default)
+- SQLiteLogTransport: workers on one host share a small SQLite change log;
+  each worker polls it (a primary-key range scan, every few milliseconds)
+
+A publish that fails is logged and dropped: the caches' TTLs bound the staleness.
+
+Settings (environment):
+    INVALIDATION_BUS: "local" (default) or "sqlite"
+    INVALIDATION_BUS_PATH: Change log file for "sqlite" (default backend/invalidation_bus.db)
+    INVALIDATION_BUS_POLL_SECONDS: Poll interval for "sqlite" (default 0.01)
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Sequence
+
+from app.core.metrics import record_bus_message
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "invalidation_bus.db"
+)
+
+Deliver = Callable[[str, Sequence[str]], None]
+
+
+class LocalTransport:
+    """Single process: there is nobody to tell."""
+
+    def publish(self, channel: str, keys: Sequence[str]) -> None:
+        pass
+
+    def start(self, deliver: Deliver) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class SQLiteLogTransport:
+    """
+    Change log in a SQLite file shared by the workers of one host (WAL mode, so the
+    pollers never block the publishers). Rows older than `retention_seconds` are pruned.
+
+    Args:
+        path: Log file
+        poll_interval: Seconds between two polls
+        retention_seconds: How long a message is kept (only workers that are up read it)
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.01, retention_seconds: float = 60.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread (publishers are request threads, the poller has its own)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS invalidations ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, channel TEXT NOT NULL, "
+                "keys TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def publish(self, channel: str, keys: Sequence[str]) -> None:
+        self._connection().execute(
+            "INSERT INTO invalidations (origin, channel, keys, created_at) VALUES (?, ?, ?, ?)",
+            (self.origin, channel, json.dumps(list(keys)), time.time()),
+        )
+
+    def start(self, deliver: Deliver) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        # Only messages published from now on: older ones predate this worker's caches
+        last_id = self._connection().execute("SELECT coalesce(max(id), 0) FROM invalidations").fetchone()[0]
+        self._thread = threading.Thread(
+            target=self._run, args=(deliver, last_id), name="invalidation-bus", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, deliver: Deliver, last_id: int) -> None:
+        conn = self._connection()
+        last_prune = time.monotonic()
+        while not self._stopping.wait(self.poll_interval):
+            try:
+                rows = conn.execute(
+                    "SELECT id, origin, channel, keys FROM invalidations WHERE id > ? ORDER BY id",
+                    (last_id,),
+                ).fetchall()
+                for message_id, origin, channel, keys in rows:
+                    last_id = message_id
+                    if origin != self.origin:
+                        deliver(channel, json.loads(keys))
+                if time.monotonic() - last_prune >= self.retention_seconds:
+                    conn.execute("DELETE FROM invalidations WHERE created_at < ?", (time.time() - self.retention_seconds,))
+                    last_prune = time.monotonic()
+            except Exception:
+                logger.exception("Invalidation bus poll failed")
+
+
+class InvalidationBus:
+    """
+    Channel -> local handler registry on top of a transport.
+
+    Args:
+        transport: LocalTransport, SQLiteLogTransport or anything with publish/start/stop
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self._handlers: Dict[str, Callable[..., None]] = {}
+
+    def subscribe(self, channel: str, handler: Callable[..., None]) -> None:
+        """Apply `handler(*keys)` when another worker publishes on `channel` (replaces any previous handler)."""
+        self._handlers[channel] = handler
+
+    def publish(self, channel: str, *keys: str) -> None:
+        """Tell the other workers (call after the local invalidation, once the write is committed)."""
+        try:
+            self.transport.publish(channel, keys)
+        except Exception:
+            logger.exception("Could not publish invalidation %s %s", channel, keys)
+            return
+        record_bus_message("published")
+
+    def start(self) -> None:
+        self.transport.start(self._deliver)
+
+    def stop(self) -> None:
+        self.transport.stop()
+
+    def _deliver(self, channel: str, keys: Sequence[str]) -> None:
+        record_bus_message("received")
+        handler = self._handlers.get(channel)
+        if handler is None:
+            return
+        try:
+            handler(*keys)
+        except Exception:
+            logger.exception("Invalidation handler for %s failed", channel)
+
+
+def create_transport():
+    kind = os.getenv("INVALIDATION_BUS", "local")
+    if kind == "local":
+        return LocalTransport()
+    if kind == "sqlite":
+        return SQLiteLogTransport(
+            path=os.getenv("INVALIDATION_BUS_PATH", DEFAULT_LOG_PATH),
+            poll_interval=float(os.getenv("INVALIDATION_BUS_POLL_SECONDS", "0.01")),
+        )
+    raise ValueError(f"Unknown INVALIDATION_BUS: {kind!r} (expected 'local' or 'sqlite')")
+
+
+invalidation_bus = InvalidationBus(create_transport())
@@ -0,0 +1,193 @@
+# app/core/metrics.py
+"""
+Prometheus metrics.
+
+Recording is a couple of in-memory (or, with several workers, mmap-backed)
+counter updates per request. To aggregate across uvicorn/gunicorn workers, set
+PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the workers (wiped at
+deploy); /metrics then merges every worker's files.
+"""
+import os
+import time
+
+from anyio import to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+RATE_LIMITED = Counter(
+    "http_rate_limited_total",
+    "Requests rejected by the rate limiter",
+    ["route"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "In-process cache lookups (hit ratio = hit / (hit + miss))",
+    ["cache", "result"],
+)
+SWR_REFRESHES = Counter(
+    "swr_cache_refreshes_total",
+    "Background recomputes of stale-while-revalidate cache entries",
+    ["cache", "outcome"],
+)
+BUS_MESSAGES = Counter(
+    "invalidation_bus_messages_total",
+    "Cache invalidations published to / received from other workers",
+    ["direction"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Database connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections opened above the pool size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+THREADPOOL_IN_USE = Gauge(
+    "threadpool_busy_threads",
+    "Worker threads busy running sync endpoints",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_SIZE = Gauge(
+    "threadpool_max_threads",
+    "Worker thread limit for sync endpoints",
+    multiprocess_mode="livesum",
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_cache_result(cache: str, result: str) -> None:
+    """Count a cache lookup with a finer result than hit/miss (e.g. "stale")."""
+    CACHE_REQUESTS.labels(cache, result).inc()
+
+
+def record_swr_refresh(cache: str, ok: bool) -> None:
+    SWR_REFRESHES.labels(cache, "ok" if ok else "error").inc()
+
+
+def record_bus_message(direction: str) -> None:
+    BUS_MESSAGES.labels(direction).inc()
+
+
+def record_rate_limited(route: str) -> None:
+    RATE_LIMITED.labels(route).inc()
+
+
+def route_template(scope) -> str:
+    """Matched route path ("/reviews/{id}"), so label cardinality stays bounded."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _update_threadpool_gauges() -> None:
+    limiter = to_thread.current_default_thread_limiter()
+    THREADPOOL_IN_USE.set(limiter.borrowed_tokens)
+    THREADPOOL_SIZE.set(limiter.total_tokens)
+
+
+def install_pool_metrics(engine: Engine, name: str) -> None:
+    """
+    Track pool checkouts/overflow through pool events.
+
+    Args:
+        engine: Engine whose pool is tracked
+        name: Value of the "pool" label (one per engine, e.g. "primary", "replica1")
+    """
+    pool = engine.pool
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+    overflow_gauge = DB_POOL_OVERFLOW.labels(name)
+
+    def _update_overflow():
+        overflow = getattr(pool, "overflow", None)
+        if overflow is not None:
+            overflow_gauge.set(max(overflow(), 0))
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, connection_record, connection_proxy):
+        checked_out.inc()
+        _update_overflow()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, connection_record):
+        checked_out.dec()
+        _update_overflow()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposition payload and content type (merged across workers in multiprocess mode)."""
+    _update_threadpool_gauges()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    from prometheus_client import REGISTRY
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges from the shared directory (call at shutdown)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and in-flight requests per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        _update_threadpool_gauges()
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            REQUEST_DURATION.labels(method, route_template(scope), str(status_code)).observe(
+                time.perf_counter() - started
+            )
@@ -0,0 +1,256 @@
+# app/core/profiler.py
+"""
+Opt-in request profiler for admins.
+
+A request from an admin carrying "X-Profile: 1" runs its endpoint function under
+cProfile. The report (hottest functions by cumulative time, plus the SQL
+statements the request issued) is stored on disk and its ID returned in the
+X-Profile-Id response header; admins read reports through /profiles.
+
+Requests without the header are passed straight through: the only per-request
+cost is the header lookup and one ContextVar read in the endpoint wrapper.
+
+One request per worker process is profiled at a time: cProfile hooks are
+process-wide (Python 3.12+ refuses to enable a second profiler), so a profiling
+request arriving while another one runs gets 409 instead. Even then, the profile
+of an async endpoint covers the event loop while the endpoint awaits: coroutines
+of other, unprofiled requests that run in between show up in the report too.
+Profile on an idle worker (or with sync endpoints) for clean numbers.
+
+Settings (environment):
+    PROFILE_DIR: Where reports are stored (default backend/profiles)
+    PROFILE_MAX_REPORTS: Reports kept; oldest are deleted first (default 50)
+    PROFILE_TOP_FUNCTIONS: Functions listed per report (default 40)
+"""
+import cProfile
+import functools
+import glob
+import inspect
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from anyio import to_thread
+from fastapi import status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from app.core.sql_instrumentation import current_sql_stats
+
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "profiles"),
+)
+MAX_REPORTS = int(os.getenv("PROFILE_MAX_REPORTS", "50"))
+TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+
+_active_profile: ContextVar[cProfile.Profile | None] = ContextVar("active_profile", default=None)
+# Held while a request is profiled: one profile per process at a time
+_profiling_lock = threading.Lock()
+
+
+class ProfileStore:
+    """
+    Reports as JSON files in one directory, capped at `max_reports` (oldest rotated out).
+
+    Args:
+        directory: Storage directory (created on first save)
+        max_reports: Maximum number of reports kept
+    """
+
+    def __init__(self, directory: str, max_reports: int):
+        self.directory = directory
+        self.max_reports = max_reports
+
+    def save(self, report: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # Timestamp prefix keeps lexical order == creation order for rotation
+        name = f"{time.time_ns()}-{report['id']}.json"
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, ensure_ascii=False)
+        self._rotate()
+
+    def get(self, report_id: str) -> Dict[str, Any] | None:
+        if not report_id.isalnum():
+            return None
+        matches = glob.glob(os.path.join(self.directory, f"*-{report_id}.json"))
+        if not matches:
+            return None
+        with open(matches[0], "r", encoding="utf-8") as report_file:
+            return json.load(report_file)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of stored reports, newest first."""
+        summaries = []
+        for path in reversed(self._files()):
+            try:
+                with open(path, "r", encoding="utf-8") as report_file:
+                    report = json.load(report_file)
+            except (OSError, json.JSONDecodeError):
+                continue  # Rotated out concurrently
+            summaries.append({key: report.get(key) for key in ("id", "method", "path", "status", "duration_ms", "created_at")})
+        return summaries
+
+    def _files(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "*.json")))
+
+    def _rotate(self) -> None:
+        files = self._files()
+        for path in files[:max(len(files) - self.max_reports, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+profile_store = ProfileStore(PROFILE_DIR, MAX_REPORTS)
+
+
+def _profiled(call):
+    """
+    Wrap an endpoint function so it runs under the request's profiler, if any.
+    For async endpoints the profiler stays enabled across awaits (see module docstring).
+    """
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            profile = _active_profile.get()
+            if profile is None:
+                return await call(*args, **kwargs)
+            profile.enable()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                profile.disable()
+        return async_wrapper
+
+    @functools.wraps(call)
+    def sync_wrapper(*args, **kwargs):
+        # Sync endpoints run in a worker thread; cProfile must be enabled in that thread
+        profile = _active_profile.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        profile.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile.disable()
+    return sync_wrapper
+
+
+def install_endpoint_profiling(app) -> None:
+    """Wrap every API route's endpoint (call after all routers are included)."""
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route.dependant.call, "__profiled__", False):
+            route.dependant.call = _profiled(route.dependant.call)
+            route.dependant.call.__profiled__ = True
+
+
+def _is_admin(authorization: str | None) -> bool:
+    """Whether the bearer token belongs to a (still existing) admin."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return False
+    from app.database import SessionLocal
+    from app.models.user_model import User
+    from app.utils.jwt_handler import decode_token
+    try:
+        user_id = int(decode_token(authorization[7:]).get("sub"))
+    except Exception:
+        return False
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        return user is not None and user.type == "admin"
+    finally:
+        db.close()
+
+
+def _function_stats(profile: cProfile.Profile) -> List[Dict[str, Any]]:
+    try:
+        stats = pstats.Stats(profile)
+    except TypeError:
+        return []  # The endpoint never ran (e.g. 404 or failed validation)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, callers) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({function})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+            "callers": [f"{c[0]}:{c[1]}({c[2]})" for c in list(callers)[:5]],
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware enabling the profiler for admin requests with X-Profile: 1."""
+
+    def __init__(self, app, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if not any(name == b"x-profile" and value == b"1" for name, value in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        if not await to_thread.run_sync(_is_admin, authorization):
+            await self.app(scope, receive, send)
+            return
+        if not _profiling_lock.acquire(blocking=False):
+            response = JSONResponse(
+                status_code=status.HTTP_409_CONFLICT,
+                content={"detail": "Another request is being profiled by this worker, retry later"},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _profiling_lock.release()
+
+    async def _profile(self, scope, receive, send):
+        report_id = uuid.uuid4().hex
+        profile = cProfile.Profile()
+        token = _active_profile.set(profile)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", report_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active_profile.reset(token)
+            sql_stats = current_sql_stats()
+            report = {
+                "id": report_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "sql": {
+                    "count": sql_stats.count,
+                    "total_ms": round(sql_stats.total_ms, 1),
+                    "statements": sql_stats.statements(),
+                } if sql_stats else None,
+                "functions": _function_stats(profile),
+            }
+            await to_thread.run_sync(self.store.save, report)
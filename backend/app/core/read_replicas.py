@@ -0,0 +1,251 @@
+# app/core/read_replicas.py
+"""
+Read-replica routing for PostgreSQL deployments.
+
+With DATABASE_READ_URLS (comma-separated) set, read sessions (GET/HEAD requests
+and read-only services) send SELECTs to replicas chosen round-robin among the
+healthy ones; everything else stays on the primary:
+
+- writes (flushes, INSERT/UPDATE/DELETE statements) always go to the primary
+- once a request has written, its later reads go to the primary too
+- after a write, the client gets a short-lived cookie; its reads stay on the
+  primary until the replicas have caught up (max(REPLICA_STICKY_SECONDS, current
+  replication lag)), so a user sees their own edits immediately
+- data about to be stored in a shared cache is read from the primary
+  (read_from_primary()): a replica could hand back pre-write rows that every
+  client would then be served until the entry expires
+
+A background thread checks every replica each REPLICA_CHECK_INTERVAL seconds;
+unreachable replicas, or replicas lagging more than REPLICA_MAX_LAG_SECONDS, are
+skipped until they recover. With no healthy replica, reads use the primary.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from http.cookies import SimpleCookie
+from typing import List
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+LAST_WRITE_COOKIE = "db_last_write"
+
+_WRITE_VERBS = ("INSERT", "UPDATE", "DELETE")
+
+
+class Replica:
+    """One replica: its sync engine, optional async engine, health and last measured lag."""
+
+    def __init__(self, engine: Engine, async_engine=None):
+        self.engine = engine
+        self.async_engine = async_engine
+        self.healthy = True
+        self.lag_seconds = 0.0
+
+    def check(self) -> None:
+        try:
+            with self.engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    # Caught up (everything received is replayed): no lag, however long ago the
+                    # last transaction was; the replay timestamp alone keeps growing on an idle primary
+                    lag = conn.execute(text(
+                        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                    )).scalar()
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag = 0
+            self.lag_seconds = float(lag or 0)
+            self.healthy = self.lag_seconds <= MAX_LAG_SECONDS
+        except Exception as e:
+            logger.warning("Replica %s failed its health check: %s", self.engine.url.render_as_string(), e)
+            self.healthy = False
+
+
+class ReplicaSet:
+    """Round-robin over healthy replicas, with a background health checker."""
+
+    def __init__(self, replicas: List[Replica], check_interval: float = CHECK_INTERVAL):
+        self.replicas = replicas
+        self.check_interval = check_interval
+        self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        self._lock = threading.Lock()
+        self._checker: threading.Thread | None = None
+        for replica in replicas:
+            # A dropped connection takes the replica out of rotation until the next check
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+
+    @staticmethod
+    def _on_error(replica: Replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                replica.healthy = False
+        return handle_error
+
+    def choose(self) -> Replica | None:
+        """Next healthy replica, or None (use the primary)."""
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[next(self._cycle)]
+                if replica.healthy:
+                    return replica
+        return None
+
+    def max_lag(self) -> float:
+        return max((r.lag_seconds for r in self.replicas if r.healthy), default=0.0)
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            replica.check()
+
+    def start_checker(self) -> None:
+        """Start the background health checker (once)."""
+        if self._checker is not None or not self.replicas:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._run_checks, name="replica-health", daemon=True)
+                self._checker.start()
+
+    def _run_checks(self) -> None:
+        while True:
+            self.check_all()
+            time.sleep(self.check_interval)
+
+
+class RoutingState:
+    """Per-request routing flags shared by every session of the request."""
+
+    def __init__(self, force_primary: bool = False):
+        self.force_primary = force_primary
+        self.wrote = False
+        self.read_replica = False  # Some read of this request was served by a replica
+
+
+_routing_state: ContextVar[RoutingState | None] = ContextVar("db_routing_state", default=None)
+
+
+def current_routing_state() -> RoutingState | None:
+    return _routing_state.get()
+
+
+def mark_primary_write() -> None:
+    """Flag the current request as having written, for writes committed outside its sessions (write executor)."""
+    state = _routing_state.get()
+    if state is not None:
+        state.wrote = True
+
+
+def read_from_primary() -> None:
+    """Send the current request's remaining reads to the primary (e.g. before building a cached response)."""
+    state = _routing_state.get()
+    if state is not None:
+        state.force_primary = True
+
+
+def read_from_replica() -> bool:
+    """Whether a read of the current request was served by a replica (its data may predate recent writes)."""
+    state = _routing_state.get()
+    return state is not None and state.read_replica
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica when allowed (see module docstring).
+
+    Args:
+        primary: Primary engine
+        replica_set: Replicas to read from
+        use_async_engines: Bind to the replicas' async engines (as sync_session_class of an AsyncSession)
+    """
+
+    def __init__(self, *args, primary: Engine, replica_set: ReplicaSet, use_async_engines: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replica_set = replica_set
+        self.use_async_engines = use_async_engines
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        state = _routing_state.get()
+        if self._flushing or not isinstance(clause, Select):
+            return self.primary
+        if state is not None and (state.force_primary or state.wrote):
+            return self.primary
+        replica = self.replica_set.choose()
+        if replica is None:
+            return self.primary
+        if state is not None:
+            state.read_replica = True
+        return replica.async_engine.sync_engine if self.use_async_engines else replica.engine
+
+
+def track_primary_writes(primary: Engine) -> None:
+    """Flag the current request as having written when DML runs on the primary."""
+    @event.listens_for(primary, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in _WRITE_VERBS:
+            state = _routing_state.get()
+            if state is not None:
+                state.wrote = True
+
+
+def _last_write_from_cookie(headers) -> float | None:
+    for name, value in headers:
+        if name == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get(LAST_WRITE_COOKIE)
+            if morsel is not None:
+                try:
+                    return float(morsel.value)
+                except ValueError:
+                    return None
+    return None
+
+
+def must_read_primary(last_write: float | None, replica_set: ReplicaSet, now: float | None = None) -> bool:
+    """Whether a client that wrote at `last_write` could still miss its write on a replica."""
+    if last_write is None:
+        return False
+    window = max(STICKY_SECONDS, replica_set.max_lag())
+    return (now or time.time()) - last_write < window
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware: sets up the request's RoutingState from the last-write
+    cookie, and refreshes the cookie on responses to requests that wrote.
+    """
+
+    def __init__(self, app, replica_set: ReplicaSet):
+        self.app = app
+        self.replica_set = replica_set
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        last_write = _last_write_from_cookie(scope["headers"])
+        state = RoutingState(force_primary=must_read_primary(last_write, self.replica_set))
+        token = _routing_state.set(state)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and state.wrote:
+                window = int(max(STICKY_SECONDS, self.replica_set.max_lag())) + 1
+                cookie = f"{LAST_WRITE_COOKIE}={time.time():.3f}; Max-Age={window}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _routing_state.reset(token)
@@ -0,0 +1,200 @@
+# app/core/response_cache.py
+"""
+Response cache for public GET endpoints.
+
+Rendered JSON bodies are kept in memory, keyed by path plus normalized query
+string (sorted, empty values dropped), with a strong ETag per body. A hit costs
+a dictionary lookup: no database queries, no Pydantic serialization. Clients get
+"Cache-Control: public, max-age, stale-while-revalidate" and 304 answers to
+If-None-Match.
+
+Entries are tagged (e.g. "supplier:7", "categories") and write endpoints
+invalidate the tags they affect; invalidations reach the other workers through
+the invalidation bus. RESPONSE_CACHE_TTL_SECONDS bounds how long an entry can
+live if a hook is ever missed.
+
+With read replicas, a miss sends the rest of the request's reads to the primary,
+and a body built from replica reads is returned but not stored: a lagging
+replica would otherwise refill the cache with pre-write data right after an
+invalidation, for every client, until the TTL.
+
+Usage in an endpoint:
+
+    cached = response_cache.get(request)
+    if cached is not None:
+        return cached
+    ...build payload...
+    return response_cache.put(request, payload, tags=[f"supplier:{id}"])
+
+Settings (environment):
+    RESPONSE_CACHE_MAX_ENTRIES: Entries kept, least recently used evicted first (default 2048)
+    RESPONSE_CACHE_TTL_SECONDS: Server-side lifetime of an entry (default 300)
+    RESPONSE_CACHE_MAX_AGE: Cache-Control max-age sent to clients (default 10)
+    RESPONSE_CACHE_STALE_WHILE_REVALIDATE: Cache-Control stale-while-revalidate (default 60)
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Set
+from urllib.parse import urlencode
+
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.invalidation_bus import invalidation_bus
+from app.core.metrics import record_cache
+from app.core.read_replicas import read_from_primary, read_from_replica
+
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "10"))
+STALE_WHILE_REVALIDATE = int(os.getenv("RESPONSE_CACHE_STALE_WHILE_REVALIDATE", "60"))
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "tags", "stored_at")
+
+    def __init__(self, body: bytes, tags: Set[str]):
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.tags = tags
+        self.stored_at = time.monotonic()
+
+
+class ResponseCache:
+    """
+    Args:
+        name: Label in the metrics, and invalidation bus channel prefix
+        max_entries: Maximum number of cached bodies (LRU eviction)
+        ttl: Seconds an entry is served before being rebuilt
+        max_age: Cache-Control max-age for clients and shared caches
+        stale_while_revalidate: Cache-Control stale-while-revalidate
+    """
+
+    def __init__(
+        self,
+        name: str = "response",
+        max_entries: int = MAX_ENTRIES,
+        ttl: float = TTL_SECONDS,
+        max_age: int = MAX_AGE,
+        stale_while_revalidate: int = STALE_WHILE_REVALIDATE,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_control = f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[str]] = {}
+        # Bumped on every invalidation: a body built before it must not be stored after it
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+        # Invalidations published by other workers
+        invalidation_bus.subscribe(f"{name}.invalidate", self._invalidate_local)
+        invalidation_bus.subscribe(f"{name}.clear", self._clear_local)
+
+    @staticmethod
+    def key(request: Request) -> str:
+        params = sorted((name, value) for name, value in request.query_params.multi_items() if value != "")
+        return f"{request.url.path}?{urlencode(params)}"
+
+    def get(self, request: Request) -> Response | None:
+        """The cached response for this request (200, or 304 on a matching If-None-Match), or None."""
+        key = self.key(request)
+        with self._lock:
+            request.state.response_cache_generation = self._generation
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.stored_at >= self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_cache(self.name, entry is not None)
+        if entry is None:
+            read_from_primary()  # The body about to be built will be stored
+            return None
+        return self._respond(request, entry)
+
+    def put(self, request: Request, payload: Any, tags: Iterable[str] = ()) -> Response:
+        """Render `payload` as JSON, cache it under this request's key and return the response."""
+        entry = CachedResponse(JSONResponse(content=jsonable_encoder(payload)).body, set(tags))
+        key = self.key(request)
+        with self._lock:
+            stored_generation = getattr(request.state, "response_cache_generation", None)
+            if stored_generation == self._generation and not read_from_replica():
+                self._remove(key)
+                self._entries[key] = entry
+                for tag in entry.tags:
+                    self._keys_by_tag.setdefault(tag, set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    self._remove(next(iter(self._entries)))
+        return self._respond(request, entry)
+
+    def on_invalidate(self, callback: Callable[[], None]) -> None:
+        """Call `callback` after every invalidation (e.g. to drop results computed before the write)."""
+        self._listeners.append(callback)
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying any of `tags`, in every worker."""
+        self._invalidate_local(*tags)
+        invalidation_bus.publish(f"{self.name}.invalidate", *tags)
+
+    def clear(self) -> None:
+        self._clear_local()
+        invalidation_bus.publish(f"{self.name}.clear")
+
+    def _invalidate_local(self, *tags: str) -> None:
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, set()):
+                    self._remove(key)
+        self._notify()
+
+    def _clear_local(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+        self._notify()
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            callback()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        # Called with self._lock held
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def _respond(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": self.cache_control}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,83 @@
+# app/core/single_flight.py
+"""
+Single-flight request coalescing for async endpoints.
+
+Concurrent callers asking for the same key share one in-flight computation
+instead of each running it: during a stampede the database sees one query per
+distinct key, not one per user. The result is also kept for a short grace
+window after completion, so requests arriving right behind the leader reuse it.
+
+The computation runs as its own task (with its own database session), so a
+client disconnecting, and cancelling its request, never cancels the work other
+callers are waiting on. Exceptions are shared too, but never kept for the grace
+window: the next caller after a failure tries again.
+
+Settings (environment):
+    SINGLE_FLIGHT_GRACE_SECONDS: How long a finished result is reused (default 0.5)
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.core.metrics import record_cache
+
+GRACE_SECONDS = float(os.getenv("SINGLE_FLIGHT_GRACE_SECONDS", "0.5"))
+
+
+class SingleFlight:
+    """
+    Args:
+        name: Label for the cache metrics ("hit" = request served by another caller's computation)
+        grace_seconds: How long a finished result is reused
+    """
+
+    def __init__(self, name: str, grace_seconds: float = GRACE_SECONDS):
+        self.name = name
+        self.grace_seconds = grace_seconds
+        # key -> (task, finished_at or None while running)
+        self._flights: Dict[Hashable, Tuple[asyncio.Task, float | None]] = {}
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return compute()'s result, sharing it with concurrent callers of the same key."""
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is not None:
+            task, finished_at = flight
+            expired = finished_at is not None and time.monotonic() - finished_at >= self.grace_seconds
+            if task.get_loop() is not loop or expired:
+                flight = None
+        record_cache(self.name, flight is not None)
+
+        if flight is None:
+            task = loop.create_task(compute())
+            self._flights[key] = (task, None)
+            task.add_done_callback(lambda done, key=key: self._finished(key, done))
+        # shield: a cancelled caller must not cancel the shared computation
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        current = self._flights.get(key)
+        if current is None or current[0] is not task:
+            return  # Cleared meanwhile
+        if task.cancelled() or task.exception() is not None or self.grace_seconds <= 0:
+            del self._flights[key]
+            return
+        self._flights[key] = (task, time.monotonic())
+        # Drop the result once the grace window is over (keeps the table to in-flight/recent keys)
+        task.get_loop().call_later(self.grace_seconds, self._expire, key, task)
+
+    def _expire(self, key: Hashable, task: asyncio.Task) -> None:
+        current = self._flights.get(key)
+        if current is not None and current[0] is task:
+            del self._flights[key]
+
+    def clear(self) -> None:
+        """
+        Forget finished and in-flight computations: later callers start a new one.
+        Safe to call from any thread (e.g. a sync write endpoint after its commit).
+        """
+        self._flights = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
@@ -0,0 +1,210 @@
+# app/core/sql_instrumentation.py
+"""
+Per-request SQL instrumentation.
+
+Engine events attribute every statement to the request being served (through a
+ContextVar), and SQLInstrumentationMiddleware reports, per request:
+
+- a Server-Timing header: db;dur=<ms>;desc="<n> queries"
+- one structured log line (logger "app.sql") with the query count, DB time and
+  the statements repeated often enough to look like an N+1
+- EXPLAIN plans for a sample of slow queries
+
+Settings (environment):
+    SQL_SLOW_QUERY_MS: Slow query threshold in ms (default 200)
+    SQL_SLOW_QUERY_SAMPLE_RATE: Fraction of slow queries explained (default 1.0)
+    SQL_N_PLUS_ONE_THRESHOLD: Repetitions of a statement that flag an N+1 (default 5)
+"""
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.sql")
+
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SQL_SLOW_QUERY_SAMPLE_RATE", "1.0"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+|\$\d+))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so that executions differing only by parameters look the same."""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("(...)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+class RequestSQLStats:
+    """Statements executed while serving one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.fingerprints: Counter = Counter()
+        self.fingerprint_ms: Counter = Counter()
+        self.slow_queries: List[Dict[str, Any]] = []
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        key = fingerprint(statement)
+        self.fingerprints[key] += 1
+        self.fingerprint_ms[key] += elapsed_ms
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Dict[str, Any]]:
+        """Statements executed at least `threshold` times (likely N+1 patterns)."""
+        return [
+            {"fingerprint": fp, "count": count}
+            for fp, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+    def statements(self) -> List[Dict[str, Any]]:
+        """Every distinct statement with its execution count and total time, slowest first."""
+        return [
+            {"fingerprint": fp, "count": self.fingerprints[fp], "ms": round(ms, 1)}
+            for fp, ms in self.fingerprint_ms.most_common()
+        ]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} queries"'
+
+
+_current_stats: ContextVar[RequestSQLStats | None] = ContextVar("request_sql_stats", default=None)
+
+
+def current_sql_stats() -> RequestSQLStats | None:
+    """Stats of the request being served (None outside a request, e.g. background workers)."""
+    return _current_stats.get()
+
+
+def _explain(cursor, statement: str, parameters, dialect_name: str) -> List[str]:
+    # Raw DB-API cursor on the same connection: bypasses engine events, so nothing recurses
+    prefix = "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        return [" ".join(str(col) for col in row) for row in explain_cursor.fetchall()]
+    finally:
+        explain_cursor.close()
+
+
+_WRITE_VERBS = ("INSERT", "UPDATE", "DELETE")
+_last_write_at: float | None = None
+
+
+def last_write_at() -> float | None:
+    """time.time() of the last committed transaction that wrote something (this process only)."""
+    return _last_write_at
+
+
+def _on_commit(conn):
+    global _last_write_at
+    if conn.info.pop("has_writes", False):
+        _last_write_at = time.time()
+
+
+def _on_rollback(conn):
+    conn.info.pop("has_writes", None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+    if statement.lstrip()[:6].upper() in _WRITE_VERBS:
+        conn.info["has_writes"] = True
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.record(statement, elapsed_ms)
+
+    if (
+        elapsed_ms >= SLOW_QUERY_MS
+        and not executemany
+        and statement.lstrip()[:6].upper() == "SELECT"
+        and random.random() < SLOW_QUERY_SAMPLE_RATE
+    ):
+        try:
+            plan = _explain(cursor, statement, parameters, conn.dialect.name)
+        except Exception as e:
+            plan = [f"EXPLAIN failed: {e}"]
+        stats.slow_queries.append({"statement": fingerprint(statement), "ms": round(elapsed_ms, 1), "plan": plan})
+
+
+def install_sql_instrumentation(engine: Engine) -> None:
+    """Attach the timing hooks to an engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "commit", _on_commit)
+        event.listen(engine, "rollback", _on_rollback)
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Pure ASGI middleware: collects the SQL stats of each HTTP request, adds the
+    Server-Timing header and logs one structured line when the response starts.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+                _log_request(scope, message["status"], stats, (time.perf_counter() - started) * 1000)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+
+
+def _log_request(scope, status_code: int, stats: RequestSQLStats, elapsed_ms: float) -> None:
+    repeated = stats.repeated()
+    record = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status_code,
+        "duration_ms": round(elapsed_ms, 1),
+        "db_queries": stats.count,
+        "db_ms": round(stats.total_ms, 1),
+    }
+    if repeated:
+        record["n_plus_one"] = repeated
+    if stats.slow_queries:
+        record["slow_queries"] = stats.slow_queries
+    level = logging.WARNING if repeated or stats.slow_queries else logging.INFO
+    logger.log(level, json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,212 @@
+# app/core/swr_cache.py
+"""
+Stale-while-revalidate cache for expensive aggregates.
+
+Each entry has a soft and a hard TTL:
+- younger than soft_ttl: served as is
+- between soft_ttl and hard_ttl (or marked stale by a write): served immediately,
+  and exactly one background recompute is started for the key
+- older than hard_ttl, or missing: computed by the caller (first fill)
+
+So after the first fill users never wait for a recompute, as long as the key is
+read at least once per hard_ttl. Memory is bounded by max_entries (least recently
+used evicted first). Lookups are counted in cache_requests_total (hit, stale,
+miss) and recomputes in swr_cache_refreshes_total.
+
+Recomputes run outside the request that triggered them: `compute` must open
+its own database session. A value computed before a mark_stale()/invalidate()
+is still returned to its caller but never stored (the cache carries a
+generation, as the response cache does), so a recompute that was already
+running when a write happened cannot overwrite the write's invalidation. mark_stale()/invalidate() reach the other workers
+through the invalidation bus (where they apply to every key: keys need not be strings).
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Hashable, Set
+
+from app.core.invalidation_bus import invalidation_bus
+from app.core.metrics import record_cache_result, record_swr_refresh
+
+logger = logging.getLogger(__name__)
+
+# Background recomputes for sync callers; a couple of threads is plenty for a few aggregates
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="swr-refresh")
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "soft_ttl", "hard_ttl", "stale", "refreshing")
+
+    def __init__(self, value: Any, soft_ttl: float, hard_ttl: float):
+        self.value = value
+        self.stored_at = time.monotonic()
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.stale = False
+        self.refreshing = False
+
+
+class SWRCache:
+    """
+    Args:
+        name: Cache label in the metrics
+        soft_ttl: Default seconds before an entry is refreshed in the background
+        hard_ttl: Default seconds after which an entry is no longer served
+        max_entries: Maximum number of keys (LRU eviction)
+        on_refresh: Called with the key after a background recompute stored a new value
+    """
+
+    def __init__(
+        self,
+        name: str,
+        soft_ttl: float,
+        hard_ttl: float,
+        max_entries: int = 256,
+        on_refresh: Callable[[Hashable], None] | None = None,
+    ):
+        self.name = name
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.max_entries = max_entries
+        self.on_refresh = on_refresh
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fill_locks: dict = {}
+        self._generation = 0  # Bumped by every mark_stale/invalidate: older computations are not stored
+        self._tasks: Set[asyncio.Task] = set()
+        invalidation_bus.subscribe(f"{name}.mark_stale", lambda *keys: self._mark_stale_local(None))
+        invalidation_bus.subscribe(f"{name}.invalidate", lambda *keys: self._invalidate_local(None))
+
+    def get(self, key: Hashable, compute: Callable[[], Any], soft_ttl: float | None = None, hard_ttl: float | None = None) -> Any:
+        """Cached value for `key` (sync callers; a stale value is recomputed in a background thread)."""
+        generation = self._generation
+        found, value, refresh = self._lookup(key)
+        if refresh:
+            _refresh_executor.submit(self._refresh_sync, key, compute, soft_ttl, hard_ttl, generation)
+        if found:
+            return value
+
+        # First fill: concurrent callers of the same key wait for one computation
+        with self._lock:
+            fill_lock = self._fill_locks.setdefault(key, threading.Lock())
+        with fill_lock:
+            generation = self._generation
+            found, value, _ = self._lookup(key, count=False)
+            if not found:
+                value = compute()
+                self._store(key, value, soft_ttl, hard_ttl, generation)
+        with self._lock:
+            self._fill_locks.pop(key, None)
+        return value
+
+    async def get_async(
+        self, key: Hashable, compute: Callable[[], Awaitable[Any]], soft_ttl: float | None = None, hard_ttl: float | None = None
+    ) -> Any:
+        """Cached value for `key` (async callers; a stale value is recomputed in a background task)."""
+        generation = self._generation
+        found, value, refresh = self._lookup(key)
+        if refresh:
+            task = asyncio.get_running_loop().create_task(self._refresh_async(key, compute, soft_ttl, hard_ttl, generation))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if found:
+            return value
+        value = await compute()  # Coalescing concurrent first fills is up to `compute` (e.g. SingleFlight)
+        self._store(key, value, soft_ttl, hard_ttl, generation)
+        return value
+
+    def mark_stale(self, key: Hashable | None = None) -> None:
+        """Serve `key` (or every key) once more, then refresh it: for writes that change the aggregate."""
+        self._mark_stale_local(key)
+        invalidation_bus.publish(f"{self.name}.mark_stale")
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drop `key` (or every key): the next caller computes synchronously."""
+        self._invalidate_local(key)
+        invalidation_bus.publish(f"{self.name}.invalidate")
+
+    def _mark_stale_local(self, key: Hashable | None) -> None:
+        with self._lock:
+            self._generation += 1
+            entries = self._entries.values() if key is None else filter(None, [self._entries.get(key)])
+            for entry in entries:
+                entry.stale = True
+
+    def _invalidate_local(self, key: Hashable | None) -> None:
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable, count: bool = True):
+        """Returns (found, value, start_refresh)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry.stored_at if entry is not None else None
+            if entry is None or age >= entry.hard_ttl:
+                outcome, result = "miss", (False, None, False)
+            else:
+                self._entries.move_to_end(key)
+                is_stale = entry.stale or age >= entry.soft_ttl
+                refresh = is_stale and not entry.refreshing
+                if refresh:
+                    entry.refreshing = True
+                outcome, result = ("stale" if is_stale else "hit"), (True, entry.value, refresh)
+        if count:
+            record_cache_result(self.name, outcome)
+        return result
+
+    def _store(self, key: Hashable, value: Any, soft_ttl: float | None, hard_ttl: float | None, generation: int) -> bool:
+        """Store a value computed at `generation`; False (not stored) if an invalidation happened since."""
+        entry = _Entry(value, self.soft_ttl if soft_ttl is None else soft_ttl, self.hard_ttl if hard_ttl is None else hard_ttl)
+        with self._lock:
+            if generation != self._generation:
+                current = self._entries.get(key)
+                if current is not None:
+                    current.refreshing = False  # Still stale: the next read starts a fresh recompute
+                return False
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def _refresh_failed(self, key: Hashable, error: Exception) -> None:
+        logger.warning("Background refresh of %s[%r] failed: %s", self.name, key, error)
+        record_swr_refresh(self.name, False)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refreshing = False  # The next stale read tries again
+
+    def _refreshed(self, key: Hashable, value: Any, soft_ttl: float | None, hard_ttl: float | None, generation: int) -> None:
+        if not self._store(key, value, soft_ttl, hard_ttl, generation):
+            logger.debug("Dropped refresh of %s[%r]: invalidated while it ran", self.name, key)
+            return
+        record_swr_refresh(self.name, True)
+        if self.on_refresh is not None:
+            self.on_refresh(key)
+
+    def _refresh_sync(self, key, compute, soft_ttl, hard_ttl, generation) -> None:
+        try:
+            value = compute()
+        except Exception as e:
+            self._refresh_failed(key, e)
+            return
+        self._refreshed(key, value, soft_ttl, hard_ttl, generation)
+
+    async def _refresh_async(self, key, compute, soft_ttl, hard_ttl, generation) -> None:
+        try:
+            value = await compute()
+        except Exception as e:
+            self._refresh_failed(key, e)
+            return
+        self._refreshed(key, value, soft_ttl, hard_ttl, generation)
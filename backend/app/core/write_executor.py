@@ -0,0 +1,232 @@
+# app/core/write_executor.py
+"""
+Group-commit executor for the hottest write endpoints.
+
+Write units of work (callables taking a Session) are funnelled through one
+dedicated connection. Units arriving within a few milliseconds of each other
+run in the same transaction, each inside its own SAVEPOINT, and are committed
+together: one fsync for the whole group instead of one per request. Every
+caller still gets its own result, or its own exception, once the group is
+committed.
+
+Units run in the executor thread, so they must build their result (ids, dicts,
+Pydantic models) inside the unit; ORM objects must not escape it.
+
+Only units passed to run_write() go through the executor: review creation,
+media record creation on upload and contact form submissions (when the
+write-behind queue is off). Every other write (moderation, updates, deletes, the
+submission queue, CLI scripts, other worker processes) commits on its own
+connection, so the executor is *not* the database's only writer: on SQLite it
+takes the write lock like everybody else (BEGIN IMMEDIATE, waiting up to the
+busy timeout) and retries a group that fails with "database is locked". What it
+saves is transactions and fsyncs on the routed endpoints, not lock contention.
+
+Enabled with WRITE_EXECUTOR=1 (best combined with SQLITE_PROFILE=production).
+Without it, run_write() runs the unit on the request's session and commits, as before.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Tuple, TypeVar
+
+from anyio import to_thread
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.read_replicas import mark_primary_write
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteUnit = Callable[[Session], T]
+
+WRITE_EXECUTOR_ENABLED = os.getenv("WRITE_EXECUTOR", "0") == "1"
+
+
+class WriteExecutor:
+    """
+    Args:
+        session_factory: Sessions bound to the dedicated writer connection
+        max_batch: Maximum units per transaction
+        linger_seconds: How long to wait for more units after the first one arrives
+        commit_attempts: Retries of a group whose commit fails with OperationalError (database locked)
+    """
+
+    def __init__(self, session_factory: sessionmaker, max_batch: int = 64, linger_seconds: float = 0.002, commit_attempts: int = 3):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.linger_seconds = linger_seconds
+        self.commit_attempts = commit_attempts
+        self._queue: "queue.Queue[Tuple[WriteUnit, Future] | None]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-executor", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Finish queued units, then stop the worker."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, unit: WriteUnit) -> Future:
+        """Queue a unit of work; the future resolves after its group is committed."""
+        self.start()
+        future: Future = Future()
+        self._queue.put((unit, future))
+        return future
+
+    def run(self, unit: WriteUnit, timeout: float | None = 30.0) -> Any:
+        """
+        Submit and wait (from sync code, e.g. sync endpoints running in the threadpool).
+
+        On timeout a unit that has not started yet is cancelled (it will never run) and
+        TimeoutError is raised. A unit that already started cannot be stopped: its group
+        may still commit or roll back after TimeoutError, so its outcome is unknown to
+        the caller.
+        """
+        future = self.submit(unit)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            if not future.cancel():
+                logger.warning("Write unit still running after %ss: its outcome is unknown to the caller", timeout)
+            raise
+
+    async def run_async(self, unit: WriteUnit) -> Any:
+        """Submit and await (from async endpoints, without blocking the event loop)."""
+        return await asyncio.wrap_future(self.submit(unit))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.linger_seconds
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._execute_batch(batch)
+            if stopping:
+                return
+
+    def _execute_batch(self, batch: List[Tuple[WriteUnit, Future]]) -> None:
+        batch = [(unit, future) for unit, future in batch if future.set_running_or_notify_cancel()]
+        for attempt in range(self.commit_attempts):
+            try:
+                outcomes = self._run_group(batch)
+            except OperationalError as e:
+                logger.warning("Write group failed (attempt %d): %s", attempt + 1, e)
+                time.sleep(0.01 * (attempt + 1))
+                continue
+            except Exception as e:
+                logger.warning("Write group failed (%s); running units one by one", e)
+                break
+            for (_, future), (ok, value) in zip(batch, outcomes):
+                future.set_result(value) if ok else future.set_exception(value)
+            return
+
+        # Group commit kept failing: give every unit its own transaction and its own outcome
+        for unit, future in batch:
+            try:
+                outcome = self._run_group([(unit, future)])[0]
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            future.set_result(outcome[1]) if outcome[0] else future.set_exception(outcome[1])
+
+    def _run_group(self, batch: List[Tuple[WriteUnit, Future]]) -> List[Tuple[bool, Any]]:
+        """Run each unit in a SAVEPOINT and commit once. Returns (ok, result or exception) per unit."""
+        outcomes: List[Tuple[bool, Any]] = []
+        session = self.session_factory()
+        try:
+            session.begin()
+            for unit, _ in batch:
+                savepoint = session.begin_nested()
+                try:
+                    result = unit(session)
+                    session.flush()
+                    savepoint.commit()
+                    outcomes.append((True, result))
+                except OperationalError:
+                    raise  # Connection-level failure: retry the whole group
+                except Exception as e:
+                    savepoint.rollback()
+                    outcomes.append((False, e))
+            session.commit()
+            return outcomes
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+_write_executor: WriteExecutor | None = None
+_write_executor_lock = threading.Lock()
+
+
+def get_write_executor() -> WriteExecutor:
+    """Process-wide executor on its own dedicated connection (created on first use)."""
+    global _write_executor
+    with _write_executor_lock:
+        if _write_executor is None:
+            from app.database import create_write_executor_engine
+            factory = sessionmaker(bind=create_write_executor_engine(), autoflush=False, expire_on_commit=False)
+            _write_executor = WriteExecutor(factory)
+        return _write_executor
+
+
+def stop_write_executor() -> None:
+    if _write_executor is not None:
+        _write_executor.stop()
+
+
+def run_write(db: Session, unit: WriteUnit) -> Any:
+    """
+    Run a write unit of work and commit it.
+    Through the group-commit executor when WRITE_EXECUTOR=1, otherwise on `db` (the request's session).
+
+    The executor commits on its own connection and thread, out of reach of the request's
+    routing state: the request is flagged as having written here, so read-your-writes
+    (app.core.read_replicas) keeps the client on the primary.
+    """
+    if WRITE_EXECUTOR_ENABLED:
+        result = get_write_executor().run(unit)
+        mark_primary_write()
+        return result
+    try:
+        result = unit(db)
+        db.commit()
+        return result
+    except BaseException:
+        db.rollback()
+        raise
+
+
+async def run_write_async(db: Session, unit: WriteUnit) -> Any:
+    """run_write() for async endpoints: the unit and the commit never run on the event loop."""
+    if WRITE_EXECUTOR_ENABLED:
+        result = await get_write_executor().run_async(unit)
+        mark_primary_write()
+        return result
+    return await to_thread.run_sync(run_write, db, unit)
@@ -1,12 +1,20 @@
 # app/database.py
+from fastapi import Request
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import logging
 import os
 from dotenv import load_dotenv
+from app.core.sql_instrumentation import install_sql_instrumentation
+from app.core.metrics import install_pool_metrics
+from app.core.read_replicas import Replica, ReplicaSet, RoutingSession, track_primary_writes
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Se não houver DATABASE_URL configurada, usa SQLite (mais simples para desenvolvimento)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -15,37 +23,229 @@ if not DATABASE_URL:
     # O arquivo será criado automaticamente em backend/database.db
     db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database.db")
     DATABASE_URL = f"sqlite:///{db_path}"
-    print(f"[SQLite] Usando SQLite: {db_path}")
+    logger.info("[SQLite] Usando SQLite: %s", db_path)
+
+# Perfil de produção do SQLite (opt-in, SQLITE_PROFILE=production):
+# WAL + pragmas ajustados, uma única conexão de escrita e um pool de conexões somente leitura
+SQLITE_PRODUCTION = os.getenv("SQLITE_PROFILE", "").lower() == "production"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", str(os.cpu_count() or 4)))
+# Conexões abertas na inicialização (lifespan), para o primeiro request não pagar o connect
+DB_POOL_WARM_CONNECTIONS = int(os.getenv("DB_POOL_WARM_CONNECTIONS", "2"))
 
-# Configuração especial para SQLite
-connect_args = {}
 is_sqlite = DATABASE_URL.startswith("sqlite")
 
-if is_sqlite:
-    # SQLite precisa de configuração especial para funcionar com threads
-    connect_args = {"check_same_thread": False}
-    
-    # Habilitar foreign keys no SQLite
-    @event.listens_for(Engine, "connect")
+# Réplicas de leitura do PostgreSQL (opcional): lista separada por vírgulas
+DATABASE_READ_URLS = [u.strip() for u in os.getenv("DATABASE_READ_URLS", "").split(",") if u.strip()]
+if DATABASE_READ_URLS and is_sqlite:
+    logger.warning("[SQLite] DATABASE_READ_URLS ignorado: réplicas só são usadas com PostgreSQL")
+    DATABASE_READ_URLS = []
+ECHO = os.getenv("SQL_ECHO", "0") == "1"
+
+
+def _sqlite_pragmas(production: bool, read_only: bool):
+    """Listener "connect" que aplica os PRAGMAs a cada nova conexão SQLite."""
     def set_sqlite_pragma(dbapi_conn, connection_record):
         cursor = dbapi_conn.cursor()
+        # Habilitar foreign keys no SQLite
         cursor.execute("PRAGMA foreign_keys=ON")
+        if production:
+            if not read_only:
+                # Persistente no arquivo; leitores não bloqueiam o escritor (e vice-versa)
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
         cursor.close()
+    return set_sqlite_pragma
+
+
+def create_sqlite_engines(url: str, production: bool, read_pool_size: int = SQLITE_READ_POOL_SIZE):
+    """
+    Cria os engines SQLite.
+
+    Returns:
+        tuple[Engine, Engine | None]: (engine de escrita, engine somente leitura ou None fora do perfil de produção)
+    """
+    # SQLite precisa de configuração especial para funcionar com threads
+    connect_args = {"check_same_thread": False}
+    if not production:
+        writer = create_engine(url, echo=ECHO, future=True, connect_args=connect_args)
+        event.listen(writer, "connect", _sqlite_pragmas(False, False))
+        return writer, None
+
+    # Um único escritor: as escritas do processo fazem fila no pool em vez de disputar o lock do arquivo
+    writer = create_engine(
+        url, echo=ECHO, future=True, connect_args=connect_args,
+        pool_size=1, max_overflow=0, pool_timeout=30,
+    )
+    event.listen(writer, "connect", _sqlite_pragmas(True, False))
+    with writer.connect():
+        pass  # Ativa o WAL antes de abrir conexões somente leitura
+
+    db_file = make_url(url).database
+    reader = create_engine(
+        f"sqlite:///file:{db_file}?mode=ro&uri=true",
+        echo=ECHO, future=True, connect_args=connect_args,
+        pool_size=read_pool_size, max_overflow=read_pool_size,
+    )
+    event.listen(reader, "connect", _sqlite_pragmas(True, True))
+    return writer, reader
+
+
+def create_write_executor_engine(url: str = DATABASE_URL):
+    """
+    Engine com uma única conexão dedicada ao executor de escrita (app.core.write_executor).
+    No SQLite, o BEGIN passa a ser emitido pelo SQLAlchemy (BEGIN IMMEDIATE), o que faz
+    os SAVEPOINTs por unidade de trabalho funcionarem com o driver pysqlite.
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=ECHO, future=True, pool_size=1, max_overflow=0)
+
+    executor_engine = create_engine(
+        url, echo=ECHO, future=True, connect_args={"check_same_thread": False},
+        pool_size=1, max_overflow=0,
+    )
+    pragmas = _sqlite_pragmas(SQLITE_PRODUCTION, False)
+
+    @event.listens_for(executor_engine, "connect")
+    def _connect(dbapi_conn, connection_record):
+        pragmas(dbapi_conn, connection_record)
+        dbapi_conn.isolation_level = None  # Desliga o controle de transação do pysqlite
+
+    @event.listens_for(executor_engine, "begin")
+    def _begin(conn):
+        # Pega o lock de escrita já no início: o lote inteiro é uma escrita
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return executor_engine
+
+
+# Statement echo is a debug aid only (SQL_ECHO=1); per-request SQL stats are always collected
+if is_sqlite:
+    engine, read_engine = create_sqlite_engines(DATABASE_URL, SQLITE_PRODUCTION)
+else:
+    engine = create_engine(DATABASE_URL, echo=ECHO, future=True)
+    read_engine = None
+
+for _engine, _pool_name in ((engine, "primary"), (read_engine, "read")):
+    if _engine is not None:
+        install_sql_instrumentation(_engine)
+        install_pool_metrics(_engine, _pool_name)
 
-engine = create_engine(
-    DATABASE_URL, 
-    echo=True, 
-    future=True,
-    connect_args=connect_args
-)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessões de leitura (perfil de produção do SQLite); sem ele, iguais a SessionLocal
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine or engine)
+
+
+def create_replica_set(urls=DATABASE_READ_URLS):
+    """Engines (síncrono e assíncrono) de cada réplica; None sem réplicas configuradas."""
+    if not urls:
+        return None
+    replicas = []
+    for number, url in enumerate(urls, start=1):
+        replica_engine = create_engine(url, echo=ECHO, future=True, pool_pre_ping=True)
+        replica_async_engine = create_async_engine(to_async_url(url), echo=ECHO, pool_pre_ping=True)
+        pools = ((replica_engine, f"replica{number}"), (replica_async_engine.sync_engine, f"replica{number}_async"))
+        for _engine, _pool_name in pools:
+            install_sql_instrumentation(_engine)
+            install_pool_metrics(_engine, _pool_name)
+        replicas.append(Replica(replica_engine, replica_async_engine))
+    replica_set = ReplicaSet(replicas)
+    replica_set.start_checker()
+    return replica_set
+
+
+
+def to_async_url(url: str) -> str:
+    """URL equivalente com driver assíncrono (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return str(parsed.set(drivername="sqlite+aiosqlite"))
+    if parsed.get_backend_name() == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    raise ValueError(f"No async driver configured for {parsed.drivername}")
+
+
+def create_async_read_engine(url: str = DATABASE_URL):
+    """
+    Engine assíncrono para os endpoints de leitura mais acessados.
+    No perfil de produção do SQLite, abre o arquivo em modo somente leitura, como read_engine.
+    """
+    if url.startswith("sqlite"):
+        if SQLITE_PRODUCTION:
+            url = f"sqlite:///file:{make_url(url).database}?mode=ro&uri=true"
+        async_engine = create_async_engine(to_async_url(url), echo=ECHO)
+        event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas(SQLITE_PRODUCTION, SQLITE_PRODUCTION))
+        return async_engine
+    return create_async_engine(to_async_url(url), echo=ECHO, pool_pre_ping=True)
+
+
+async_engine = create_async_read_engine()
+install_sql_instrumentation(async_engine.sync_engine)
+install_pool_metrics(async_engine.sync_engine, "async_read")
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+# Com réplicas: leituras (GET/HEAD, serviços somente leitura) vão para as réplicas em round-robin;
+# escritas, e leituras depois de uma escrita, ficam no primário (ver app.core.read_replicas)
+replica_set = create_replica_set()
+if replica_set is not None:
+    track_primary_writes(engine)
+    track_primary_writes(async_engine.sync_engine)
+    ReadSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, class_=RoutingSession,
+        primary=engine, replica_set=replica_set,
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        expire_on_commit=False, autoflush=False, sync_session_class=RoutingSession,
+        primary=async_engine.sync_engine, replica_set=replica_set, use_async_engines=True,
+    )
 
 Base = declarative_base()
 
+
+def warm_pool(target_engine, connections: int = DB_POOL_WARM_CONNECTIONS) -> int:
+    """
+    Abre `connections` conexões de uma vez (limitado ao tamanho do pool) e as devolve ao pool.
+    Sem DDL nem reflexão: só o connect (com os PRAGMAs) e um SELECT 1.
+
+    Returns:
+        int: Número de conexões abertas
+    """
+    pool = target_engine.pool
+    if hasattr(pool, "size"):
+        connections = min(connections, pool.size())
+    opened = []
+    try:
+        for _ in range(max(connections, 0)):
+            conn = target_engine.connect()
+            opened.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+READ_METHODS = ("GET", "HEAD")
+
+
 # Dependency para injeção de sessão em endpoints FastAPI
-def get_db():
-    db = SessionLocal()
+# GET/HEAD recebem uma sessão de leitura (conexões somente leitura no perfil de produção)
+def get_db(request: Request):
+    db = ReadSessionLocal() if request.method in READ_METHODS else SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# Sessão assíncrona para endpoints "async def": não ocupa uma thread do threadpool durante o I/O
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
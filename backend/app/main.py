@@ -1,25 +1,52 @@
 # app/main.py
 import os
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from app.database import engine, Base
+from starlette.concurrency import run_in_threadpool
+from app.database import engine, read_engine, replica_set, warm_pool
 from app.core.middleware import limiter
+from app.core.sql_instrumentation import SQLInstrumentationMiddleware
+from app.core.profiler import ProfilerMiddleware, install_endpoint_profiling
+from app.core.read_replicas import ReadYourWritesMiddleware
+from app.core.metrics import MetricsMiddleware, render_metrics, record_rate_limited, route_template, mark_worker_dead
+from app.core.write_executor import stop_write_executor
+from app.core.invalidation_bus import invalidation_bus
+from app.services.submission_queue import submission_queue
+# Import models so SQLAlchemy sees every mapper (the schema itself is managed by Alembic)
+from app.models import user_model, supplier_model, category_model, review_model, media_model, contact_form_model  # noqa: F401
+from app.routes import auth_routes, supplier_routes, category_routes, review_routes, contact_form_routes, media_routes, health_routes, profile_routes
 from slowapi.errors import RateLimitExceeded
 from dotenv import load_dotenv
-from pathlib import Path
 
 load_dotenv()
 
-app = FastAPI(title="Event Suppliers API")
 
-# Configure rate limiter
-app.state.limiter = limiter
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown. The schema is managed by Alembic (alembic upgrade head, run before
+    the server starts): startup issues no DDL and no reflection, it only warms the pools.
+    """
+    for pool_engine in (engine, read_engine):
+        if pool_engine is not None:
+            await run_in_threadpool(warm_pool, pool_engine)
+    # Replays submissions left in the write-behind log by a previous process
+    submission_queue.start()
+    # Cache invalidations published by the other workers (INVALIDATION_BUS)
+    invalidation_bus.start()
+    yield
+    invalidation_bus.stop()
+    submission_queue.stop()
+    stop_write_executor()
+    mark_worker_dead()
+
 
 # Handle rate limit exceeded errors
-@app.exception_handler(RateLimitExceeded)
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
+    record_rate_limited(route_template(request.scope))
     return JSONResponse(
         status_code=429,
         content={
@@ -41,22 +68,7 @@ else:
 		"http://localhost:3001",  # Caso use outra porta
 	]
 
-app.add_middleware(
-	CORSMiddleware,
-	allow_origins=cors_origins,
-	allow_credentials=True,
-	allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-	allow_headers=["*"],
-	expose_headers=["*"],
-)
-
-# Import models so SQLAlchemy sees them (dev only; prefer Alembic in prod)
-from app.models import user_model, supplier_model, category_model, review_model, media_model, contact_form_model  # noqa: E402,F401
-
-Base.metadata.create_all(bind=engine)
-
 # Root endpoint
-@app.get("/")
 def root():
 	"""Root endpoint - API information and links."""
 	return {
@@ -65,6 +77,8 @@ def root():
 		"status": "running",
 		"docs": "/docs",
 		"healthcheck": "/healthcheck",
+		"liveness": "/health/live",
+		"readiness": "/health/ready",
 		"endpoints": {
 			"auth": "/auth",
 			"suppliers": "/fornecedores",
@@ -75,22 +89,65 @@ def root():
 		}
 	}
 
-# Healthcheck
-@app.get("/healthcheck")
+# Healthcheck (kept for existing probes; prefer /health/live and /health/ready)
 def health():
 	return {"status": "ok"}
 
-# Register route modules AFTER app creation
-from app.routes import auth_routes, supplier_routes, category_routes, review_routes, contact_form_routes, media_routes  # noqa: E402
+# Prometheus exposition (aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set)
+async def metrics():
+	payload, content_type = render_metrics()
+	return Response(content=payload, media_type=content_type)
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Event Suppliers API", lifespan=lifespan)
+
+    # Configure rate limiter
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=cors_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+    )
+
+    # Read replicas (DATABASE_READ_URLS): keeps a client that just wrote on the primary until replicas catch up
+    if replica_set is not None:
+        app.add_middleware(ReadYourWritesMiddleware, replica_set=replica_set)
+
+    # Opt-in profiler for admin requests with "X-Profile: 1" (inside the SQL stats middleware,
+    # so reports include the request's statements)
+    app.add_middleware(ProfilerMiddleware)
+
+    # Per-request SQL stats: Server-Timing header and one "app.sql" log line per request
+    app.add_middleware(SQLInstrumentationMiddleware)
+    # Outermost: request latency/status histograms and in-flight gauges (exposed at /metrics)
+    app.add_middleware(MetricsMiddleware)
+
+    app.add_api_route("/", root, methods=["GET"])
+    app.add_api_route("/healthcheck", health, methods=["GET"])
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+
+    app.include_router(auth_routes.router)
+    app.include_router(supplier_routes.router)
+    app.include_router(category_routes.router)
+    app.include_router(review_routes.router)
+    app.include_router(contact_form_routes.router)
+    app.include_router(media_routes.router)
+    app.include_router(health_routes.router)
+    app.include_router(profile_routes.router)
+
+    # Must run after every router is included
+    install_endpoint_profiling(app)
+
+    # Mount static files directory for uploaded media (the only place it is created)
+    media_routes.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+    return app
 
-app.include_router(auth_routes.router)
-app.include_router(supplier_routes.router)
-app.include_router(category_routes.router)
-app.include_router(review_routes.router)
-app.include_router(contact_form_routes.router)
-app.include_router(media_routes.router)
 
-# Mount static files directory for uploaded media
-UPLOAD_DIR = Path("uploads/media")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app = create_app()
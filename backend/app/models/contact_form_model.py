@@ -1,30 +1,83 @@
 #app/models/contact_form_model.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Float, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from app.database import Base
 
+class ContactFormTemplate(Base):
+    """Shared, immutable question set. A new version is stored whenever the template changes."""
+    __tablename__ = "contact_form_templates"
+    __table_args__ = (
+        UniqueConstraint('name', 'version', name='uq_template_name_version'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False)
+    version = Column(Integer, nullable=False)
+    questions_json = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class ContactForm(Base):
     __tablename__ = "contact_forms"
     id = Column(Integer, primary_key=True, index=True)
     supplier_id = Column(Integer, ForeignKey("suppliers.id"), nullable=False, unique=True)  # One form per supplier
-    questions_json = Column(Text, nullable=False)  # Store questions template as JSON string
+    # Forms point to a shared template until the supplier customizes them (copy on write):
+    # exactly one of template_id / questions_json is set.
+    template_id = Column(Integer, ForeignKey("contact_form_templates.id"), nullable=True)
+    questions_json = Column(Text, nullable=True)  # Customized questions as JSON string
     active = Column(Boolean, default=True)
+    # Denormalized inbox counters (non-archived submissions), maintained when submissions are stored/read/archived
+    submissions_count = Column(Integer, nullable=False, default=0, server_default="0")
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     supplier = relationship("Supplier", backref="contact_form")
+    template = relationship("ContactFormTemplate")
 
 
 class ContactFormSubmission(Base):
     __tablename__ = "contact_form_submissions"
+    __table_args__ = (
+        Index('idx_submissions_form_created', 'contact_form_id', 'created_at'),
+        Index('idx_submissions_form_read_created', 'contact_form_id', 'read', 'created_at'),  # Inbox query
+        # Idempotency keys come from clients: scoped to the form they submitted to
+        UniqueConstraint('contact_form_id', 'idempotency_key', name='uq_submissions_form_idempotency_key'),
+    )
     id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String(64), nullable=True)  # Dedupes retries/queue replays
     contact_form_id = Column(Integer, ForeignKey("contact_forms.id"), nullable=False)
     answers_json = Column(Text, nullable=False)  # Store answers as JSON string
     submitter_name = Column(String(120))
     submitter_email = Column(String(120))
     submitter_phone = Column(String(50))
     read = Column(Boolean, default=False)  # Track if submission has been read
+    archived = Column(Boolean, nullable=False, default=False, server_default="0")  # Hidden from the inbox
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    contact_form = relationship("ContactForm", backref="submissions")
\ No newline at end of file
+    contact_form = relationship("ContactForm", backref="submissions")
+
+
+class ContactFormAnswer(Base):
+    """Typed copy of a single answer, so submissions can be filtered/sorted in SQL."""
+    __tablename__ = "contact_form_answers"
+    __table_args__ = (
+        Index('idx_answers_submission', 'submission_id'),
+        Index('idx_answers_question_text', 'question', 'value_text'),
+        Index('idx_answers_question_number', 'question', 'value_number'),
+        Index('idx_answers_question_date', 'question', 'value_date'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    submission_id = Column(Integer, ForeignKey("contact_form_submissions.id", ondelete="CASCADE"), nullable=False)
+    question = Column(String(255), nullable=False)  # Question text (index keys are resolved to the text)
+    question_type = Column(String(20), nullable=False, default="text")
+    value_text = Column(Text)  # Sanitized answer as text (one row per selected option for multiselect)
+    value_number = Column(Float)  # Set for number questions
+    value_date = Column(Date)  # Set for date/datetime questions
+
+    submission = relationship(
+        "ContactFormSubmission",
+        backref=backref("answer_rows", cascade="all, delete-orphan", passive_deletes=True),
+    )
@@ -1,7 +1,7 @@
 # app/models/review_model.py
 from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Index, UniqueConstraint
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from app.database import Base
 
 class Review(Base):
@@ -10,6 +10,8 @@ class Review(Base):
         Index('idx_reviews_supplier', 'supplier_id'),
         Index('idx_reviews_status', 'status'),
         Index('idx_reviews_supplier_status', 'supplier_id', 'status'),  # Composite index for common filter
+        Index('idx_reviews_status_created', 'status', 'created_at'),  # Moderation queue (oldest pending first)
+        Index('idx_reviews_status_risk', 'status', 'risk_score'),  # Moderation queue (riskiest first)
         UniqueConstraint('user_id', 'supplier_id', name='uq_user_supplier_review'),  # One review per user per supplier
     )
     
@@ -20,6 +22,30 @@ class Review(Base):
     comment = Column(Text, nullable=False)
     status = Column(String(20), default="pending")  # pending|approved|rejected
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Moderation lease: the admin working on this pending review, until claim_expires_at (UTC)
+    claimed_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    claim_expires_at = Column(DateTime(timezone=True), nullable=True)
+    # Pre-screening result (app.utils.moderation): 0-100 score and comma-separated flags
+    risk_score = Column(Integer, nullable=False, default=0, server_default="0")
+    risk_flags = Column(String(255), nullable=True)
 
-    user = relationship("User")
+    user = relationship("User", foreign_keys=[user_id])
     supplier = relationship("Supplier")
+
+
+class SupplierRatingStats(Base):
+    """
+    Per-supplier histogram of approved review ratings.
+    Maintained incrementally whenever a review enters or leaves the "approved" state.
+    """
+    __tablename__ = "supplier_rating_stats"
+
+    supplier_id = Column(Integer, ForeignKey("suppliers.id", ondelete="CASCADE"), primary_key=True)
+    rating_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_5 = Column(Integer, nullable=False, default=0, server_default="0")
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+
+    supplier = relationship("Supplier", backref=backref("rating_stats", uselist=False, passive_deletes=True))
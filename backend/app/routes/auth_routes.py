@@ -1,13 +1,18 @@
 # app/routes/auth_routes.py
+import os
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, ReadSessionLocal
 from app.models.user_model import User
 from app.schemas.user_schema import UserRegister, UserLogin, UserResponse
 from app.utils.password_handler import hash_password, verify_password
 from app.utils.jwt_handler import create_access_token
 from app.utils.auth_dependency import get_current_user
 from app.core.middleware import login_rate_limit
+from app.services.review_service import recent_approved_reviews, rating_summaries
+from app.core.response_cache import response_cache
+from app.core.swr_cache import SWRCache
+from app.services.supplier_service import category_facets, rating_listings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -92,81 +97,103 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    recent_approved_reviews.invalidate()
+    rating_summaries.invalidate()
+    # A deleted supplier owner takes its supplier, form and media with it
+    category_facets.mark_stale()
+    rating_listings.mark_stale()
+    response_cache.clear()
     return {
         "success": True,
         "message": "User deleted successfully"
     }
 
+# About ten count queries: served stale-while-revalidate, so the dashboard never waits on them
+# after the first load (counts lag by at most the soft TTL, plus one recompute).
+platform_stats = SWRCache(
+    "platform_stats",
+    soft_ttl=float(os.getenv("PLATFORM_STATS_SOFT_TTL_SECONDS", "30")),
+    hard_ttl=float(os.getenv("PLATFORM_STATS_HARD_TTL_SECONDS", "600")),
+    max_entries=1,
+)
+
+
 @router.get("/stats", response_model=dict)
-def get_platform_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
+def get_platform_stats(current_user: User = Depends(get_current_user)):
     """Get platform statistics (admin only)."""
     if current_user.type != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
-    
+
+    return {
+        "success": True,
+        "data": platform_stats.get("platform", _compute_platform_stats),
+    }
+
+
+def _compute_platform_stats() -> dict:
+    """Run the platform counts in a session of their own (may run in a background refresh)."""
     from sqlalchemy import func
     from app.models.supplier_model import Supplier
     from app.models.review_model import Review
     from app.models.category_model import Category
     from app.models.contact_form_model import ContactFormSubmission
-    
-    # Count users by type
-    total_users = db.query(func.count(User.id)).scalar()
-    users_by_type = (
-        db.query(User.type, func.count(User.id))
-        .group_by(User.type)
-        .all()
-    )
-    users_by_type_dict = {t: c for t, c in users_by_type}
-    
-    # Count suppliers
-    total_suppliers = db.query(func.count(Supplier.id)).scalar()
-    active_suppliers = db.query(func.count(Supplier.id)).filter(Supplier.status == "active").scalar()
-    
-    # Count reviews
-    total_reviews = db.query(func.count(Review.id)).scalar()
-    pending_reviews = db.query(func.count(Review.id)).filter(Review.status == "pending").scalar()
-    approved_reviews = db.query(func.count(Review.id)).filter(Review.status == "approved").scalar()
-    
-    # Count categories
-    total_categories = db.query(func.count(Category.id)).scalar()
-    active_categories = db.query(func.count(Category.id)).filter(Category.active == True).scalar()
-    
-    # Count submissions
-    total_submissions = db.query(func.count(ContactFormSubmission.id)).scalar()
-    unread_submissions = db.query(func.count(ContactFormSubmission.id)).filter(
-        ContactFormSubmission.read == False
-    ).scalar()
-    
+
+    db = ReadSessionLocal()
+    try:
+        # Count users by type
+        total_users = db.query(func.count(User.id)).scalar()
+        users_by_type = (
+            db.query(User.type, func.count(User.id))
+            .group_by(User.type)
+            .all()
+        )
+        users_by_type_dict = {t: c for t, c in users_by_type}
+
+        # Count suppliers
+        total_suppliers = db.query(func.count(Supplier.id)).scalar()
+        active_suppliers = db.query(func.count(Supplier.id)).filter(Supplier.status == "active").scalar()
+
+        # Count reviews
+        total_reviews = db.query(func.count(Review.id)).scalar()
+        pending_reviews = db.query(func.count(Review.id)).filter(Review.status == "pending").scalar()
+        approved_reviews = db.query(func.count(Review.id)).filter(Review.status == "approved").scalar()
+
+        # Count categories
+        total_categories = db.query(func.count(Category.id)).scalar()
+        active_categories = db.query(func.count(Category.id)).filter(Category.active == True).scalar()
+
+        # Count submissions
+        total_submissions = db.query(func.count(ContactFormSubmission.id)).scalar()
+        unread_submissions = db.query(func.count(ContactFormSubmission.id)).filter(
+            ContactFormSubmission.read == False
+        ).scalar()
+    finally:
+        db.close()
+
     return {
-        "success": True,
-        "data": {
-            "users": {
-                "total": total_users or 0,
-                "by_type": {
-                    "client": users_by_type_dict.get("client", 0),
-                    "supplier": users_by_type_dict.get("supplier", 0),
-                    "admin": users_by_type_dict.get("admin", 0),
-                }
-            },
-            "suppliers": {
-                "total": total_suppliers or 0,
-                "active": active_suppliers or 0,
-            },
-            "reviews": {
-                "total": total_reviews or 0,
-                "pending": pending_reviews or 0,
-                "approved": approved_reviews or 0,
-            },
-            "categories": {
-                "total": total_categories or 0,
-                "active": active_categories or 0,
-            },
-            "submissions": {
-                "total": total_submissions or 0,
-                "unread": unread_submissions or 0,
+        "users": {
+            "total": total_users or 0,
+            "by_type": {
+                "client": users_by_type_dict.get("client", 0),
+                "supplier": users_by_type_dict.get("supplier", 0),
+                "admin": users_by_type_dict.get("admin", 0),
             }
+        },
+        "suppliers": {
+            "total": total_suppliers or 0,
+            "active": active_suppliers or 0,
+        },
+        "reviews": {
+            "total": total_reviews or 0,
+            "pending": pending_reviews or 0,
+            "approved": approved_reviews or 0,
+        },
+        "categories": {
+            "total": total_categories or 0,
+            "active": active_categories or 0,
+        },
+        "submissions": {
+            "total": total_submissions or 0,
+            "unread": unread_submissions or 0,
         }
     }
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.category_model import Category
@@ -6,16 +6,24 @@ from app.models.supplier_model import Supplier
 from app.schemas.category_schema import CategoryCreate, CategoryUpdate, CategoryResponse
 from app.utils.auth_dependency import get_current_user
 from app.models.user_model import User
+from app.core.response_cache import response_cache
+from app.services.supplier_service import active_supplier_counts
 
 router = APIRouter(prefix="/categorias", tags=["categories"])
 
 @router.get("")
 def list_categories(
+    request: Request,
     db: Session = Depends(get_db),
     active: bool | None = Query(None),
     page: int = 1,
     page_size: int = 50,
 ):
+    """List categories with their active supplier counts (public endpoint, response-cached)."""
+    cached = response_cache.get(request)
+    if cached is not None:
+        return cached
+
     query = db.query(Category)
     if active is not None:
         query = query.filter(Category.active == active)
@@ -28,30 +36,27 @@ def list_categories(
         .all()
     )
 
-    # Count active suppliers for each category
-    data = []
-    for c in items:
-        supplier_count = db.query(Supplier).filter(
-            Supplier.category_id == c.id,
-            Supplier.status == "active"
-        ).count()
-        
-        data.append({
+    # Active supplier counts for every category at once (stale-while-revalidate, see supplier_service)
+    counts = active_supplier_counts()
+    data = [
+        {
             "id": c.id,
             "name": c.name,
             "origin": c.origin,
             "active": c.active,
-            "supplier_count": supplier_count,
-        })
+            "supplier_count": counts.get(c.id, 0),
+        }
+        for c in items
+    ]
 
-    return {
+    return response_cache.put(request, {
         "success": True,
         "data": data,
         "total": total,
         "page": page,
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size if page_size > 0 else 0,
-    }
+    }, tags=["categories"])
 
 
 @router.post("", response_model=dict)
@@ -73,6 +78,7 @@ def create_category(
     db.add(new_category)
     db.commit()
     db.refresh(new_category)
+    response_cache.invalidate("categories")
     return {
         "success": True,
         "message": "Category created successfully",
@@ -107,6 +113,7 @@ def update_category(
 
     db.commit()
     db.refresh(category)
+    response_cache.invalidate("categories")
     return {
         "success": True,
         "message": "Category updated successfully",
@@ -138,6 +145,7 @@ def delete_category(
 
     db.delete(category)
     db.commit()
+    response_cache.invalidate("categories")
     return {
         "success": True,
         "message": "Category deleted successfully"
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Header
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.contact_form_model import ContactForm, ContactFormSubmission
@@ -7,33 +8,63 @@ from app.schemas.contact_form_schema import (
     ContactFormCreate,
     ContactFormResponse,
     ContactFormSubmissionCreate,
-    ContactFormSubmissionResponse
+    ContactFormSubmissionResponse,
+    SubmissionBulkAction,
 )
 from app.utils.auth_dependency import get_current_user
-from app.utils.default_contact_form import get_default_contact_form_questions
 from app.models.user_model import User
 from app.core.middleware import contact_form_rate_limit
 from app.utils.sanitize import sanitize_dict
-from app.services.contact_form_service import validate_form_submission
+from app.core.write_executor import run_write
+from app.core.response_cache import response_cache
+from app.services.contact_form_service import (
+    validate_form_submission,
+    get_form_questions,
+    get_template_questions,
+    get_default_template_id,
+    use_default_template,
+    customize_form_questions,
+    resolve_question_key,
+    apply_submission_filters,
+    answer_sort_key,
+    encode_submission_cursor,
+    decode_submission_cursor,
+    apply_submission_cursor,
+    bulk_update_submissions,
+)
+from app.services.submission_queue import (
+    WRITE_BEHIND_ENABLED,
+    submission_queue,
+    new_submission_record,
+    insert_submissions,
+    find_submission,
+    same_payload,
+    IdempotencyConflict,
+)
+from datetime import date
 import json
+import re
 
 router = APIRouter(prefix="/contact-forms", tags=["contact_forms"])
 
 
 @router.get("/default-template")
-def get_default_template():
+def get_default_template(request: Request):
     """
     Get the default contact form template (public endpoint).
     Suppliers can use this as a starting point and customize it.
     """
-    default_questions = get_default_contact_form_questions()
-    return {
+    cached = response_cache.get(request)
+    if cached is not None:
+        return cached
+    default_questions = get_template_questions(get_default_template_id())
+    return response_cache.put(request, {
         "success": True,
         "data": {
             "questions": default_questions,
             "description": "This is the default contact form template. You can customize it when creating your form."
         }
-    }
+    }, tags=["default_template"])
 
 
 @router.post("", response_model=dict)
@@ -62,26 +93,21 @@ def create_contact_form(
             detail="Contact form already exists. Use PUT to update it."
         )
 
-    # Use default template if no questions provided
-    if not form_data.questions or len(form_data.questions) == 0:
-        questions_data = get_default_contact_form_questions()
-    else:
-        questions_data = [q.model_dump() for q in form_data.questions]
-
-    # Serialize questions to JSON
-    questions_json = json.dumps(questions_data)
-
     new_form = ContactForm(
         supplier_id=supplier.id,
-        questions_json=questions_json,
         active=form_data.active
     )
+    # Use the shared default template if no questions provided
+    if not form_data.questions or len(form_data.questions) == 0:
+        use_default_template(new_form)
+    else:
+        customize_form_questions(new_form, [q.model_dump() for q in form_data.questions])
     db.add(new_form)
     db.commit()
     db.refresh(new_form)
+    response_cache.invalidate(f"contact_form:{new_form.supplier_id}")
 
-    # Parse questions back for response
-    questions = json.loads(new_form.questions_json)
+    questions = get_form_questions(new_form)
 
     return {
         "success": True,
@@ -100,11 +126,16 @@ def create_contact_form(
 @router.get("/supplier/{supplier_id}", response_model=dict)
 def get_supplier_contact_form(
     supplier_id: int,
+    request: Request,
     db: Session = Depends(get_db),
 ):
     """
-    Get active contact form for a supplier (public endpoint).
+    Get active contact form for a supplier (public endpoint, response-cached).
     """
+    cached = response_cache.get(request)
+    if cached is not None:
+        return cached
+
     supplier = db.get(Supplier, supplier_id)
     if not supplier:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Supplier not found")
@@ -120,9 +151,9 @@ def get_supplier_contact_form(
             detail="No active contact form found for this supplier"
         )
 
-    questions = json.loads(form.questions_json)
+    questions = get_form_questions(form)
 
-    return {
+    return response_cache.put(request, {
         "success": True,
         "data": {
             "id": form.id,
@@ -130,7 +161,7 @@ def get_supplier_contact_form(
             "questions": questions,
             "active": form.active
         }
-    }
+    }, tags=[f"contact_form:{supplier_id}"])
 
 
 @router.put("/{id}", response_model=dict)
@@ -155,15 +186,15 @@ def update_contact_form(
             detail="You can only update your own contact form"
         )
 
-    # Update questions
-    questions_json = json.dumps([q.model_dump() for q in form_data.questions])
-    form.questions_json = questions_json
+    # Update questions (the form gets its own copy from now on)
+    customize_form_questions(form, [q.model_dump() for q in form_data.questions])
     form.active = form_data.active
 
     db.commit()
     db.refresh(form)
+    response_cache.invalidate(f"contact_form:{form.supplier_id}")
 
-    questions = json.loads(form.questions_json)
+    questions = get_form_questions(form)
 
     return {
         "success": True,
@@ -201,6 +232,7 @@ def delete_contact_form(
 
     db.delete(form)
     db.commit()
+    response_cache.invalidate(f"contact_form:{supplier.id}")
     return {
         "success": True,
         "message": "Contact form deleted successfully"
@@ -229,14 +261,14 @@ def reset_form_to_default(
             detail="You can only reset your own contact form"
         )
 
-    # Reset to default template
-    default_questions = get_default_contact_form_questions()
-    form.questions_json = json.dumps(default_questions)
+    # Reset to default template (drops the customized copy)
+    use_default_template(form)
 
     db.commit()
     db.refresh(form)
+    response_cache.invalidate(f"contact_form:{form.supplier_id}")
 
-    questions = json.loads(form.questions_json)
+    questions = get_form_questions(form)
 
     return {
         "success": True,
@@ -258,11 +290,17 @@ def submit_contact_form(
     submission_data: ContactFormSubmissionCreate,
     request: Request,
     db: Session = Depends(get_db),
+    idempotency_key: str | None = Header(None, max_length=64),
 ):
     """
     Submit a contact form (public endpoint).
     Rate limited: 3 submissions per hour per IP.
     Note: contact_form_id in body is ignored; uses path parameter instead.
+    
+    With write-behind enabled (default), the submission is durably queued and
+    stored by a background worker; the response is 202 with the idempotency key.
+    Clients may send an Idempotency-Key header so retries are not stored twice;
+    keys are scoped to the form, and reusing one for a different submission is a 409.
     """
     form = db.get(ContactForm, id)
     if not form:
@@ -284,50 +322,112 @@ def submit_contact_form(
 
     # Sanitize answers to prevent XSS
     sanitized_answers = sanitize_dict(submission_data.answers)
-    
-    # Serialize answers to JSON
-    answers_json = json.dumps(sanitized_answers)
 
-    new_submission = ContactFormSubmission(
+    record = new_submission_record(
         contact_form_id=id,  # Use path parameter, not body
-        answers_json=answers_json,
+        answers=sanitized_answers,
         submitter_name=submission_data.submitter_name,
         submitter_email=submission_data.submitter_email,
-        submitter_phone=submission_data.submitter_phone
+        submitter_phone=submission_data.submitter_phone,
+        idempotency_key=idempotency_key,
     )
-    db.add(new_submission)
-    db.commit()
-    db.refresh(new_submission)
 
-    answers = json.loads(new_submission.answers_json)
+    if WRITE_BEHIND_ENABLED:
+        if idempotency_key:
+            stored = find_submission(db, id, idempotency_key)
+            if stored is not None and not same_payload(record, stored):
+                raise _idempotency_conflict()
+        try:
+            accepted = submission_queue.enqueue(record)
+        except IdempotencyConflict:
+            raise _idempotency_conflict()
+        if not accepted:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many submissions being processed. Please try again shortly.",
+                headers={"Retry-After": "5"},
+            )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "success": True,
+                "message": "Form submitted successfully",
+                "data": {
+                    "idempotency_key": record["idempotency_key"],
+                    "contact_form_id": id,
+                    "answers": sanitized_answers,
+                    "submitter_name": record["submitter_name"],
+                    "submitter_email": record["submitter_email"],
+                    "submitter_phone": record["submitter_phone"],
+                    "status": "queued",
+                    "created_at": record["received_at"],
+                }
+            }
+        )
 
-    return {
-        "success": True,
-        "message": "Form submitted successfully",
-        "data": {
+    def insert(session: Session):
+        created = insert_submissions(session, [record])
+        if created:
+            new_submission = created[0]
+        else:
+            new_submission = find_submission(session, id, record["idempotency_key"])
+            if not same_payload(record, new_submission):
+                raise _idempotency_conflict()
+        session.flush()
+        session.refresh(new_submission)
+        return {
             "id": new_submission.id,
             "contact_form_id": new_submission.contact_form_id,
-            "answers": answers,
+            "answers": json.loads(new_submission.answers_json),
             "submitter_name": new_submission.submitter_name,
             "submitter_email": new_submission.submitter_email,
             "submitter_phone": new_submission.submitter_phone,
             "created_at": new_submission.created_at
         }
+
+    return {
+        "success": True,
+        "message": "Form submitted successfully",
+        "data": run_write(db, insert)
     }
 
 
+def _idempotency_conflict() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="This Idempotency-Key was already used for a different submission",
+    )
+
+
+ANSWER_FILTER_PARAM = re.compile(r"^answer\[(.+)\]$")
+
+
 @router.get("/{id}/submissions")
 def list_form_submissions(
     id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
     read: bool | None = Query(None, description="Filter by read status"),
+    archived: bool = Query(False, description="List archived submissions instead of the inbox"),
+    event_date_from: date | None = Query(None, description="Only submissions with an event date on/after this date"),
+    event_date_to: date | None = Query(None, description="Only submissions with an event date on/before this date"),
+    search: str | None = Query(None, description="Search in answers and submitter name/email/phone"),
+    sort_answer: str | None = Query(None, description="Order by the answer to this question (text or index)"),
+    sort_order: str = Query("desc", description="Sort direction: 'asc' or 'desc'"),
+    cursor: str | None = Query(None, description="Opaque cursor from a previous page's next_cursor"),
 ):
     """
     List submissions for a contact form (supplier owner or admin only).
-    Can filter by read status.
+    Can filter by read status, event date, specific answers (answer[<question>]=value)
+    and free-text search. Filters are evaluated in the database.
+    
+    Pagination: pass `cursor` (from `next_cursor`) for keyset pagination in submission
+    order (newest or oldest first), which stays fast on large inboxes; `page` is still
+    accepted for offset pagination.
+    Totals come from the form's counters unless answer filters are used.
     """
     form = db.get(ContactForm, id)
     if not form:
@@ -341,20 +441,78 @@ def list_form_submissions(
             detail="You can only view submissions for your own contact form"
         )
 
-    query = db.query(ContactFormSubmission).filter(ContactFormSubmission.contact_form_id == id)
+    query = db.query(ContactFormSubmission).filter(
+        ContactFormSubmission.contact_form_id == id,
+        ContactFormSubmission.archived == archived,
+    )
     
     # Filter by read status if provided
     if read is not None:
         query = query.filter(ContactFormSubmission.read == read)
 
-    total = query.count()
-    submissions = (
-        query.order_by(ContactFormSubmission.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    # Answer filters come as answer[<question text or index>]=<value>
+    questions = get_form_questions(form)
+    answer_filters = {}
+    for key, value in request.query_params.items():
+        match = ANSWER_FILTER_PARAM.match(key)
+        if match:
+            answer_filters[resolve_question_key(questions, match.group(1))] = value
+
+    answer_filtered = bool(event_date_from or event_date_to or answer_filters or search)
+    query = apply_submission_filters(
+        query,
+        event_date_from=event_date_from,
+        event_date_to=event_date_to,
+        answer_filters=answer_filters,
+        search=search,
     )
 
+    # Use the denormalized (inbox) counters when only the read filter applies
+    if answer_filtered or archived:
+        total = query.count()
+    elif read is None:
+        total = form.submissions_count
+    elif read:
+        total = form.submissions_count - form.unread_count
+    else:
+        total = form.unread_count
+
+    if sort_order not in ["asc", "desc"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sort_order. Must be 'asc' or 'desc'"
+        )
+    if cursor and sort_answer:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor pagination is only available when sorting by date"
+        )
+    if sort_answer:
+        sort_keys = answer_sort_key(resolve_question_key(questions, sort_answer))
+        ordering = [k.asc() if sort_order == "asc" else k.desc() for k in sort_keys]
+        ordering.append(ContactFormSubmission.id.desc())
+    elif sort_order == "asc":
+        ordering = [ContactFormSubmission.id.asc()]
+    else:
+        ordering = [ContactFormSubmission.id.desc()]
+
+    query = query.order_by(*ordering)
+    if cursor:
+        try:
+            after_id = decode_submission_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = apply_submission_cursor(query, after_id, descending=(sort_order == "desc"))
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    submissions = query.limit(page_size).all()
+
+    next_cursor = None
+    if len(submissions) == page_size and not sort_answer:
+        last = submissions[-1]
+        next_cursor = encode_submission_cursor(last.id)
+
     data = []
     for sub in submissions:
         answers = json.loads(sub.answers_json)
@@ -366,14 +524,11 @@ def list_form_submissions(
             "submitter_email": sub.submitter_email,
             "submitter_phone": sub.submitter_phone,
             "read": sub.read,
+            "archived": sub.archived,
             "created_at": sub.created_at
         })
 
-    # Count unread submissions
-    unread_count = db.query(ContactFormSubmission).filter(
-        ContactFormSubmission.contact_form_id == id,
-        ContactFormSubmission.read == False
-    ).count()
+    unread_count = form.unread_count
 
     return {
         "success": True,
@@ -383,6 +538,7 @@ def list_form_submissions(
         "page": page,
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size if page_size > 0 else 0,
+        "next_cursor": next_cursor,
     }
 
 
@@ -412,7 +568,9 @@ def mark_submission_read(
     if not submission or submission.contact_form_id != id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found")
 
-    submission.read = True
+    if not submission.read:
+        submission.read = True
+        form.unread_count = ContactForm.unread_count - 1
     db.commit()
     db.refresh(submission)
 
@@ -424,3 +582,50 @@ def mark_submission_read(
             "read": submission.read
         }
     }
+
+
+@router.post("/{id}/submissions/bulk", response_model=dict)
+def bulk_update_form_submissions(
+    id: int,
+    action_data: SubmissionBulkAction,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Mark as read or archive many submissions at once (supplier owner or admin only).
+    Targets a list of submission ids, or every submission older than a given one (before_id).
+    Runs as set-based UPDATEs in a single transaction.
+    """
+    form = db.get(ContactForm, id)
+    if not form:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact form not found")
+
+    # Check ownership or admin
+    supplier = db.get(Supplier, form.supplier_id)
+    if supplier.user_id != current_user.id and current_user.type != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only update submissions for your own contact form"
+        )
+
+    result = bulk_update_submissions(
+        db,
+        form,
+        action_data.action,
+        submission_ids=action_data.submission_ids,
+        before_id=action_data.before_id,
+    )
+    db.commit()
+    db.refresh(form)
+
+    return {
+        "success": True,
+        "message": f"{result['updated']} submission(s) updated",
+        "data": {
+            "action": action_data.action,
+            "updated": result["updated"],
+            "results": result["results"],
+            "total": form.submissions_count,
+            "unread_count": form.unread_count,
+        }
+    }
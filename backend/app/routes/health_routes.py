@@ -0,0 +1,23 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from app.services.health_service import readiness
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live")
+async def liveness():
+    """Liveness probe: the process is up and serving (no I/O)."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def readiness_probe():
+    """
+    Readiness probe: database answers in bounded time, the upload volume has free
+    space and the connection pool isn't exhausted. Cached for a couple of seconds.
+    Returns 503 when the instance should be taken out of rotation.
+    """
+    result = readiness.get()
+    code = status.HTTP_200_OK if result["status"] == "ok" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=code, content=result)
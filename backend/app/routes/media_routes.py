@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, UploadFile, File, Form
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
@@ -7,16 +7,18 @@ from app.models.supplier_model import Supplier
 from app.schemas.media_schema import MediaCreate, MediaResponse
 from app.utils.auth_dependency import get_current_user
 from app.models.user_model import User
+from app.core.write_executor import run_write
+from app.core.response_cache import response_cache
 import os
+import shutil
 import uuid
 from pathlib import Path
 from typing import Literal
 
 router = APIRouter(prefix="/media", tags=["media"])
 
-# Create uploads directory if it doesn't exist
+# Created at startup (app.main.create_app)
 UPLOAD_DIR = Path("uploads/media")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 # Allowed file extensions by type
 ALLOWED_EXTENSIONS = {
@@ -40,7 +42,7 @@ def validate_file_type(file: UploadFile, expected_type: str) -> bool:
 
 
 @router.post("/upload", response_model=dict)
-async def upload_media_file(
+def upload_media_file(
     supplier_id: int = Form(...),
     media_type: Literal["image", "video", "document"] = Form(...),
     file: UploadFile = File(...),
@@ -50,6 +52,7 @@ async def upload_media_file(
     """
     Upload a media file for a supplier (supplier owner only).
     Limits: 20 images, 5 videos, 10 documents per supplier.
+    Sync endpoint: the queries and the file copy run in the threadpool, not on the event loop.
     """
     # Verify supplier exists
     supplier = db.get(Supplier, supplier_id)
@@ -97,8 +100,7 @@ async def upload_media_file(
     # Save file
     try:
         with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+            shutil.copyfileobj(file.file, buffer)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -109,19 +111,23 @@ async def upload_media_file(
     file_url = f"/uploads/media/{unique_filename}"
 
     # Create media record
-    new_media = Media(
-        supplier_id=supplier_id,
-        type=media_type,
-        url=file_url
-    )
-    db.add(new_media)
-    db.commit()
-    db.refresh(new_media)
+    def create(session: Session):
+        new_media = Media(
+            supplier_id=supplier_id,
+            type=media_type,
+            url=file_url
+        )
+        session.add(new_media)
+        session.flush()
+        session.refresh(new_media)
+        return MediaResponse.model_validate(new_media)
     
+    data = run_write(db, create)
+    response_cache.invalidate(f"media:{supplier_id}")
     return {
         "success": True,
         "message": "Media uploaded successfully",
-        "data": MediaResponse.model_validate(new_media)
+        "data": data
     }
 
 
@@ -183,6 +189,7 @@ def create_media(
     db.add(new_media)
     db.commit()
     db.refresh(new_media)
+    response_cache.invalidate(f"media:{new_media.supplier_id}")
     return {
         "success": True,
         "message": "Media uploaded successfully",
@@ -193,14 +200,19 @@ def create_media(
 @router.get("/supplier/{supplier_id}")
 def list_supplier_media(
     supplier_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     type_filter: str | None = Query(None, description="Filter by type: image, video, or document"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=50),
 ):
     """
-    List media for a specific supplier (public endpoint).
+    List media for a specific supplier (public endpoint, response-cached).
     """
+    cached = response_cache.get(request)
+    if cached is not None:
+        return cached
+
     # Verify supplier exists
     supplier = db.get(Supplier, supplier_id)
     if not supplier:
@@ -227,14 +239,14 @@ def list_supplier_media(
 
     data = [MediaResponse.model_validate(m) for m in media_items]
 
-    return {
+    return response_cache.put(request, {
         "success": True,
         "data": data,
         "total": total,
         "page": page,
         "page_size": page_size,
         "total_pages": (total + page_size - 1) // page_size if page_size > 0 else 0,
-    }
+    }, tags=[f"media:{supplier_id}"])
 
 
 @router.delete("/{id}")
@@ -264,6 +276,7 @@ def delete_media(
 
     db.delete(media)
     db.commit()
+    response_cache.invalidate(f"media:{supplier.id}")
     return {
         "success": True,
         "message": "Media deleted successfully"
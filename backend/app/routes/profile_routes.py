@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.core.profiler import profile_store
+from app.utils.auth_dependency import get_current_user
+from app.models.user_model import User
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+@router.get("")
+def list_profiles(current_user: User = Depends(get_current_user)):
+    """
+    List stored request profiles, newest first (admin only).
+    Profiles are recorded for admin requests sent with the header "X-Profile: 1".
+    """
+    if current_user.type != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return {
+        "success": True,
+        "data": profile_store.list(),
+    }
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, current_user: User = Depends(get_current_user)):
+    """Get a stored request profile by the ID returned in X-Profile-Id (admin only)."""
+    if current_user.type != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    report = profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return {
+        "success": True,
+        "data": report,
+    }
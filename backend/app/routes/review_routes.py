@@ -1,19 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from datetime import datetime, timedelta
-from app.database import get_db
+from typing import Literal
+from app.database import get_db, get_async_db, ReadSessionLocal
 from app.models.review_model import Review
 from app.models.supplier_model import Supplier
-from app.schemas.review_schema import ReviewCreate, ReviewResponse, ReviewWithUser, ReviewUpdate
-from app.utils.auth_dependency import get_current_user
+from app.schemas.review_schema import ReviewCreate, ReviewResponse, ReviewWithUser, ReviewUpdate, ReviewBulkModeration
+from app.utils.auth_dependency import get_current_user, get_current_user_async
 from app.models.user_model import User
 from app.core.middleware import review_rate_limit
 from app.utils.sanitize import sanitize_html
-from app.services.review_service import calculate_average_rating
+from app.core.write_executor import run_write
+from app.core.response_cache import etag_matches, response_cache
+from app.services.review_service import (
+    calculate_average_rating,
+    bulk_moderate_reviews,
+    fetch_page_with_total_async,
+    approved_review_items,
+    recent_approved_reviews,
+    apply_rating_changes,
+    claim_pending_reviews,
+    release_claims,
+    is_claimed_by_other,
+    claim_available_to,
+    screen_review,
+    rating_summaries,
+)
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
 
+def _moderation_feed_select():
+    """Reviews joined with user and supplier names, selecting only the columns the admin feeds return."""
+    return (
+        select(
+            Review.id,
+            Review.user_id,
+            User.name.label("user_name"),
+            Review.supplier_id,
+            Supplier.fantasy_name.label("supplier_name"),
+            Review.rating,
+            Review.comment,
+            Review.status,
+            Review.created_at,
+            Review.claimed_by,
+            Review.claim_expires_at,
+            Review.risk_score,
+            Review.risk_flags,
+        )
+        .join(User, Review.user_id == User.id)
+        .join(Supplier, Review.supplier_id == Supplier.id)
+    )
+
+
+def _auto_approve(db: Session, review: Review) -> None:
+    """Approve a freshly screened review through the regular moderation path (keeps histograms in sync)."""
+    bulk_moderate_reviews(db, "approve", review_ids=[review.id])
+    db.expire(review, ["status"])
+
+
+def _moderation_feed_item(r) -> dict:
+    return {
+        "id": r.id,
+        "user_id": r.user_id,
+        "user_name": r.user_name,
+        "supplier_id": r.supplier_id,
+        "supplier_name": r.supplier_name,
+        "rating": r.rating,
+        "comment": r.comment,
+        "status": r.status,
+        "created_at": r.created_at,
+        "claimed_by": r.claimed_by,
+        "claim_expires_at": r.claim_expires_at,
+        "risk_score": r.risk_score,
+        "risk_flags": r.risk_flags.split(",") if r.risk_flags else [],
+    }
+
+
 @router.post("", response_model=dict)
 @review_rate_limit
 def create_review(
@@ -24,7 +90,8 @@ def create_review(
 ):
     """
     Create a new review (authenticated users only).
-    Reviews start with status="pending" and need admin approval.
+    Reviews start with status="pending" and need admin approval, unless the
+    pre-screening risk score is below REVIEW_AUTO_APPROVE_BELOW.
     Rate limited: 10 reviews per hour per user.
     """
     # Verify supplier exists
@@ -32,38 +99,81 @@ def create_review(
     if not supplier:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Supplier not found")
 
-    # Check if user already reviewed this supplier
-    existing_review = db.query(Review).filter(
-        Review.user_id == current_user.id,
-        Review.supplier_id == review_data.supplier_id
-    ).first()
-    if existing_review:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You have already reviewed this supplier"
+    comment = sanitize_html(review_data.comment)  # Sanitize HTML to prevent XSS
+
+    def create(session: Session):
+        # Check if user already reviewed this supplier
+        existing_review = session.query(Review.id).filter(
+            Review.user_id == current_user.id,
+            Review.supplier_id == review_data.supplier_id
+        ).first()
+        if existing_review:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You have already reviewed this supplier"
+            )
+
+        new_review = Review(
+            user_id=current_user.id,
+            supplier_id=review_data.supplier_id,
+            rating=review_data.rating,
+            comment=comment,
+            status="pending"
         )
+        auto_approve = screen_review(new_review)
+        session.add(new_review)
+        session.flush()
+        if auto_approve:
+            _auto_approve(session, new_review)
+        session.refresh(new_review)
+        return ReviewResponse.model_validate(new_review), auto_approve
+
+    data, auto_approve = run_write(db, create)
+    if auto_approve:
+        recent_approved_reviews.add(approved_review_items(db, review_ids=[data.id]))
+    return {
+        "success": True,
+        "message": "Review published successfully." if auto_approve else "Review submitted successfully. Awaiting moderation.",
+        "data": data
+    }
+
+
+@router.get("/summary")
+def get_reviews_summary(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    supplier_ids: str = Query(..., description="Comma-separated supplier IDs (max 500)"),
+):
+    """
+    Rating summary (average, count, distribution) for many suppliers at once (public endpoint).
+    Useful for comparison views and favorites: one request regardless of the number of suppliers.
+    Unknown supplier ids are listed in "not_found".
+    """
+    try:
+        ids = sorted({int(i) for i in supplier_ids.split(",") if i.strip()})
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="supplier_ids must be comma-separated integers")
+    if not ids or len(ids) > 500:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide between 1 and 500 supplier ids")
+
+    summaries, etag = rating_summaries.get(db, ids)
+    headers = {"ETag": etag, "Cache-Control": response_cache.cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
 
-    new_review = Review(
-        user_id=current_user.id,
-        supplier_id=review_data.supplier_id,
-        rating=review_data.rating,
-        comment=sanitize_html(review_data.comment),  # Sanitize HTML to prevent XSS
-        status="pending"
-    )
-    db.add(new_review)
-    db.commit()
-    db.refresh(new_review)
     return {
         "success": True,
-        "message": "Review submitted successfully. Awaiting moderation.",
-        "data": ReviewResponse.model_validate(new_review)
+        "data": {str(supplier_id): summary for supplier_id, summary in summaries.items()},
+        "not_found": [supplier_id for supplier_id in ids if supplier_id not in summaries],
     }
 
 
 @router.get("/supplier/{supplier_id}")
-def list_supplier_reviews(
+async def list_supplier_reviews(
     supplier_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
 ):
@@ -72,32 +182,35 @@ def list_supplier_reviews(
     Only shows reviews with status="approved".
     """
     # Verify supplier exists
-    supplier = db.get(Supplier, supplier_id)
-    if not supplier:
+    supplier_exists = await db.scalar(select(Supplier.id).where(Supplier.id == supplier_id))
+    if not supplier_exists:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Supplier not found")
 
-    # Query only approved reviews
-    query = db.query(Review).filter(
-        Review.supplier_id == supplier_id,
-        Review.status == "approved"
-    )
-
-    total = query.count()
-    reviews = (
-        query.order_by(Review.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    # Query only approved reviews, joined with the user name (no per-row lazy loads)
+    stmt = (
+        select(
+            Review.id,
+            Review.rating,
+            Review.comment,
+            Review.created_at,
+            User.name.label("user_name"),
+        )
+        .join(User, Review.user_id == User.id)
+        .where(
+            Review.supplier_id == supplier_id,
+            Review.status == "approved"
+        )
+        .order_by(Review.created_at.desc())
     )
+    reviews, total = await fetch_page_with_total_async(db, stmt, page, page_size)
 
-    # Build response with user names
     data = [
         {
             "id": r.id,
             "rating": r.rating,
             "comment": r.comment,
             "created_at": r.created_at,
-            "user_name": r.user.name
+            "user_name": r.user_name
         }
         for r in reviews
     ]
@@ -113,42 +226,31 @@ def list_supplier_reviews(
 
 
 @router.get("/pending")
-def list_pending_reviews(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def list_pending_reviews(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
+    unclaimed_only: bool = Query(False, description="Hide reviews leased to other moderators"),
+    sort: Literal["oldest", "risk"] = Query("oldest", description="oldest first, or highest risk score first"),
 ):
     """
     List pending reviews awaiting moderation (admin only).
+    To split work between moderators, prefer POST /reviews/pending/claim.
     """
     if current_user.type != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
 
-    query = db.query(Review).filter(Review.status == "pending")
+    stmt = _moderation_feed_select().where(Review.status == "pending")
+    if unclaimed_only:
+        stmt = stmt.where(claim_available_to(current_user.id))
+    if sort == "risk":
+        stmt = stmt.order_by(Review.risk_score.desc(), Review.created_at.asc())
+    else:
+        stmt = stmt.order_by(Review.created_at.asc())
+    reviews, total = await fetch_page_with_total_async(db, stmt, page, page_size)
 
-    total = query.count()
-    reviews = (
-        query.order_by(Review.created_at.asc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
-
-    data = [
-        {
-            "id": r.id,
-            "user_id": r.user_id,
-            "user_name": r.user.name,
-            "supplier_id": r.supplier_id,
-            "supplier_name": r.supplier.fantasy_name,
-            "rating": r.rating,
-            "comment": r.comment,
-            "status": r.status,
-            "created_at": r.created_at,
-        }
-        for r in reviews
-    ]
+    data = [_moderation_feed_item(r) for r in reviews]
 
     return {
         "success": True,
@@ -160,10 +262,59 @@ def list_pending_reviews(
     }
 
 
-@router.get("/all")
-def list_all_reviews(
+@router.post("/pending/claim", response_model=dict)
+def claim_reviews(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    limit: int = Query(10, ge=1, le=50, description="Number of reviews to lease"),
+    ttl_seconds: int = Query(300, ge=30, le=3600, description="Lease duration in seconds"),
+):
+    """
+    Lease the next pending reviews to the current admin (admin only).
+    Other admins won't receive them until they are moderated, released or the lease expires.
+    """
+    if current_user.type != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    claimed_ids = claim_pending_reviews(db, current_user.id, limit, ttl_seconds)
+    db.commit()
+
+    reviews = []
+    if claimed_ids:
+        reviews = db.execute(
+            _moderation_feed_select()
+            .where(Review.id.in_(claimed_ids))
+            .order_by(Review.created_at.asc())
+        ).all()
+
+    return {
+        "success": True,
+        "data": [_moderation_feed_item(r) for r in reviews],
+        "total": len(reviews),
+    }
+
+
+@router.post("/pending/release", response_model=dict)
+def release_reviews(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Give back every review leased to the current admin (admin only)."""
+    if current_user.type != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    released = release_claims(db, current_user.id)
+    db.commit()
+    return {
+        "success": True,
+        "message": f"{released} review(s) released",
+    }
+
+
+@router.get("/all")
+async def list_all_reviews(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
     status_filter: str = Query(None, description="Filter by status: pending, approved, rejected, or all"),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
@@ -174,7 +325,7 @@ def list_all_reviews(
     if current_user.type != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
 
-    query = db.query(Review)
+    stmt = _moderation_feed_select()
     
     # Apply status filter if provided
     if status_filter and status_filter.lower() != "all":
@@ -184,30 +335,11 @@ def list_all_reviews(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid status filter. Must be one of: {', '.join(valid_statuses)}, or 'all'"
             )
-        query = query.filter(Review.status == status_filter.lower())
-
-    total = query.count()
-    reviews = (
-        query.order_by(Review.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
+        stmt = stmt.where(Review.status == status_filter.lower())
 
-    data = [
-        {
-            "id": r.id,
-            "user_id": r.user_id,
-            "user_name": r.user.name,
-            "supplier_id": r.supplier_id,
-            "supplier_name": r.supplier.fantasy_name,
-            "rating": r.rating,
-            "comment": r.comment,
-            "status": r.status,
-            "created_at": r.created_at,
-        }
-        for r in reviews
-    ]
+    reviews, total = await fetch_page_with_total_async(db, stmt.order_by(Review.created_at.desc()), page, page_size)
+
+    data = [_moderation_feed_item(r) for r in reviews]
 
     return {
         "success": True,
@@ -239,13 +371,20 @@ def approve_review(
             detail=f"Review is already {review.status}"
         )
 
-    review.status = "approved"
+    # Conditional UPDATE (status still pending) so concurrent approvals count once in the histogram
+    if is_claimed_by_other(review, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Review is being moderated by another admin"
+        )
+
+    result = bulk_moderate_reviews(db, "approve", review_ids=[review.id], moderator_id=current_user.id)
+    if not result["updated"]:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Review was already moderated")
     db.commit()
     db.refresh(review)
-    
-    # Recalculate average rating for the supplier
-    # Note: We calculate dynamically, so no need to store in supplier model for MVP
-    # This could be optimized later with a cached field
+    recent_approved_reviews.add(approved_review_items(db, review_ids=[review.id]))
     
     return {
         "success": True,
@@ -274,7 +413,16 @@ def reject_review(
             detail=f"Review is already {review.status}"
         )
 
-    review.status = "rejected"
+    if is_claimed_by_other(review, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Review is being moderated by another admin"
+        )
+
+    result = bulk_moderate_reviews(db, "reject", review_ids=[review.id], moderator_id=current_user.id)
+    if not result["updated"]:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Review was already moderated")
     db.commit()
     db.refresh(review)
     
@@ -288,6 +436,43 @@ def reject_review(
     }
 
 
+@router.post("/bulk-moderate", response_model=dict)
+def bulk_moderate(
+    moderation_data: ReviewBulkModeration,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Approve or reject many pending reviews at once (admin only).
+    Targets a list of review ids, or every pending review older than a given one (before_id).
+    Runs as one set-based UPDATE in a single transaction.
+    """
+    if current_user.type != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    result = bulk_moderate_reviews(
+        db,
+        moderation_data.action,
+        review_ids=moderation_data.review_ids,
+        before_id=moderation_data.before_id,
+        moderator_id=current_user.id,
+    )
+    db.commit()
+
+    if moderation_data.action == "approve" and result["updated_ids"]:
+        recent_approved_reviews.add(approved_review_items(db, review_ids=result["updated_ids"]))
+
+    return {
+        "success": True,
+        "message": f"{result['updated']} review(s) updated",
+        "data": {
+            "action": moderation_data.action,
+            "updated": result["updated"],
+            "results": result["results"],
+        }
+    }
+
+
 @router.put("/{id}", response_model=dict)
 def update_review(
     id: int,
@@ -319,6 +504,10 @@ def update_review(
                 detail="Review can only be edited within 24 hours of creation"
             )
     
+    # An approved review leaves the supplier's histogram until it is approved again
+    if review.status == "approved":
+        apply_rating_changes(db, {review.supplier_id: {review.rating: -1}})
+
     # Update fields
     update_data = review_data.model_dump(exclude_unset=True)
     if "rating" in update_data:
@@ -326,11 +515,18 @@ def update_review(
     if "comment" in update_data:
         review.comment = sanitize_html(update_data["comment"])  # Sanitize HTML
     
-    # After edit, status returns to "pending" for re-approval
+    # After edit, status returns to "pending" for re-approval (unless it passes pre-screening)
     review.status = "pending"
+    auto_approve = screen_review(review)
+    db.flush()
+    if auto_approve:
+        _auto_approve(db, review)
     
     db.commit()
     db.refresh(review)
+    recent_approved_reviews.remove(review.id)
+    if auto_approve:
+        recent_approved_reviews.add(approved_review_items(db, review_ids=[review.id]))
     
     return {
         "success": True,
@@ -361,8 +557,12 @@ def delete_review(
         )
     
     supplier_id = review.supplier_id
+    review_id = review.id
+    if review.status == "approved":
+        apply_rating_changes(db, {supplier_id: {review.rating: -1}})
     db.delete(review)
     db.commit()
+    recent_approved_reviews.remove(review_id)
     
     # Recalculate average rating for the supplier
     # Note: We calculate dynamically, so no need to store in supplier model for MVP
@@ -374,38 +574,37 @@ def delete_review(
 
 
 @router.get("/approved")
-def list_approved_reviews(
-    db: Session = Depends(get_db),
+async def list_approved_reviews(
+    request: Request,
+    response: Response,
     limit: int = Query(10, ge=1, le=50, description="Maximum number of reviews to return"),
 ):
     """
     List recent approved reviews from all suppliers (public endpoint).
     Useful for homepage carousel.
+    Served from an in-memory buffer kept up to date by moderation; supports
+    conditional GETs via ETag / If-None-Match. Only a cold buffer touches the
+    database (in the threadpool).
     """
-    reviews = (
-        db.query(Review)
-        .filter(Review.status == "approved")
-        .order_by(Review.created_at.desc())
-        .limit(limit)
-        .all()
-    )
-
-    # Build response with user and supplier names
-    data = [
-        {
-            "id": r.id,
-            "rating": r.rating,
-            "comment": r.comment,
-            "created_at": r.created_at,
-            "user_name": r.user.name,
-            "supplier_id": r.supplier_id,
-            "supplier_name": r.supplier.fantasy_name,
-        }
-        for r in reviews
-    ]
+    cached = recent_approved_reviews.peek(limit)
+    if cached is None:
+        cached = await run_in_threadpool(_load_approved_reviews, limit)
+    data, etag = cached
+    headers = {"ETag": etag, "Cache-Control": response_cache.cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
 
     return {
         "success": True,
         "data": data,
         "total": len(data),
-    }
\ No newline at end of file
+    }
+
+
+def _load_approved_reviews(limit: int):
+    db = ReadSessionLocal()
+    try:
+        return recent_approved_reviews.get(db, limit)
+    finally:
+        db.close()
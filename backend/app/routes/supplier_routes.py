@@ -1,123 +1,203 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from anyio import to_thread
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func, case
-from app.database import get_db
+from sqlalchemy import or_, func, case, select
+from app.database import get_db, AsyncSessionLocal
 from app.models.supplier_model import Supplier
 from app.models.category_model import Category
 from app.models.review_model import Review
 from app.models.contact_form_model import ContactForm
 from app.schemas.supplier_schema import SupplierCreate, SupplierUpdate, SupplierResponse
 from app.utils.auth_dependency import get_current_user
-from app.utils.default_contact_form import get_default_contact_form_questions
 from app.models.user_model import User
 from app.utils.sanitize import sanitize_html
-from app.services.supplier_service import calculate_completeness_score
-import random
-import json
+from app.services.supplier_service import calculate_completeness_score, category_facets, rating_listings
+from app.services.catalog_snapshot import catalog_snapshot
+from app.core.response_cache import response_cache
+from app.core.single_flight import SingleFlight
+from app.services.contact_form_service import use_default_template
+from app.services.review_service import (
+	recent_approved_reviews,
+	rating_summaries,
+	get_rating_distributions,
+	get_rating_distributions_async,
+)
+from random import shuffle
 import json
 
 router = APIRouter(prefix="/fornecedores", tags=["suppliers"])
 
+# Identical concurrent catalog queries (listing pages, supplier pages) run once and share the result.
+# Writes that invalidate cached responses also drop finished results still in their grace window.
+supplier_flights = SingleFlight("single_flight_suppliers")
+response_cache.on_invalidate(supplier_flights.clear)
+
 @router.get("/")
-def list_suppliers(
-    db: Session = Depends(get_db),
-    city: str | None = Query(None, description="Filter by city"),
-    state: str | None = Query(None, description="Filter by state"),
-    category_id: int | None = Query(None, description="Filter by category ID"),
-    price_range: str | None = Query(None, description="Filter by price range"),
-    search: str | None = Query(None, description="Search by name, description, or city"),
-    order_by: str = Query("created_at", description="Order by: 'created_at' or 'rating'"),
-    random: bool = Query(False, description="Return random suppliers"),
-    page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(10, ge=1, le=50, description="Items per page"),
+async def list_suppliers(
+	city: str | None = Query(None, description="Filter by city"),
+	state: str | None = Query(None, description="Filter by state"),
+	category_id: int | None = Query(None, description="Filter by category ID"),
+	price_range: str | None = Query(None, description="Filter by price range"),
+	search: str | None = Query(None, description="Search by name, description, or city"),
+	order_by: str = Query("created_at", description="Order by: 'created_at' or 'rating'"),
+	random: bool = Query(False, description="Return random suppliers"),
+	page: int = Query(1, ge=1, description="Page number"),
+	page_size: int = Query(10, ge=1, le=50, description="Items per page"),
 ):
-    """
-    List suppliers with optional filters and pagination.
-    Only returns suppliers with status='active'.
-    Ordering options: 'created_at' (default, newest first) or 'rating' (highest rating first).
-    """
-    # Calculate average rating for each supplier (only approved reviews)
-    avg_rating_subquery = (
-        db.query(
-            Review.supplier_id,
-            func.avg(Review.rating).label('avg_rating')
-        )
-        .filter(Review.status == "approved")
-        .group_by(Review.supplier_id)
-        .subquery()
-    )
-    
-    # Base query with left join to get average rating
-    query = (
-        db.query(
-            Supplier,
-            func.coalesce(avg_rating_subquery.c.avg_rating, 0).label('avg_rating')
-        )
-        .outerjoin(avg_rating_subquery, Supplier.id == avg_rating_subquery.c.supplier_id)
-        .filter(Supplier.status == "active")
-    )
-
-    # Apply filters
-    if city:
-        query = query.filter(Supplier.city.ilike(f"%{city}%"))
-    if state:
-        query = query.filter(Supplier.state.ilike(f"%{state}%"))
-    if category_id is not None:
-        query = query.filter(Supplier.category_id == category_id)
-    if price_range:
-        query = query.filter(Supplier.price_range == price_range)
-    
-    # Search by name, description, or city
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Supplier.fantasy_name.ilike(search_term),
-                Supplier.description.ilike(search_term),
-                Supplier.city.ilike(search_term)
-            )
-        )
-
-    total = query.count()
-    
-    # Apply ordering
-    if random:
-        # For random, we'll shuffle after getting results
-        results = query.all()
-        random.shuffle(results)
-        # Apply pagination manually
-        start = (page - 1) * page_size
-        end = start + page_size
-        results = results[start:end]
-        suppliers = [r[0] for r in results]  # Extract Supplier from tuple
-    else:
-        if order_by == "rating":
-            # Order by average rating (highest first), then by created_at
-            query = query.order_by(
-                func.coalesce(avg_rating_subquery.c.avg_rating, 0).desc(),
-                Supplier.created_at.desc()
-            )
-        else:
-            # Default: order by created_at (newest first)
-            query = query.order_by(Supplier.created_at.desc())
-        
-        results = (
-            query.offset((page - 1) * page_size)
-            .limit(page_size)
-            .all()
-        )
-        suppliers = [r[0] for r in results]  # Extract Supplier from tuple
-
-    data = [SupplierResponse.model_validate(supplier) for supplier in suppliers]
-
-    return {
-        "success": True,
-        "data": data,
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size if page_size > 0 else 0,
-    }
+	"""
+	List suppliers with optional filters and pagination.
+	Only returns suppliers with status='active'.
+	Ordering options: 'created_at' (default, newest first) or 'rating' (highest rating first).
+	Async endpoint: waits on the database without holding a threadpool thread.
+	Concurrent identical requests share one computation (single flight); rating-ordered
+	pages are additionally served stale-while-revalidate. With a catalog snapshot
+	(CATALOG_SNAPSHOT_PATH), filtering and ordering run over the shared snapshot.
+	"""
+	filters = (city, state, category_id, price_range, search)
+	start = (page - 1) * page_size
+	snapshot = catalog_snapshot.current()
+	if random and snapshot is not None and not search:
+		# Shuffle the matching ids from the snapshot: only the page is read from the database
+		ids = await _select_snapshot_ids(snapshot, city, state, category_id, price_range)
+		shuffle(ids)
+		total = len(ids)
+		data = await _load_suppliers_by_ids(ids[start:start + page_size])
+	elif random:
+		# Every caller gets its own shuffle: only the matching rows are shared
+		rows, total = await supplier_flights.do(("all", filters), lambda: _load_supplier_rows(filters))
+		rows = list(rows)
+		shuffle(rows)
+		data = rows[start:start + page_size]
+	else:
+		key = ("page", filters, order_by, page, page_size)
+		async def load():
+			return await supplier_flights.do(key, lambda: _load_supplier_rows(filters, order_by, page, page_size))
+
+		if order_by == "rating":
+			data, total = await rating_listings.get_async(key, load)
+		else:
+			data, total = await load()
+
+	return {
+		"success": True,
+		"data": data,
+		"total": total,
+		"page": page,
+		"page_size": page_size,
+		"total_pages": (total + page_size - 1) // page_size if page_size > 0 else 0,
+	}
+
+
+async def _select_snapshot_ids(snapshot, city, state, category_id, price_range, order_by: str = "created_at"):
+	"""Matching ids from the snapshot, scanned in the threadpool (never on the event loop)."""
+	return await to_thread.run_sync(snapshot.select, city, state, category_id, price_range, order_by)
+
+
+async def _load_supplier_rows(filters, order_by: str | None = None, page: int | None = None, page_size: int | None = None):
+	"""
+	Run the listing query in its own session (it may be shared by many requests).
+	Without order_by/page, returns every matching supplier, unordered (for random listings).
+
+	Returns:
+		tuple[list[SupplierResponse], int]: (suppliers with rating_distribution, total matching)
+	"""
+	city, state, category_id, price_range, search = filters
+	snapshot = catalog_snapshot.current()
+	if snapshot is not None and page is not None and not search:
+		# Search also matches descriptions, which the snapshot doesn't carry
+		ids = await _select_snapshot_ids(
+			snapshot, city, state, category_id, price_range, "rating" if order_by == "rating" else "created_at"
+		)
+		return await _load_suppliers_by_ids(ids[(page - 1) * page_size:page * page_size]), len(ids)
+
+	# Calculate average rating for each supplier (only approved reviews)
+	avg_rating_subquery = (
+		select(
+			Review.supplier_id,
+			func.avg(Review.rating).label('avg_rating')
+		)
+		.where(Review.status == "approved")
+		.group_by(Review.supplier_id)
+		.subquery()
+	)
+	
+	# Base query with left join to get average rating
+	stmt = (
+		select(
+			Supplier,
+			func.coalesce(avg_rating_subquery.c.avg_rating, 0).label('avg_rating')
+		)
+		.outerjoin(avg_rating_subquery, Supplier.id == avg_rating_subquery.c.supplier_id)
+		.where(Supplier.status == "active")
+	)
+
+	# Apply filters
+	if city:
+		stmt = stmt.where(Supplier.city.ilike(f"%{city}%"))
+	if state:
+		stmt = stmt.where(Supplier.state.ilike(f"%{state}%"))
+	if category_id is not None:
+		stmt = stmt.where(Supplier.category_id == category_id)
+	if price_range:
+		stmt = stmt.where(Supplier.price_range == price_range)
+	
+	# Search by name, description, or city
+	if search:
+		search_term = f"%{search}%"
+		stmt = stmt.where(
+			or_(
+				Supplier.fantasy_name.ilike(search_term),
+				Supplier.description.ilike(search_term),
+				Supplier.city.ilike(search_term)
+			)
+		)
+
+	async with AsyncSessionLocal() as db:
+		if page is None:
+			results = (await db.execute(stmt)).all()
+			total = len(results)
+		else:
+			total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+			if order_by == "rating":
+				# Order by average rating (highest first), then by created_at
+				stmt = stmt.order_by(
+					func.coalesce(avg_rating_subquery.c.avg_rating, 0).desc(),
+					Supplier.created_at.desc(),
+					Supplier.id.desc()
+				)
+			else:
+				# Default: order by created_at (newest first); id breaks ties, as in the catalog snapshot
+				stmt = stmt.order_by(Supplier.created_at.desc(), Supplier.id.desc())
+			results = (
+				await db.execute(
+					stmt.offset((page - 1) * page_size)
+					.limit(page_size)
+				)
+			).all()
+		suppliers = [r[0] for r in results]  # Extract Supplier from tuple
+
+		# Rating histograms for the whole page in one query
+		distributions = await get_rating_distributions_async(db, [supplier.id for supplier in suppliers])
+	return _supplier_responses(suppliers, distributions), total
+
+
+async def _load_suppliers_by_ids(ids: list[int]) -> list[SupplierResponse]:
+	"""Suppliers of a snapshot page, in the given order (skipping any deactivated since the snapshot)."""
+	async with AsyncSessionLocal() as db:
+		rows = (await db.scalars(select(Supplier).where(Supplier.id.in_(ids), Supplier.status == "active"))).all()
+		by_id = {supplier.id: supplier for supplier in rows}
+		suppliers = [by_id[supplier_id] for supplier_id in ids if supplier_id in by_id]
+		distributions = await get_rating_distributions_async(db, [supplier.id for supplier in suppliers])
+	return _supplier_responses(suppliers, distributions)
+
+
+def _supplier_responses(suppliers, distributions) -> list[SupplierResponse]:
+	data = []
+	for supplier in suppliers:
+		item = SupplierResponse.model_validate(supplier)
+		item.rating_distribution = distributions[supplier.id]
+		data.append(item)
+	return data
 
 @router.get("/me", response_model=dict)
 def get_my_supplier(
@@ -153,25 +233,14 @@ def get_my_supplier(
 	)
 	
 	# Get contact form to count submissions
-	from app.models.contact_form_model import ContactForm, ContactFormSubmission
 	contact_form = db.query(ContactForm).filter(ContactForm.supplier_id == supplier.id).first()
 	
 	total_submissions = 0
 	unread_submissions = 0
 	if contact_form:
-		total_submissions = (
-			db.query(func.count(ContactFormSubmission.id))
-			.filter(ContactFormSubmission.contact_form_id == contact_form.id)
-			.scalar()
-		)
-		unread_submissions = (
-			db.query(func.count(ContactFormSubmission.id))
-			.filter(
-				ContactFormSubmission.contact_form_id == contact_form.id,
-				ContactFormSubmission.read == False
-			)
-			.scalar()
-		)
+		# Denormalized counters maintained by submit / mark-read
+		total_submissions = contact_form.submissions_count
+		unread_submissions = contact_form.unread_count
 	
 	# Calculate completeness score
 	completeness = calculate_completeness_score(supplier)
@@ -212,17 +281,51 @@ def get_my_supplier(
 		}
 	}
 
-@router.get("/{id}", response_model=dict)
-def get_supplier(id: int, db: Session = Depends(get_db)):
-	"""Get a single supplier by ID (public endpoint)."""
-	supplier = db.query(Supplier).filter(Supplier.id == id).first()
-	if not supplier:
-		raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Supplier not found")
+@router.get("/rating-distributions", response_model=dict)
+def get_suppliers_rating_distributions(
+	db: Session = Depends(get_db),
+	ids: str = Query(..., description="Comma-separated supplier IDs (max 200)"),
+):
+	"""Get rating histograms for many suppliers at once (public endpoint)."""
+	try:
+		supplier_ids = sorted({int(i) for i in ids.split(",") if i.strip()})
+	except ValueError:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be comma-separated integers")
+	if not supplier_ids or len(supplier_ids) > 200:
+		raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide between 1 and 200 supplier ids")
+
+	distributions = get_rating_distributions(db, supplier_ids)
 	return {
 		"success": True,
-		"data": SupplierResponse.model_validate(supplier)
+		"data": {str(supplier_id): distribution for supplier_id, distribution in distributions.items()}
 	}
 
+@router.get("/{id}", response_model=dict)
+async def get_supplier(id: int, request: Request):
+	"""
+	Get a single supplier by ID (public endpoint).
+	Served from the response cache when possible; concurrent misses share one load (single flight).
+	"""
+	cached = response_cache.get(request)
+	if cached is not None:
+		return cached
+	data = await supplier_flights.do(("detail", id), lambda: _load_supplier(id))
+	if data is None:
+		raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Supplier not found")
+	return response_cache.put(request, {
+		"success": True,
+		"data": data
+	}, tags=[f"supplier:{id}"])
+
+async def _load_supplier(id: int) -> SupplierResponse | None:
+	async with AsyncSessionLocal() as db:
+		supplier = await db.get(Supplier, id)
+		if not supplier:
+			return None
+		data = SupplierResponse.model_validate(supplier)
+		data.rating_distribution = (await get_rating_distributions_async(db, [supplier.id]))[supplier.id]
+	return data
+
 @router.post("/", response_model=dict)
 def create_supplier(
 	supplier_data: SupplierCreate,
@@ -271,15 +374,13 @@ def create_supplier(
 	db.refresh(new_supplier)
 	
 	# Create default contact form for the supplier automatically
+	# (points to the shared default template; questions are only copied if customized)
 	try:
-		default_questions = get_default_contact_form_questions()
-		questions_json = json.dumps(default_questions)
-		
 		default_form = ContactForm(
 			supplier_id=new_supplier.id,
-			questions_json=questions_json,
 			active=True
 		)
+		use_default_template(default_form)
 		db.add(default_form)
 		db.commit()
 	except Exception as e:
@@ -289,6 +390,10 @@ def create_supplier(
 		print(f"Warning: Could not create default contact form for supplier {new_supplier.id}: {e}")
 		# Rollback only the form creation attempt, supplier is already saved
 		db.rollback()
+	# Category pages show supplier counts
+	category_facets.mark_stale()
+	rating_listings.mark_stale()
+	response_cache.invalidate("categories")
 	
 	return {
 		"success": True,
@@ -333,6 +438,11 @@ def update_supplier(
 
 	db.commit()
 	db.refresh(supplier)
+	# Carousel items carry the supplier name
+	recent_approved_reviews.invalidate()
+	category_facets.mark_stale()
+	rating_listings.mark_stale()
+	response_cache.invalidate(f"supplier:{id}", "categories")
 	return {
 		"success": True,
 		"message": "Supplier updated successfully",
@@ -355,6 +465,11 @@ def delete_supplier(
 
 	db.delete(supplier)
 	db.commit()
+	recent_approved_reviews.invalidate()
+	rating_summaries.invalidate()
+	category_facets.mark_stale()
+	rating_listings.mark_stale()
+	response_cache.invalidate(f"supplier:{id}", f"contact_form:{id}", f"media:{id}", "categories")
 	return {
 			"success": True,
 			"message": "Supplier deleted successfully"
@@ -99,3 +99,20 @@ class ContactFormSubmissionResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class SubmissionBulkAction(BaseModel):
+    """
+    Schema for bulk inbox operations.
+    Targets either explicit submission_ids or every submission older than a given one.
+    """
+    action: Literal["mark_read", "archive"]
+    submission_ids: Optional[List[int]] = Field(None, min_length=1, max_length=500)
+    before_id: Optional[int] = Field(None, ge=1, description="Apply to all submissions older than this submission id")
+
+    @model_validator(mode='after')
+    def validate_target(self):
+        """Exactly one of submission_ids / before_id must be given."""
+        if (self.submission_ids is None) == (self.before_id is None):
+            raise ValueError("Provide either 'submission_ids' or 'before_id'")
+        return self
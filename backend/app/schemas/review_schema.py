@@ -2,8 +2,8 @@
 """
 Pydantic schemas for Review validation.
 """
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List, Literal
 from datetime import datetime
 
 
@@ -44,3 +44,20 @@ class ReviewWithUser(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class ReviewBulkModeration(BaseModel):
+    """
+    Schema for bulk moderation (admin only).
+    Targets either explicit review_ids or every pending review older than a given one.
+    """
+    action: Literal["approve", "reject"]
+    review_ids: Optional[List[int]] = Field(None, min_length=1, max_length=500)
+    before_id: Optional[int] = Field(None, ge=1, description="Apply to all pending reviews older than this review id")
+
+    @model_validator(mode='after')
+    def validate_target(self):
+        """Exactly one of review_ids / before_id must be given."""
+        if (self.review_ids is None) == (self.before_id is None):
+            raise ValueError("Provide either 'review_ids' or 'before_id'")
+        return self
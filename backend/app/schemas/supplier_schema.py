@@ -8,7 +8,7 @@ Key concepts:
 - from_attributes: Allows conversion from SQLAlchemy models to Pydantic
 """
 from pydantic import BaseModel, EmailStr, HttpUrl, field_validator
-from typing import Optional
+from typing import Optional, Dict, Any
 from datetime import datetime
 from app.utils.phone_validator import validate_phone
 
@@ -147,6 +147,7 @@ class SupplierResponse(SupplierBase):
     zip_code: Optional[str] = None
     status: str
     created_at: datetime
+    rating_distribution: Optional[Dict[str, Any]] = None  # Approved reviews per star, total and average
     
     class Config:
         # This allows FastAPI to convert SQLAlchemy models to Pydantic automatically
@@ -22,6 +22,7 @@ from app.models.review_model import Review
 from app.models.contact_form_model import ContactForm
 from app.models.media_model import Media
 from app.utils.password_handler import hash_password
+from app.services.review_service import rebuild_rating_stats
 import json
 
 # Configurar Faker para português brasileiro
@@ -204,6 +205,9 @@ def seed_reviews(db: Session, users: list, suppliers: list):
             db.add(review)
             reviews.append(review)
     
+    db.commit()
+    # Histogramas de avaliações (mantidos incrementalmente pela API)
+    rebuild_rating_stats(db)
     db.commit()
     print(f"[OK] {len(reviews)} avaliações criadas")
     return reviews
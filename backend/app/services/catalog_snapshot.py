@@ -0,0 +1,288 @@
+# app/services/catalog_snapshot.py
+"""
+Read-only snapshot of the active-supplier catalog, shared by every worker through mmap.
+
+A refresher process (`python -m app.services.catalog_snapshot`) writes the
+listing-relevant fields of every active supplier to one file; each uvicorn worker
+maps that file read-only, so N workers share one copy of the catalog in the page
+cache instead of holding N copies on their heaps. Listing filters and ordering run
+over the mapping (struct.unpack_from / mmap.find, no per-row objects), and only the
+page being served is loaded from the database.
+
+Layout (little-endian, fixed width, offset-indexed):
+    header   magic "CATSNAP1", version, record count, built_at, rating index offset, strings offset
+    records  one 64-byte record per supplier, newest first (created_at desc, id desc):
+             id, category_id (0 = none), average rating, created_at (epoch), and
+             (offset, length) into the string area for fantasy_name, legal_name,
+             city key, state key and price_range (keys are lowercased)
+    index    uint32 record numbers ordered by rating desc, created_at desc
+    strings  UTF-8 bytes
+
+Rebuilds write a temporary file and os.replace() it over the old one: readers see
+either the old or the new snapshot, never a partial one. A worker notices the new
+file on its next stat (at most every CATALOG_SNAPSHOT_CHECK_SECONDS) and swaps its
+mapping; requests still reading the old mapping keep it alive until they finish.
+
+select() scans every record in Python (O(suppliers)): async callers run it in a
+thread. Results are deliberately not cached per worker: that would bring back
+the per-worker, per-filter copies of the catalog the shared mapping avoids.
+
+Settings (environment):
+    CATALOG_SNAPSHOT_PATH: Snapshot file; unset disables the snapshot (listings query the database)
+    CATALOG_SNAPSHOT_CHECK_SECONDS: How often workers look for a rebuilt file (default 1)
+    CATALOG_SNAPSHOT_MAX_AGE_SECONDS: Older snapshots are ignored, e.g. refresher down (default 300)
+    CATALOG_SNAPSHOT_REFRESH_SECONDS: Refresher rebuild interval without writes (default 30)
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import List, NamedTuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.review_model import Review
+from app.models.supplier_model import Supplier
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CATSNAP1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIdQQ")  # magic, version, count, built_at, rating_index_offset, strings_offset
+RECORD = struct.Struct("<iidd10I")  # id, category_id, rating, created_at, 5 x (offset, length)
+INDEX_ENTRY = struct.Struct("<I")
+
+# String slots in a record
+FANTASY_NAME, LEGAL_NAME, CITY_KEY, STATE_KEY, PRICE_RANGE = range(5)
+
+
+class SnapshotRecord(NamedTuple):
+    id: int
+    category_id: int | None
+    rating: float
+    created_at: float
+
+
+def build_snapshot(db: Session, path: str) -> int:
+    """
+    Write the snapshot of every active supplier to `path` (atomically replacing it).
+
+    Returns:
+        int: Number of suppliers in the snapshot
+    """
+    avg_rating = (
+        db.query(Review.supplier_id, func.avg(Review.rating).label("avg_rating"))
+        .filter(Review.status == "approved")
+        .group_by(Review.supplier_id)
+        .subquery()
+    )
+    rows = (
+        db.query(
+            Supplier.id, Supplier.category_id, func.coalesce(avg_rating.c.avg_rating, 0),
+            Supplier.created_at, Supplier.fantasy_name, Supplier.legal_name,
+            Supplier.city, Supplier.state, Supplier.price_range,
+        )
+        .outerjoin(avg_rating, Supplier.id == avg_rating.c.supplier_id)
+        .filter(Supplier.status == "active")
+        .order_by(Supplier.created_at.desc(), Supplier.id.desc())
+        .all()
+    )
+
+    strings = bytearray()
+    records = []
+    for supplier_id, category_id, rating, created_at, fantasy_name, legal_name, city, state, price_range in rows:
+        refs = []
+        for value in (fantasy_name, legal_name, (city or "").lower(), (state or "").lower(), price_range):
+            encoded = (value or "").encode("utf-8")
+            refs += [len(strings), len(encoded)]
+            strings += encoded
+        created = created_at.timestamp() if created_at is not None else 0.0
+        records.append(RECORD.pack(supplier_id, category_id or 0, float(rating), created, *refs))
+
+    # Same tie-break as the database listing: rating desc, then newest first
+    by_rating = sorted(range(len(records)), key=lambda n: -float(rows[n][2]))
+    rating_index_offset = HEADER.size + RECORD.size * len(records)
+    strings_offset = rating_index_offset + INDEX_ENTRY.size * len(records)
+    header = HEADER.pack(MAGIC, VERSION, len(records), time.time(), rating_index_offset, strings_offset)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(b"".join(records))
+        f.write(b"".join(INDEX_ENTRY.pack(n) for n in by_rating))
+        f.write(strings)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class CatalogSnapshot:
+    """One mapped snapshot file (read-only, immutable)."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.built_at, self._index_offset, self._strings_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} catalog snapshot")
+
+    @property
+    def identity(self) -> tuple:
+        """(inode, mtime): changes when the file is replaced by a rebuild."""
+        return self._stat.st_ino, self._stat.st_mtime_ns
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, n: int) -> SnapshotRecord:
+        supplier_id, category_id, rating, created_at = RECORD.unpack_from(self._map, HEADER.size + RECORD.size * n)[:4]
+        return SnapshotRecord(supplier_id, category_id or None, rating, created_at)
+
+    def string(self, n: int, slot: int) -> str:
+        offset, length = self._ref(n, slot)
+        return self._map[offset:offset + length].decode("utf-8")
+
+    def _ref(self, n: int, slot: int) -> tuple[int, int]:
+        refs = RECORD.unpack_from(self._map, HEADER.size + RECORD.size * n)[4:]
+        return self._strings_offset + refs[2 * slot], refs[2 * slot + 1]
+
+    def _contains(self, n: int, slot: int, needle: bytes) -> bool:
+        offset, length = self._ref(n, slot)
+        return self._map.find(needle, offset, offset + length) != -1
+
+    def _equals(self, n: int, slot: int, value: bytes) -> bool:
+        offset, length = self._ref(n, slot)
+        return length == len(value) and self._map[offset:offset + length] == value
+
+    def select(
+        self,
+        city: str | None = None,
+        state: str | None = None,
+        category_id: int | None = None,
+        price_range: str | None = None,
+        order_by: str = "created_at",
+    ) -> List[int]:
+        """
+        Ids of the suppliers matching the listing filters (city/state: case-insensitive
+        substring, category and price range: exact), newest first or by rating.
+        Scans every record: call it from a thread in async code.
+        """
+        if order_by == "rating":
+            order = (INDEX_ENTRY.unpack_from(self._map, self._index_offset + INDEX_ENTRY.size * i)[0] for i in range(self.count))
+        else:
+            order = range(self.count)
+        city_key = city.lower().encode("utf-8") if city else None
+        state_key = state.lower().encode("utf-8") if state else None
+        price_key = price_range.encode("utf-8") if price_range else None
+
+        ids = []
+        for n in order:
+            supplier_id, record_category = RECORD.unpack_from(self._map, HEADER.size + RECORD.size * n)[:2]
+            if category_id is not None and record_category != category_id:
+                continue
+            if city_key is not None and not self._contains(n, CITY_KEY, city_key):
+                continue
+            if state_key is not None and not self._contains(n, STATE_KEY, state_key):
+                continue
+            if price_key is not None and not self._equals(n, PRICE_RANGE, price_key):
+                continue
+            ids.append(supplier_id)
+        return ids
+
+
+class CatalogSnapshotReader:
+    """
+    The current snapshot of one file, remapped when a rebuild replaces it.
+
+    Args:
+        path: Snapshot file (None: disabled, current() is always None)
+        check_interval: Minimum seconds between two stat() calls
+        max_age: Snapshots built longer ago than this are ignored
+    """
+
+    def __init__(self, path: str | None, check_interval: float = 1.0, max_age: float = 300.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._snapshot: CatalogSnapshot | None = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self) -> CatalogSnapshot | None:
+        """The mapped snapshot, or None (disabled, not built yet, unreadable or too old)."""
+        if self.path is None:
+            return None
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            with self._lock:
+                if time.monotonic() - self._checked_at >= self.check_interval:
+                    self._reload()
+                    self._checked_at = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is None or time.time() - snapshot.built_at > self.max_age:
+            return None
+        return snapshot
+
+    def _reload(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._snapshot = None
+            return
+        current = self._snapshot
+        if current is not None and current.identity == (stat.st_ino, stat.st_mtime_ns):
+            return
+        try:
+            # Swap by assignment: readers holding the old snapshot keep its mapping until they are done
+            self._snapshot = CatalogSnapshot(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not map catalog snapshot %s: %s", self.path, e)
+
+
+catalog_snapshot = CatalogSnapshotReader(
+    os.getenv("CATALOG_SNAPSHOT_PATH") or None,
+    check_interval=float(os.getenv("CATALOG_SNAPSHOT_CHECK_SECONDS", "1")),
+    max_age=float(os.getenv("CATALOG_SNAPSHOT_MAX_AGE_SECONDS", "300")),
+)
+
+
+def run_refresher(path: str, interval: float) -> None:
+    """
+    Rebuild the snapshot every `interval` seconds, and shortly after catalog writes
+    (supplier or rating invalidations on the invalidation bus, when one is configured).
+    """
+    from app.core.invalidation_bus import invalidation_bus
+    from app.database import ReadSessionLocal
+    from app.models import user_model, category_model, media_model, contact_form_model  # noqa: F401 (mappers)
+
+    dirty = threading.Event()
+    invalidation_bus.subscribe("response.invalidate", lambda *tags: dirty.set())
+    invalidation_bus.subscribe("response.clear", lambda *tags: dirty.set())
+    invalidation_bus.start()
+    try:
+        while True:
+            started = time.perf_counter()
+            dirty.clear()
+            db = ReadSessionLocal()
+            try:
+                count = build_snapshot(db, path)
+                logger.info("Catalog snapshot: %d suppliers in %.3fs", count, time.perf_counter() - started)
+            except Exception:
+                logger.exception("Catalog snapshot rebuild failed")
+            finally:
+                db.close()
+            dirty.wait(interval)
+            time.sleep(0.2)  # Coalesce bursts of writes into one rebuild
+    finally:
+        invalidation_bus.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    snapshot_path = os.getenv("CATALOG_SNAPSHOT_PATH")
+    if not snapshot_path:
+        raise SystemExit("Set CATALOG_SNAPSHOT_PATH to the snapshot file shared with the API workers")
+    run_refresher(snapshot_path, float(os.getenv("CATALOG_SNAPSHOT_REFRESH_SECONDS", "30")))
@@ -2,12 +2,149 @@
 """
 Business logic for contact form operations.
 """
+import base64
 import json
+import logging
 import re
+import threading
+from datetime import date, datetime
 from typing import Dict, Any, List
-from app.models.contact_form_model import ContactForm
+from sqlalchemy import or_, and_, select, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session, object_session
+from app.database import SessionLocal
+from app.core.metrics import record_cache
+from app.models.contact_form_model import ContactForm, ContactFormSubmission, ContactFormAnswer, ContactFormTemplate
+from app.utils.default_contact_form import get_default_contact_form_questions
 from app.utils.phone_validator import validate_phone
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE_NAME = "default"
+
+# Text search configuration for answers on PostgreSQL ("simple": no stemming, any language)
+ANSWER_SEARCH_CONFIG = "simple"
+
+# Templates are immutable, so parsed questions can be cached for the life of the process.
+# Cached lists are shared: callers must not mutate them.
+_template_questions_cache: Dict[int, List[Dict[str, Any]]] = {}
+_default_template_id: int | None = None
+_template_lock = threading.Lock()
+
+
+def get_template_questions(template_id: int, db: Session | None = None) -> List[Dict[str, Any]]:
+    """
+    Get the parsed questions of a template, loading it from the database only once.
+    A missing template is not cached: the form gets the default questions (from code)
+    until the template id resolves again.
+    
+    Args:
+        template_id: ID of the template
+        db: Optional session used on cache miss (a short-lived one is opened otherwise)
+    """
+    questions = _template_questions_cache.get(template_id)
+    record_cache("contact_form_template", questions is not None)
+    if questions is not None:
+        return questions
+
+    session = db or SessionLocal()
+    try:
+        template = session.get(ContactFormTemplate, template_id)
+        questions = json.loads(template.questions_json) if template else None
+    finally:
+        if db is None:
+            session.close()
+    if questions is None:
+        logger.warning("Contact form template %s not found; using the default questions", template_id)
+        return get_default_contact_form_questions()
+    _template_questions_cache[template_id] = questions
+    return questions
+
+
+def get_default_template_id() -> int:
+    """
+    Get the ID of the current default template version.
+    
+    The default questions live in code (get_default_contact_form_questions). If they
+    differ from the latest stored version, a new version is stored, so new and reset
+    forms pick up template changes while existing forms keep the version they use.
+    """
+    global _default_template_id
+    if _default_template_id is not None:
+        return _default_template_id
+
+    with _template_lock:
+        if _default_template_id is not None:
+            return _default_template_id
+
+        questions = get_default_contact_form_questions()
+        # Separate session: creating the template must not commit/rollback the caller's work
+        db = SessionLocal()
+        try:
+            for _ in range(2):
+                latest = (
+                    db.query(ContactFormTemplate)
+                    .filter(ContactFormTemplate.name == DEFAULT_TEMPLATE_NAME)
+                    .order_by(ContactFormTemplate.version.desc())
+                    .first()
+                )
+                if latest is not None and json.loads(latest.questions_json) == questions:
+                    break
+                try:
+                    latest = ContactFormTemplate(
+                        name=DEFAULT_TEMPLATE_NAME,
+                        version=(latest.version + 1) if latest else 1,
+                        questions_json=json.dumps(questions),
+                    )
+                    db.add(latest)
+                    db.commit()
+                    break
+                except IntegrityError:
+                    # Another worker stored this version first; use theirs
+                    db.rollback()
+            _template_questions_cache[latest.id] = questions
+            _default_template_id = latest.id
+        finally:
+            db.close()
+    return _default_template_id
+
+
+def get_form_questions(form: ContactForm) -> List[Dict[str, Any]]:
+    """Get a form's questions: its own customized copy, or the (cached) template it points to."""
+    if form.questions_json is not None:
+        return json.loads(form.questions_json)
+    if form.template_id is None:
+        return []
+    return get_template_questions(form.template_id, object_session(form))
+
+
+def use_default_template(form: ContactForm) -> None:
+    """Point a form at the current default template, dropping any customized copy."""
+    form.template_id = get_default_template_id()
+    form.questions_json = None
+
+
+def customize_form_questions(form: ContactForm, questions: List[Dict[str, Any]]) -> None:
+    """Copy on write: store the supplier's own questions and detach the form from its template."""
+    form.questions_json = json.dumps(questions)
+    form.template_id = None
+
+
+def upgrade_forms_to_template(db: Session, from_template_id: int, to_template_id: int) -> int:
+    """
+    Move every non-customized form from one template version to another.
+    Only the template_id of those rows changes; questions are not copied.
+    
+    Returns:
+        int: Number of forms upgraded
+    """
+    result = db.execute(
+        update(ContactForm)
+        .where(ContactForm.template_id == from_template_id, ContactForm.questions_json.is_(None))
+        .values(template_id=to_template_id)
+    )
+    return result.rowcount
+
 
 def validate_form_submission(form: ContactForm, answers: Dict[str, Any]) -> tuple[bool, str]:
     """
@@ -21,7 +158,7 @@ def validate_form_submission(form: ContactForm, answers: Dict[str, Any]) -> tupl
         tuple[bool, str]: (is_valid, error_message)
     """
     try:
-        questions = json.loads(form.questions_json)
+        questions = get_form_questions(form)
     except json.JSONDecodeError:
         return False, "Invalid form configuration"
     
@@ -89,3 +226,266 @@ def validate_form_submission(form: ContactForm, answers: Dict[str, Any]) -> tupl
                     return False, f"Selected option '{item}' for question '{question.get('question', f'Question {idx+1}')}' is not valid"
     
     return True, ""
+
+
+def _question_meta(question: Any) -> Dict[str, Any]:
+    """Normalize a stored question (dict, or plain string in older forms) to a dict."""
+    if isinstance(question, dict):
+        return question
+    return {"question": str(question), "type": "text"}
+
+
+def _parse_date(value: Any) -> date | None:
+    """Parse 'YYYY-MM-DD' (or an ISO datetime) into a date, or None if invalid."""
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _parse_number(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def build_answer_rows(questions: List[Any], answers: Dict[str, Any]) -> List[ContactFormAnswer]:
+    """
+    Build typed answer rows for a submission.
+    
+    Answers may be keyed by question index or question text (same rules as
+    validate_form_submission); rows are always keyed by the question text.
+    
+    Args:
+        questions: Parsed form questions
+        answers: Sanitized answers dictionary
+        
+    Returns:
+        List[ContactFormAnswer]: Rows to attach to the submission (not yet added to a session)
+    """
+    rows = []
+    for idx, raw_question in enumerate(questions):
+        question = _question_meta(raw_question)
+        question_text = question.get("question", f"Question {idx+1}")
+        answer = answers.get(str(idx))
+        if answer is None:
+            answer = answers.get(question_text)
+        if answer is None or (isinstance(answer, str) and not answer.strip()):
+            continue
+
+        question_type = question.get("type") or "text"
+        values = answer if isinstance(answer, list) else [answer]
+        for value in values:
+            row = ContactFormAnswer(
+                question=question_text[:255],
+                question_type=question_type,
+                value_text=str(value),
+            )
+            if question_type == "number":
+                row.value_number = _parse_number(value)
+            elif question_type in ["date", "datetime"]:
+                row.value_date = _parse_date(value)
+            rows.append(row)
+    return rows
+
+
+def resolve_question_key(questions: List[Any], key: str) -> str:
+    """Resolve an answer key (question index or text) to the question text, as stored in answer rows."""
+    if key.isdigit() and int(key) < len(questions):
+        key = _question_meta(questions[int(key)]).get("question", key)
+    return key[:255]  # Same truncation as build_answer_rows
+
+
+def apply_submission_filters(
+    query: Query,
+    event_date_from: date | None = None,
+    event_date_to: date | None = None,
+    answer_filters: Dict[str, str] | None = None,
+    search: str | None = None,
+) -> Query:
+    """
+    Apply answer-based filters to a ContactFormSubmission query.
+    All filters are EXISTS subqueries on contact_form_answers, so they run in the database.
+    
+    Args:
+        query: Query over ContactFormSubmission
+        event_date_from: Keep submissions with a date answer on/after this date
+        event_date_to: Keep submissions with a date answer on/before this date
+        answer_filters: question text -> expected answer (case-insensitive exact match)
+        search: Free text matched against answers and submitter fields. On PostgreSQL
+            answers use full-text search (to_tsvector, GIN-indexed, every word must match);
+            elsewhere a substring match (ILIKE).
+    """
+    def has_answer(*conditions):
+        return (
+            select(ContactFormAnswer.id)
+            .where(ContactFormAnswer.submission_id == ContactFormSubmission.id, *conditions)
+            .exists()
+        )
+
+    if event_date_from is not None or event_date_to is not None:
+        conditions = [ContactFormAnswer.question_type.in_(["date", "datetime"])]
+        if event_date_from is not None:
+            conditions.append(ContactFormAnswer.value_date >= event_date_from)
+        if event_date_to is not None:
+            conditions.append(ContactFormAnswer.value_date <= event_date_to)
+        query = query.filter(has_answer(*conditions))
+
+    for question_text, expected in (answer_filters or {}).items():
+        query = query.filter(has_answer(
+            ContactFormAnswer.question == question_text,
+            func.lower(ContactFormAnswer.value_text) == expected.lower(),
+        ))
+
+    if search:
+        search_term = f"%{search}%"
+        if query.session.get_bind().dialect.name == "postgresql":
+            # Must match the expression of idx_answers_value_text_fts
+            answer_match = func.to_tsvector(ANSWER_SEARCH_CONFIG, ContactFormAnswer.value_text).op("@@")(
+                func.plainto_tsquery(ANSWER_SEARCH_CONFIG, search)
+            )
+        else:
+            answer_match = ContactFormAnswer.value_text.ilike(search_term)
+        query = query.filter(
+            or_(
+                ContactFormSubmission.submitter_name.ilike(search_term),
+                ContactFormSubmission.submitter_email.ilike(search_term),
+                ContactFormSubmission.submitter_phone.ilike(search_term),
+                has_answer(answer_match),
+            )
+        )
+    return query
+
+
+def answer_sort_key(question_text: str):
+    """
+    Correlated subqueries used to order submissions by the answer to a question.
+    Returns (date, number, text) expressions; only the one matching the question type is non-null.
+    """
+    def value_of(column):
+        return (
+            select(func.min(column))
+            .where(
+                ContactFormAnswer.submission_id == ContactFormSubmission.id,
+                ContactFormAnswer.question == question_text,
+            )
+            .scalar_subquery()
+        )
+
+    return (
+        value_of(ContactFormAnswer.value_date),
+        value_of(ContactFormAnswer.value_number),
+        value_of(ContactFormAnswer.value_text),
+    )
+
+
+def encode_submission_cursor(submission_id: int) -> str:
+    """Encode the position (id) of the last submission in a page."""
+    return base64.urlsafe_b64encode(str(submission_id).encode()).decode()
+
+
+def decode_submission_cursor(cursor: str) -> int:
+    """Decode a cursor from encode_submission_cursor. Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        # Cursors issued before the id-only keyset were "<created_at>|<id>"
+        return int(raw.rsplit("|", 1)[-1])
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def apply_submission_cursor(query: Query, submission_id: int, descending: bool = True) -> Query:
+    """
+    Keyset filter: submissions strictly after `submission_id` in the listing order.
+
+    The keyset is the id alone: ids grow with insertion order, while created_at is
+    stored as text on SQLite in more than one format (rows written by create_all,
+    the ORM and raw SQL), so comparing it against a bound datetime is unreliable.
+    """
+    if descending:
+        return query.filter(ContactFormSubmission.id < submission_id)
+    return query.filter(ContactFormSubmission.id > submission_id)
+
+
+def bulk_update_submissions(
+    db: Session,
+    form: ContactForm,
+    action: str,
+    submission_ids: List[int] | None = None,
+    before_id: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Mark read or archive many submissions of a form with set-based UPDATEs (not committed).
+    The form's inbox counters are adjusted once for the whole batch.
+    
+    Args:
+        db: Database session
+        form: Form that owns the submissions
+        action: "mark_read" or "archive" (archiving also marks as read)
+        submission_ids: Explicit targets, or
+        before_id: Every submission older than this one (lower id: ids follow insertion
+            order, while created_at is not reliably comparable on SQLite, see apply_submission_cursor)
+        
+    Returns:
+        dict: {"updated": int, "results": [{"id", "status"}]} where status is
+              updated | unchanged | not_found (results only for explicit ids)
+    """
+    target = [ContactFormSubmission.contact_form_id == form.id]
+    if submission_ids is not None:
+        target.append(ContactFormSubmission.id.in_(submission_ids))
+        existing_ids = {
+            i for (i,) in db.query(ContactFormSubmission.id).filter(*target).all()
+        }
+    else:
+        target.append(ContactFormSubmission.id < before_id)
+
+    def run_update(conditions, values) -> List[int]:
+        result = db.execute(
+            update(ContactFormSubmission)
+            .where(*target, *conditions)
+            .values(**values)
+            .returning(ContactFormSubmission.id)
+            .execution_options(synchronize_session=False)
+        )
+        return [row[0] for row in result]
+
+    if action == "mark_read":
+        updated_ids = run_update(
+            [ContactFormSubmission.read == False, ContactFormSubmission.archived == False],
+            {"read": True},
+        )
+        total_delta, unread_delta = 0, len(updated_ids)
+    else:
+        # Two passes so the unread counter moves by exactly the unread rows archived
+        unread_ids = run_update(
+            [ContactFormSubmission.archived == False, ContactFormSubmission.read == False],
+            {"archived": True, "read": True},
+        )
+        read_ids = run_update([ContactFormSubmission.archived == False], {"archived": True})
+        updated_ids = unread_ids + read_ids
+        total_delta, unread_delta = len(updated_ids), len(unread_ids)
+
+    if total_delta or unread_delta:
+        db.execute(
+            update(ContactForm)
+            .where(ContactForm.id == form.id)
+            .values(
+                submissions_count=ContactForm.submissions_count - total_delta,
+                unread_count=ContactForm.unread_count - unread_delta,
+            )
+        )
+
+    results = []
+    if submission_ids is not None:
+        updated = set(updated_ids)
+        for submission_id in submission_ids:
+            if submission_id in updated:
+                status = "updated"
+            elif submission_id in existing_ids:
+                status = "unchanged"
+            else:
+                status = "not_found"
+            results.append({"id": submission_id, "status": status})
+
+    return {"updated": len(updated_ids), "results": results}
@@ -0,0 +1,118 @@
+# app/services/health_service.py
+"""
+Readiness checks used by the load balancer (/health/ready).
+
+Each check is bounded in time and the combined result is cached for a short
+period, so frequent probes from several balancers never become load themselves.
+"""
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict
+
+from sqlalchemy import text
+from app.database import engine, read_engine, replica_set
+from app.core.sql_instrumentation import last_write_at
+
+DB_TIMEOUT_SECONDS = float(os.getenv("HEALTH_DB_TIMEOUT_SECONDS", "1.0"))
+CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "2.0"))
+MIN_FREE_DISK_MB = int(os.getenv("HEALTH_MIN_FREE_DISK_MB", "100"))
+UPLOAD_DIR = os.getenv("HEALTH_UPLOAD_DIR", "uploads")
+
+# One probe thread: a hung database can't pile up threads across probes
+_db_probe_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="health-db")
+
+
+def _probe_database() -> None:
+    # With the SQLite production profile, probe the read pool: the single writer is often busy by design
+    with (read_engine or engine).connect() as conn:
+        if conn.dialect.name == "sqlite":
+            # Reading the schema takes a shared lock, so a locked database file fails here
+            conn.execute(text("SELECT count(*) FROM sqlite_master"))
+        else:
+            conn.execute(text("SELECT 1"))
+
+
+def check_database() -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        _db_probe_executor.submit(_probe_database).result(timeout=DB_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        return {"ok": False, "error": f"no answer within {DB_TIMEOUT_SECONDS}s"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def check_disk() -> Dict[str, Any]:
+    try:
+        usage = shutil.disk_usage(UPLOAD_DIR)
+    except OSError as e:
+        return {"ok": False, "error": str(e)}
+    free_mb = usage.free // (1024 * 1024)
+    return {"ok": free_mb >= MIN_FREE_DISK_MB, "path": UPLOAD_DIR, "free_mb": free_mb, "min_free_mb": MIN_FREE_DISK_MB}
+
+
+def check_pool() -> Dict[str, Any]:
+    pool = (read_engine or engine).pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return {"ok": True, "pool": type(pool).__name__}
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    return {
+        "ok": capacity <= 0 or checked_out < capacity,
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 2) if capacity > 0 else None,
+    }
+
+
+def check_replicas() -> Dict[str, Any]:
+    # Informative only: with every replica down, reads fall back to the primary
+    replicas = [
+        {"healthy": r.healthy, "lag_seconds": round(r.lag_seconds, 1)}
+        for r in (replica_set.replicas if replica_set is not None else [])
+    ]
+    return {"ok": True, "replicas": replicas}
+
+
+def last_write_info() -> Dict[str, Any]:
+    written_at = last_write_at()
+    return {"age_seconds": round(time.time() - written_at, 1) if written_at is not None else None}
+
+
+class ReadinessCache:
+    """Runs the readiness checks at most once per `ttl` seconds; concurrent probes share the run."""
+
+    def __init__(self, ttl: float = CACHE_SECONDS):
+        self.ttl = ttl
+        self._result: Dict[str, Any] | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._result is None or time.monotonic() - self._checked_at >= self.ttl:
+                checks = {
+                    "database": check_database(),
+                    "disk": check_disk(),
+                    "pool": check_pool(),
+                }
+                if replica_set is not None:
+                    checks["replicas"] = check_replicas()
+                self._result = {
+                    "status": "ok" if all(c["ok"] for c in checks.values()) else "unavailable",
+                    "checks": checks,
+                    "last_write": last_write_info(),
+                }
+                self._checked_at = time.monotonic()
+            return self._result
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._result = None
+
+
+readiness = ReadinessCache()
@@ -2,9 +2,26 @@
 """
 Business logic for review operations.
 """
+import hashlib
+import json
+import threading
+from collections import deque, OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models.review_model import Review
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from sqlalchemy import func, update, delete, select, or_, and_, event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models.review_model import Review, SupplierRatingStats
+from app.models.supplier_model import Supplier
+from app.models.user_model import User
+from app.utils import moderation
+from app.core.invalidation_bus import invalidation_bus
+from app.core.metrics import record_cache
+from app.core.response_cache import response_cache
 
 
 def calculate_average_rating(supplier_id: int, db: Session) -> float | None:
@@ -32,3 +49,505 @@ def calculate_average_rating(supplier_id: int, db: Session) -> float | None:
     
     # Round to 1 decimal place
     return round(float(result), 1)
+
+
+def bulk_moderate_reviews(
+    db: Session,
+    action: str,
+    review_ids: List[int] | None = None,
+    before_id: int | None = None,
+    moderator_id: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Approve or reject many pending reviews with one set-based UPDATE (not committed).
+    Rating histograms of the affected suppliers are updated in the same transaction.
+    
+    Args:
+        db: Database session
+        action: "approve" or "reject"
+        review_ids: Explicit targets, or
+        before_id: Every pending review older than this one (lower id; created_at is
+            not reliably comparable on SQLite, where it is stored as text in several formats)
+        moderator_id: Admin doing the moderation; reviews leased to another admin are skipped
+        
+    Returns:
+        dict: {"updated": int, "updated_ids": list[int], "results": [{"id", "status"}]}
+              where status is approved | rejected | already_<status> | claimed | not_found
+              (results only for explicit ids)
+    """
+    new_status = "approved" if action == "approve" else "rejected"
+    target = [Review.status == "pending"]
+    if moderator_id is not None:
+        target.append(claim_available_to(moderator_id, datetime.utcnow()))
+    if review_ids is not None:
+        target.append(Review.id.in_(review_ids))
+        current_status = dict(
+            db.query(Review.id, Review.status).filter(Review.id.in_(review_ids)).all()
+        )
+    else:
+        target.append(Review.id < before_id)
+
+    result = db.execute(
+        update(Review)
+        .where(*target)
+        .values(status=new_status, claimed_by=None, claim_expires_at=None)
+        .returning(Review.id, Review.supplier_id, Review.rating)
+        .execution_options(synchronize_session=False)
+    )
+    updated = result.all()
+    updated_ids = [row.id for row in updated]
+
+    if new_status == "approved":
+        # Histogram counters: one UPDATE per supplier for the whole batch
+        changes: Dict[int, Dict[int, int]] = {}
+        for row in updated:
+            buckets = changes.setdefault(row.supplier_id, {})
+            buckets[row.rating] = buckets.get(row.rating, 0) + 1
+        apply_rating_changes(db, changes)
+
+    results = []
+    if review_ids is not None:
+        updated_set = set(updated_ids)
+        for review_id in review_ids:
+            if review_id in updated_set:
+                status = new_status
+            elif current_status.get(review_id) == "pending":
+                status = "claimed"  # Leased to another moderator
+            elif review_id in current_status:
+                status = f"already_{current_status[review_id]}"
+            else:
+                status = "not_found"
+            results.append({"id": review_id, "status": status})
+
+    return {"updated": len(updated_ids), "updated_ids": updated_ids, "results": results}
+
+
+def screen_review(review: Review) -> bool:
+    """
+    Score the review's comment (risk_score / risk_flags) before it enters the moderation queue.
+
+    Returns:
+        bool: True if the score is below the auto-approval threshold (REVIEW_AUTO_APPROVE_BELOW)
+    """
+    score, flags = moderation.screen_comment(review.comment)
+    review.risk_score = score
+    review.risk_flags = ",".join(flags)[:255] or None
+    return score < moderation.AUTO_APPROVE_BELOW
+
+
+async def fetch_page_with_total_async(db: AsyncSession, stmt: Select, page: int, page_size: int) -> tuple[list, int]:
+    """
+    Fetch one page of a select() together with the unpaginated total.
+    
+    The total comes from COUNT(*) OVER () in the same statement, so a page costs
+    a single query. Only a page past the end falls back to a separate count.
+    
+    Returns:
+        tuple[list, int]: (rows, total) - rows also carry a `total_count` column
+    """
+    rows = (
+        await db.execute(
+            stmt.add_columns(func.count().over().label("total_count"))
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+    ).all()
+    if rows:
+        return rows, rows[0].total_count
+    if page == 1:
+        return rows, 0
+    total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    return rows, total
+
+
+def claim_available_to(admin_id: int, now: datetime | None = None):
+    """Condition: the review is not leased, the lease expired, or it is leased to admin_id."""
+    now = now or datetime.utcnow()
+    return or_(
+        Review.claimed_by.is_(None),
+        Review.claim_expires_at < now,
+        Review.claimed_by == admin_id,
+    )
+
+
+def is_claimed_by_other(review: Review, admin_id: int) -> bool:
+    """Whether another admin holds an unexpired lease on the review."""
+    if review.claimed_by is None or review.claimed_by == admin_id or review.claim_expires_at is None:
+        return False
+    return review.claim_expires_at.replace(tzinfo=None) > datetime.utcnow()
+
+
+def claim_pending_reviews(db: Session, admin_id: int, limit: int, ttl_seconds: int) -> List[int]:
+    """
+    Lease the next `limit` pending reviews (oldest first) to an admin (not committed).
+    Reviews with an expired lease are back in the queue. Two admins never get the same review:
+    
+    - PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED, then UPDATE the locked rows
+    - SQLite: one UPDATE ... WHERE id IN (SELECT ... LIMIT k), atomic under SQLite's write lock
+    
+    Returns:
+        List[int]: IDs of the leased reviews
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    unclaimed = and_(
+        Review.status == "pending",
+        or_(Review.claimed_by.is_(None), Review.claim_expires_at < now),
+    )
+    lease = {"claimed_by": admin_id, "claim_expires_at": expires_at}
+
+    if db.get_bind().dialect.name == "postgresql":
+        ids = [
+            review_id for (review_id,) in db.query(Review.id)
+            .filter(unclaimed)
+            .order_by(Review.created_at.asc(), Review.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        ]
+        if ids:
+            db.execute(
+                update(Review).where(Review.id.in_(ids)).values(**lease)
+                .execution_options(synchronize_session=False)
+            )
+        return ids
+
+    next_ids = (
+        select(Review.id)
+        .where(unclaimed)
+        .order_by(Review.created_at.asc(), Review.id.asc())
+        .limit(limit)
+    )
+    result = db.execute(
+        update(Review)
+        .where(Review.id.in_(next_ids), unclaimed)
+        .values(**lease)
+        .returning(Review.id)
+        .execution_options(synchronize_session=False)
+    )
+    return [review_id for (review_id,) in result]
+
+
+def release_claims(db: Session, admin_id: int, review_ids: List[int] | None = None) -> int:
+    """Give back an admin's leases (all of them, or only review_ids). Not committed."""
+    conditions = [Review.claimed_by == admin_id]
+    if review_ids is not None:
+        conditions.append(Review.id.in_(review_ids))
+    result = db.execute(
+        update(Review).where(*conditions).values(claimed_by=None, claim_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+RATING_BUCKETS = (1, 2, 3, 4, 5)
+
+
+def _ensure_rating_stats_rows(db: Session, supplier_ids) -> None:
+    """Create empty histogram rows for suppliers that don't have one yet (race-safe upsert)."""
+    rows = [{"supplier_id": supplier_id} for supplier_id in supplier_ids]
+    if not rows:
+        return
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    db.execute(insert(SupplierRatingStats).values(rows).on_conflict_do_nothing(index_elements=["supplier_id"]))
+
+
+# Session.info key: suppliers whose histograms changed in the session's current transaction
+_RATING_CHANGES_KEY = "rating_changes.supplier_ids"
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_rating_caches(session: Session) -> None:
+    supplier_ids = session.info.pop(_RATING_CHANGES_KEY, None)
+    if supplier_ids:
+        rating_summaries.invalidate()
+        response_cache.invalidate(*(f"supplier:{supplier_id}" for supplier_id in sorted(supplier_ids)))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rating_changes(session: Session) -> None:
+    session.info.pop(_RATING_CHANGES_KEY, None)
+
+
+def apply_rating_changes(db: Session, changes: Dict[int, Dict[int, int]]) -> None:
+    """
+    Adjust rating histograms (not committed).
+    
+    Args:
+        db: Database session
+        changes: supplier_id -> {rating: delta}, e.g. {7: {5: 1}} when a 5-star review is approved
+    """
+    changes = {sid: buckets for sid, buckets in changes.items() if any(buckets.values())}
+    if not changes:
+        return
+    # Cached summaries (and supplier pages, which embed the distribution) are dropped
+    # once the new counts are visible to other sessions (see _invalidate_rating_caches)
+    db.info.setdefault(_RATING_CHANGES_KEY, set()).update(changes)
+    _ensure_rating_stats_rows(db, changes.keys())
+    for supplier_id, buckets in changes.items():
+        values = {
+            f"rating_{rating}": getattr(SupplierRatingStats, f"rating_{rating}") + delta
+            for rating, delta in buckets.items()
+            if rating in RATING_BUCKETS and delta
+        }
+        values["total"] = SupplierRatingStats.total + sum(buckets.values())
+        db.execute(
+            update(SupplierRatingStats)
+            .where(SupplierRatingStats.supplier_id == supplier_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def rating_distribution(stats: SupplierRatingStats | None) -> Dict[str, Any]:
+    """Histogram as returned by the API: counts per star, total and average (None without reviews)."""
+    counts = {str(r): (getattr(stats, f"rating_{r}") if stats else 0) for r in RATING_BUCKETS}
+    total = stats.total if stats else 0
+    average = None
+    if total:
+        average = round(sum(r * counts[str(r)] for r in RATING_BUCKETS) / total, 1)
+    return {"counts": counts, "total": total, "average": average}
+
+
+def get_rating_distributions(db: Session, supplier_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Histograms for many suppliers with a single query (suppliers without reviews get zeros)."""
+    if not supplier_ids:
+        return {}
+    rows = db.query(SupplierRatingStats).filter(SupplierRatingStats.supplier_id.in_(supplier_ids)).all()
+    by_id = {row.supplier_id: row for row in rows}
+    return {supplier_id: rating_distribution(by_id.get(supplier_id)) for supplier_id in supplier_ids}
+
+
+async def get_rating_distributions_async(db: AsyncSession, supplier_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """get_rating_distributions() for async sessions."""
+    if not supplier_ids:
+        return {}
+    rows = (
+        await db.scalars(select(SupplierRatingStats).where(SupplierRatingStats.supplier_id.in_(supplier_ids)))
+    ).all()
+    by_id = {row.supplier_id: row for row in rows}
+    return {supplier_id: rating_distribution(by_id.get(supplier_id)) for supplier_id in supplier_ids}
+
+
+def get_rating_summaries(db: Session, supplier_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Average, count and star distribution for many suppliers, from the precomputed
+    histograms (one query). Unknown supplier ids are left out of the result.
+    """
+    if not supplier_ids:
+        return {}
+    rows = (
+        db.query(Supplier.id, SupplierRatingStats)
+        .outerjoin(SupplierRatingStats, SupplierRatingStats.supplier_id == Supplier.id)
+        .filter(Supplier.id.in_(supplier_ids))
+        .all()
+    )
+    summaries = {}
+    for supplier_id, stats in rows:
+        distribution = rating_distribution(stats)
+        summaries[supplier_id] = {
+            "average": distribution["average"],
+            "count": distribution["total"],
+            "distribution": distribution["counts"],
+        }
+    return summaries
+
+
+class RatingSummaryCache:
+    """
+    LRU cache of rating summaries keyed by the sorted set of supplier ids
+    (comparison views and favorites ask for the same sets over and over).
+    
+    Invalidated wholesale whenever a histogram changes; a result computed while an
+    invalidation happened is returned but not stored.
+    
+    Args:
+        max_entries: Number of id sets kept
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        invalidation_bus.subscribe("rating_summaries.invalidate", self._invalidate_local)
+
+    def get(self, db: Session, supplier_ids: List[int]) -> tuple[Dict[int, Dict[str, Any]], str]:
+        """Get the summaries for supplier_ids and their ETag."""
+        key = tuple(sorted(set(supplier_ids)))
+        with self._lock:
+            entry = self._entries.get(key)
+            record_cache("rating_summaries", entry is not None)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            generation = self._generation
+
+        summaries = get_rating_summaries(db, list(key))
+        digest = hashlib.sha1(json.dumps(summaries, sort_keys=True).encode()).hexdigest()
+        entry = (summaries, f'"{digest}"')
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = entry
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self) -> None:
+        """Drop every cached summary (ratings changed, or a supplier was deleted), in every worker."""
+        self._invalidate_local()
+        invalidation_bus.publish("rating_summaries.invalidate")
+
+    def _invalidate_local(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+rating_summaries = RatingSummaryCache()
+
+
+def rebuild_rating_stats(db: Session) -> None:
+    """Recompute every histogram from the reviews table (for seeds/backfills; not committed)."""
+    db.execute(delete(SupplierRatingStats))
+    rows = (
+        db.query(Review.supplier_id, Review.rating, func.count(Review.id))
+        .filter(Review.status == "approved")
+        .group_by(Review.supplier_id, Review.rating)
+        .all()
+    )
+    changes: Dict[int, Dict[int, int]] = {}
+    for supplier_id, rating, count in rows:
+        changes.setdefault(supplier_id, {})[rating] = count
+    apply_rating_changes(db, changes)
+
+
+def approved_review_items(db: Session, review_ids: List[int] | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Approved reviews with user and supplier names resolved (one joined query), newest first.
+    
+    Args:
+        db: Database session
+        review_ids: Restrict to these reviews (optional)
+        limit: Maximum number of reviews (optional)
+    """
+    query = (
+        db.query(
+            Review.id,
+            Review.rating,
+            Review.comment,
+            Review.created_at,
+            User.name.label("user_name"),
+            Review.supplier_id,
+            Supplier.fantasy_name.label("supplier_name"),
+        )
+        .join(User, Review.user_id == User.id)
+        .join(Supplier, Review.supplier_id == Supplier.id)
+        .filter(Review.status == "approved")
+        .order_by(Review.created_at.desc(), Review.id.desc())
+    )
+    if review_ids is not None:
+        query = query.filter(Review.id.in_(review_ids))
+    if limit is not None:
+        query = query.limit(limit)
+    return [dict(r._mapping) for r in query.all()]
+
+
+class RecentApprovedReviews:
+    """
+    Bounded in-process buffer with the most recent approved reviews (homepage carousel).
+    
+    Filled from the database on first use (or after invalidate()), then kept up to
+    date by the moderation endpoints, so steady-state reads never hit the database.
+    
+    Args:
+        capacity: Maximum number of reviews kept; must be >= the largest page served
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._items: deque = deque(maxlen=capacity)
+        self._loaded = False
+        self._complete = False  # True when the buffer holds every approved review
+        self._etags: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        # Other workers' buffers are not patched in place: they rebuild on their next read
+        invalidation_bus.subscribe("recent_approved_reviews.invalidate", self._invalidate_local)
+
+    def get(self, db: Session, limit: int) -> tuple[List[Dict[str, Any]], str]:
+        """
+        Get the newest `limit` approved reviews and their ETag.
+        Rebuilds from the database only when not loaded, or when removals left
+        fewer items than requested while older approved reviews exist.
+        """
+        with self._lock:
+            stale = not self._loaded or (len(self._items) < limit and not self._complete)
+            record_cache("recent_approved_reviews", not stale)
+            if stale:
+                self._rebuild(db)
+            return self._page(limit)
+
+    def _page(self, limit: int) -> tuple[List[Dict[str, Any]], str]:
+        # Called with self._lock held
+        items = list(self._items)[:limit]
+        etag = self._etags.get(limit)
+        if etag is None:
+            digest = hashlib.sha1(json.dumps(jsonable_encoder(items), sort_keys=True).encode()).hexdigest()
+            etag = f'"{digest}"'
+            self._etags[limit] = etag
+        return items, etag
+
+    def peek(self, limit: int) -> tuple[List[Dict[str, Any]], str] | None:
+        """get() without database access: None when the buffer would need a rebuild."""
+        with self._lock:
+            if not self._loaded or (len(self._items) < limit and not self._complete):
+                return None
+            record_cache("recent_approved_reviews", True)
+            return self._page(limit)
+
+    def add(self, items: List[Dict[str, Any]]) -> None:
+        """Insert newly approved reviews (from approved_review_items), keeping newest-first order."""
+        self._add_local(items)
+        invalidation_bus.publish("recent_approved_reviews.invalidate")
+
+    def _add_local(self, items: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            if not self._loaded:
+                return  # Next get() rebuilds from the database anyway
+            known = {item["id"] for item in self._items}
+            merged = list(self._items) + [item for item in items if item["id"] not in known]
+            merged.sort(key=lambda item: (item["created_at"], item["id"]), reverse=True)
+            if len(merged) > self.capacity:
+                self._complete = False
+            self._items = deque(merged[:self.capacity], maxlen=self.capacity)
+            self._etags.clear()
+
+    def remove(self, review_id: int) -> None:
+        """Drop a review that is no longer approved (edited back to pending, or deleted)."""
+        with self._lock:
+            remaining = [item for item in self._items if item["id"] != review_id]
+            if len(remaining) != len(self._items):
+                self._items = deque(remaining, maxlen=self.capacity)
+                self._etags.clear()
+        invalidation_bus.publish("recent_approved_reviews.invalidate")
+
+    def invalidate(self) -> None:
+        """Force a rebuild on next read (e.g. a user or supplier name changed), in every worker."""
+        self._invalidate_local()
+        invalidation_bus.publish("recent_approved_reviews.invalidate")
+
+    def _invalidate_local(self) -> None:
+        with self._lock:
+            self._loaded = False
+            self._etags.clear()
+
+    def _rebuild(self, db: Session) -> None:
+        items = approved_review_items(db, limit=self.capacity)
+        self._items = deque(items, maxlen=self.capacity)
+        self._complete = len(items) < self.capacity
+        self._loaded = True
+        self._etags.clear()
+
+
+recent_approved_reviews = RecentApprovedReviews()
@@ -0,0 +1,406 @@
+# app/services/submission_queue.py
+"""
+Write-behind ingestion queue for public contact form submissions.
+
+The request path only validates the submission and appends it to a local
+append-only log (fsync'd), then answers 202. A background worker drains the
+queue and inserts submissions in batches, one commit per batch. Each record
+carries an idempotency key (unique per form in contact_form_submissions), so
+replaying the log after a crash never creates duplicates.
+
+Each process (uvicorn worker) has its own log, `<SUBMISSION_QUEUE_LOG>.<pid>`,
+and only ever compacts that one: the log is rewritten with the records not yet
+committed. At startup a process also claims the logs of dead processes (atomic
+rename, so one claimer wins) and replays them.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.contact_form_model import ContactForm, ContactFormSubmission
+from app.services.contact_form_service import build_answer_rows, get_form_questions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "submission_queue.log"
+)
+
+
+def new_submission_record(
+    contact_form_id: int,
+    answers: Dict[str, Any],
+    submitter_name: str | None,
+    submitter_email: str | None,
+    submitter_phone: str | None,
+    idempotency_key: str | None = None,
+) -> Dict[str, Any]:
+    """Build the JSON-serializable record that goes through the queue."""
+    return {
+        "idempotency_key": idempotency_key or uuid.uuid4().hex,
+        "contact_form_id": contact_form_id,
+        "answers": answers,
+        "submitter_name": submitter_name,
+        "submitter_email": submitter_email,
+        "submitter_phone": submitter_phone,
+        "received_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+PAYLOAD_FIELDS = ("answers", "submitter_name", "submitter_email", "submitter_phone")
+
+
+class IdempotencyConflict(Exception):
+    """The idempotency key was already used for a different submission to the same form."""
+
+
+def record_key(record: Dict[str, Any]) -> tuple[int, str]:
+    """Idempotency keys are scoped to their form: (contact_form_id, idempotency_key)."""
+    return record["contact_form_id"], record["idempotency_key"]
+
+
+def same_payload(record: Dict[str, Any], submission: ContactFormSubmission | Dict[str, Any]) -> bool:
+    """Whether a record carries the same answers and submitter as a stored submission (or another record)."""
+    if isinstance(submission, ContactFormSubmission):
+        submission = {
+            "answers": json.loads(submission.answers_json),
+            "submitter_name": submission.submitter_name,
+            "submitter_email": submission.submitter_email,
+            "submitter_phone": submission.submitter_phone,
+        }
+    return all(record.get(field) == submission.get(field) for field in PAYLOAD_FIELDS)
+
+
+def find_submission(db: Session, contact_form_id: int, idempotency_key: str) -> ContactFormSubmission | None:
+    """The submission stored for this form under this idempotency key, if any."""
+    return db.query(ContactFormSubmission).filter(
+        ContactFormSubmission.contact_form_id == contact_form_id,
+        ContactFormSubmission.idempotency_key == idempotency_key,
+    ).first()
+
+
+def insert_submissions(db: Session, records: List[Dict[str, Any]]) -> List[ContactFormSubmission]:
+    """
+    Insert queued records as submissions and bump the forms' inbox counters (without committing).
+    Records whose idempotency key already exists for their form, or whose form no longer exists, are skipped.
+
+    Returns:
+        List[ContactFormSubmission]: The submissions added to the session
+    """
+    keys = [r["idempotency_key"] for r in records]
+    form_ids = {r["contact_form_id"] for r in records}
+    existing_keys = set(
+        db.query(ContactFormSubmission.contact_form_id, ContactFormSubmission.idempotency_key)
+        .filter(
+            ContactFormSubmission.contact_form_id.in_(form_ids),
+            ContactFormSubmission.idempotency_key.in_(keys),
+        )
+        .all()
+    )
+    forms = {f.id: f for f in db.query(ContactForm).filter(ContactForm.id.in_(form_ids)).all()}
+
+    created = []
+    for record in records:
+        key = record_key(record)
+        form = forms.get(record["contact_form_id"])
+        if key in existing_keys or form is None:
+            continue
+        existing_keys.add(key)
+
+        submission = ContactFormSubmission(
+            contact_form_id=form.id,
+            answers_json=json.dumps(record["answers"]),
+            submitter_name=record.get("submitter_name"),
+            submitter_email=record.get("submitter_email"),
+            submitter_phone=record.get("submitter_phone"),
+            idempotency_key=record["idempotency_key"],
+            created_at=datetime.fromisoformat(record["received_at"]),
+        )
+        submission.answer_rows = build_answer_rows(get_form_questions(form), record["answers"])
+        db.add(submission)
+        created.append(submission)
+
+    # Inbox counters: one UPDATE per form per batch
+    per_form: Dict[int, int] = {}
+    for submission in created:
+        per_form[submission.contact_form_id] = per_form.get(submission.contact_form_id, 0) + 1
+    for form_id, count in per_form.items():
+        db.execute(
+            update(ContactForm)
+            .where(ContactForm.id == form_id)
+            .values(
+                submissions_count=ContactForm.submissions_count + count,
+                unread_count=ContactForm.unread_count + count,
+            )
+        )
+    return created
+
+
+class SubmissionQueue:
+    """
+    Durable in-process queue with a single background writer.
+
+    Args:
+        log_path: Base path of the append-only logs used for durability (one per process)
+        max_pending: Backpressure limit; enqueue() refuses new records above it
+        batch_size: Maximum records inserted per commit
+        linger_seconds: How long the worker waits to fill a batch before committing
+        compact_after: Committed records tolerated in the log before it is compacted
+    """
+
+    def __init__(
+        self,
+        log_path: str,
+        max_pending: int = 1000,
+        batch_size: int = 100,
+        linger_seconds: float = 0.05,
+        compact_after: int = 1000,
+    ):
+        self.log_path = log_path
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.compact_after = compact_after
+        self._own_log: str | None = None
+        self._committed_in_log = 0
+        self._pending: deque = deque()
+        self._pending_keys: Dict[tuple[int, str], Dict[str, Any]] = {}  # record_key -> record, until committed
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._has_work = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """Start the worker and replay records left in this process's log and in dead processes' logs."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._own_log = f"{self.log_path}.{os.getpid()}"
+            claimed = self._claim_orphan_logs()
+            for path in [self._own_log] + claimed:
+                for record in self._read_log(path):
+                    if record_key(record) not in self._pending_keys:
+                        self._pending.append(record)
+                        self._pending_keys[record_key(record)] = record
+            # The recovered records are durable in our own log before the claimed files go away
+            self._compact_log()
+            for path in claimed:
+                os.remove(path)
+            self._thread = threading.Thread(target=self._run, name="submission-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Drain the queue (up to timeout) and stop the worker."""
+        self.flush(timeout)
+        with self._lock:
+            self._stopping = True
+            self._has_work.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            if not self._pending and self._own_log and os.path.exists(self._own_log):
+                os.remove(self._own_log)
+
+    def enqueue(self, record: Dict[str, Any]) -> bool:
+        """
+        Durably enqueue a record.
+
+        Returns:
+            bool: False if the queue is full (caller should answer 503), True otherwise.
+                  Re-enqueuing a key that is still pending is a no-op that returns True.
+
+        Raises:
+            IdempotencyConflict: The key is pending for the same form with a different payload
+        """
+        self.start()
+        with self._lock:
+            pending = self._pending_keys.get(record_key(record))
+            if pending is not None:
+                if not same_payload(record, pending):
+                    raise IdempotencyConflict(record["idempotency_key"])
+                return True
+            if len(self._pending) + self._in_flight >= self.max_pending:
+                return False
+            self._append_to_log(record)
+            self._pending.append(record)
+            self._pending_keys[record_key(record)] = record
+            self._has_work.notify()
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every enqueued record has been written. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending) + self._in_flight
+
+    def _append_to_log(self, record: Dict[str, Any]) -> None:
+        # Called with self._lock held, so appends never interleave with compaction
+        with open(self._own_log, "a", encoding="utf-8") as log:
+            log.write(json.dumps(record, ensure_ascii=False) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+
+    def _claim_orphan_logs(self) -> List[str]:
+        """
+        Take over the logs of processes that are gone (renamed to `<own log>.claimed-*`).
+        Also picks up claims left by a previous process with our pid that died mid-recovery.
+        """
+        claimed = []
+        # The base path itself is the shared log written by versions before per-process logs
+        candidates = [self.log_path] if os.path.exists(self.log_path) else []
+        for path in candidates + glob.glob(glob.escape(self.log_path) + ".*"):
+            if path == self.log_path:
+                owner, suffix = "0", ""
+            else:
+                suffix = path[len(self.log_path) + 1:]
+                owner = suffix.split(".", 1)[0]
+            if path == self._own_log or not owner.isdigit() or suffix.endswith(".tmp"):
+                continue
+            if int(owner) not in (0, os.getpid()) and _process_alive(int(owner)):
+                continue
+            target = f"{self._own_log}.claimed-{uuid.uuid4().hex[:8]}"
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue  # Another process claimed it first
+            claimed.append(target)
+        return claimed
+
+    @staticmethod
+    def _read_log(path: str) -> List[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path, "r", encoding="utf-8") as log:
+            for line in log:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-append; the client never got a 202 for it
+                    continue
+        return records
+
+    def _compact_log(self) -> None:
+        """Rewrite our log with exactly the records not committed yet (called with self._lock held)."""
+        tmp_path = self._own_log + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as log:
+            for record in self._pending:
+                log.write(json.dumps(record, ensure_ascii=False) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+        os.replace(tmp_path, self._own_log)
+        self._committed_in_log = 0
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopping:
+                    self._has_work.wait()
+                if self._stopping and not self._pending:
+                    return
+            # Give concurrent submissions a moment to join this batch (group commit)
+            time.sleep(self.linger_seconds)
+            with self._lock:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                self._in_flight = len(batch)
+
+            self._write_batch(batch)
+
+            with self._lock:
+                for record in batch:
+                    self._pending_keys.pop(record_key(record), None)
+                self._in_flight = 0
+                self._committed_in_log += len(batch)
+                # Drop committed records from the log: right away when idle, in bulk under sustained load
+                if not self._pending or self._committed_in_log >= self.compact_after:
+                    self._compact_log()
+                if not self._pending:
+                    self._idle.notify_all()
+
+    def _write_batch(self, batch: List[Dict[str, Any]], attempts: int = 3) -> None:
+        db = SessionLocal()
+        try:
+            for attempt in range(attempts):
+                try:
+                    insert_submissions(db, batch)
+                    db.commit()
+                    return
+                except OperationalError as e:
+                    # Typically "database is locked": back off and retry the whole batch
+                    db.rollback()
+                    logger.warning("Submission batch insert failed (attempt %d): %s", attempt + 1, e)
+                    time.sleep(0.1 * (attempt + 1))
+                except Exception as e:
+                    db.rollback()
+                    logger.warning("Submission batch insert failed (%s); retrying one by one", e)
+                    break
+
+            for record in batch:
+                try:
+                    insert_submissions(db, [record])
+                    db.commit()
+                except Exception as record_error:
+                    db.rollback()
+                    logger.error("Could not store submission %s: %s", record["idempotency_key"], record_error)
+                    self._reject(record)
+        finally:
+            db.close()
+
+    def _reject(self, record: Dict[str, Any]) -> None:
+        """Keep records that could not be inserted in a side file instead of losing them."""
+        with open(self.log_path + ".rejected", "a", encoding="utf-8") as rejected:
+            rejected.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+WRITE_BEHIND_ENABLED = os.getenv("CONTACT_FORM_WRITE_BEHIND", "1") == "1"
+
+submission_queue = SubmissionQueue(
+    log_path=os.getenv("SUBMISSION_QUEUE_LOG", DEFAULT_LOG_PATH),
+    max_pending=int(os.getenv("SUBMISSION_QUEUE_MAX_PENDING", 1000)),
+    batch_size=int(os.getenv("SUBMISSION_QUEUE_BATCH_SIZE", 100)),
+)
@@ -2,8 +2,29 @@
 """
 Business logic for supplier operations.
 """
+import os
+
+from sqlalchemy import func
+
+from app.core.response_cache import response_cache
+from app.core.swr_cache import SWRCache
+from app.database import ReadSessionLocal
 from app.models.supplier_model import Supplier
 
+# Category facet counts (active suppliers per category), served stale-while-revalidate:
+# a few seconds of staleness after a supplier write is fine for these numbers.
+FACETS_SOFT_TTL_SECONDS = float(os.getenv("CATEGORY_FACETS_SOFT_TTL_SECONDS", "30"))
+FACETS_HARD_TTL_SECONDS = float(os.getenv("CATEGORY_FACETS_HARD_TTL_SECONDS", "600"))
+
+# Rating-ordered listing pages (an aggregate over every approved review), same idea:
+# a ranking a few seconds behind is fine, and nobody waits for a recompute after the first fill.
+rating_listings = SWRCache(
+    "supplier_rating_listing",
+    soft_ttl=float(os.getenv("RATING_LISTING_SOFT_TTL_SECONDS", "10")),
+    hard_ttl=float(os.getenv("RATING_LISTING_HARD_TTL_SECONDS", "300")),
+    max_entries=int(os.getenv("RATING_LISTING_MAX_ENTRIES", "512")),
+)
+
 
 def calculate_completeness_score(supplier: Supplier) -> dict:
     """
@@ -70,3 +91,33 @@ def calculate_completeness_score(supplier: Supplier) -> dict:
         "recommendations": recommendations,
         "is_complete": normalized_score == 100.0
     }
+
+
+def _count_active_suppliers_by_category() -> dict:
+    """{category_id: active supplier count}, one grouped query in its own session."""
+    db = ReadSessionLocal()
+    try:
+        rows = (
+            db.query(Supplier.category_id, func.count(Supplier.id))
+            .filter(Supplier.status == "active", Supplier.category_id.isnot(None))
+            .group_by(Supplier.category_id)
+            .all()
+        )
+    finally:
+        db.close()
+    return {category_id: count for category_id, count in rows}
+
+
+# A recompute changes the counts embedded in cached category listings
+category_facets = SWRCache(
+    "category_facets",
+    soft_ttl=FACETS_SOFT_TTL_SECONDS,
+    hard_ttl=FACETS_HARD_TTL_SECONDS,
+    max_entries=1,
+    on_refresh=lambda key: response_cache.invalidate("categories"),
+)
+
+
+def active_supplier_counts() -> dict:
+    """Active suppliers per category id (categories without any are absent)."""
+    return category_facets.get("active", _count_active_suppliers_by_category)
@@ -0,0 +1,89 @@
+# app/tests/conftest.py
+"""
+Shared test fixtures.
+Tests run against a throwaway SQLite database instead of backend/database.db,
+created by the Alembic migrations (as in production).
+"""
+import os
+import tempfile
+import uuid
+
+_test_db_dir = tempfile.mkdtemp(prefix="events-supplier-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_test_db_dir, 'test.db')}"
+os.environ["SUBMISSION_QUEUE_LOG"] = os.path.join(_test_db_dir, "submission_queue.log")
+os.environ["PROFILE_DIR"] = os.path.join(_test_db_dir, "profiles")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+alembic_config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+alembic_config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+alembic_config.attributes["configure_logger"] = False
+command.upgrade(alembic_config, "head")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.core.middleware import limiter  # noqa: E402
+from app.models.user_model import User  # noqa: E402
+from app.models.supplier_model import Supplier  # noqa: E402
+from app.utils.jwt_handler import create_access_token  # noqa: E402
+
+# Rate limits are per IP and every TestClient request comes from the same one
+limiter.enabled = False
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create a user and return (user, auth headers)."""
+    def _make_user(user_type: str = "client", name: str = "Test User"):
+        user = User(
+            name=name,
+            email=f"{uuid.uuid4().hex[:12]}@example.com",
+            password_hash="not-used",
+            type=user_type,
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        token = create_access_token({"sub": str(user.id), "type": user.type})
+        return user, {"Authorization": f"Bearer {token}"}
+    return _make_user
+
+
+@pytest.fixture
+def make_supplier(db, make_user):
+    """Create an active supplier (and its owner) and return (supplier, owner auth headers)."""
+    def _make_supplier(name: str = "Buffet Teste", **fields):
+        owner, headers = make_user("supplier", name=f"Owner {name}")
+        supplier = Supplier(
+            user_id=owner.id,
+            fantasy_name=name,
+            city=fields.pop("city", "São Paulo"),
+            state=fields.pop("state", "SP"),
+            phone="11999999999",
+            email=f"{uuid.uuid4().hex[:12]}@example.com",
+            **fields,
+        )
+        db.add(supplier)
+        db.commit()
+        db.refresh(supplier)
+        return supplier, headers
+    return _make_supplier
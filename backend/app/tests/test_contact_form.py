@@ -0,0 +1,283 @@
+# app/tests/test_contact_form.py
+"""
+Tests for contact form submissions.
+"""
+import json
+from sqlalchemy import text
+from app.models.contact_form_model import ContactForm, ContactFormSubmission
+from app.services.contact_form_service import resolve_question_key
+from app.services.submission_queue import submission_queue
+from app.utils.default_contact_form import get_default_contact_form_questions
+
+
+def _create_form(db, supplier):
+    form = ContactForm(
+        supplier_id=supplier.id,
+        questions_json=json.dumps(get_default_contact_form_questions()),
+        active=True,
+    )
+    db.add(form)
+    db.commit()
+    db.refresh(form)
+    return form
+
+
+def _answers(event_date: str, guests: int, event_type: str, details: str = "") -> dict:
+    return {
+        "Nome completo": "Maria Silva",
+        "E-mail": "maria@example.com",
+        "Telefone/WhatsApp": "11999999999",
+        "Data do evento": event_date,
+        "Número de convidados": guests,
+        "Tipo de evento": event_type,
+        "Conte-nos mais sobre seu evento": details,
+    }
+
+
+def test_list_submissions_filters_by_answers(client, db, make_supplier):
+    """Test that event date, answer[...] and search filters are applied."""
+    supplier, headers = make_supplier()
+    form = _create_form(db, supplier)
+
+    for answers in [
+        _answers("2026-03-10", 80, "Casamento", "Cerimônia ao ar livre"),
+        _answers("2026-06-20", 150, "Corporativo"),
+        _answers("2026-09-01", 40, "Casamento"),
+    ]:
+        response = client.post(f"/contact-forms/{form.id}/submit", json={"answers": answers})
+        assert response.status_code == 202
+    assert submission_queue.flush()
+
+    url = f"/contact-forms/{form.id}/submissions"
+    response = client.get(url, params={"event_date_from": "2026-05-01"}, headers=headers)
+    assert response.json()["total"] == 2
+
+    response = client.get(url, params={"answer[Tipo de evento]": "casamento"}, headers=headers)
+    assert response.json()["total"] == 2
+
+    response = client.get(url, params={"search": "ar livre"}, headers=headers)
+    assert response.json()["total"] == 1
+
+    response = client.get(
+        url, params={"sort_answer": "Número de convidados", "sort_order": "asc"}, headers=headers
+    )
+    guests = [s["answers"]["Número de convidados"] for s in response.json()["data"]]
+    assert guests == [40, 80, 150]
+
+
+def test_resolve_question_key_matches_stored_answer_keys():
+    """Test that question keys are truncated like the stored answer rows."""
+    long_question = "Q" * 300
+    assert resolve_question_key([{"question": long_question}], "0") == long_question[:255]
+    assert resolve_question_key([], long_question) == long_question[:255]
+
+
+def test_missing_template_falls_back_to_default_and_is_not_cached(db):
+    """Test that an unknown template id yields the default questions and is looked up again later."""
+    from app.models.contact_form_model import ContactFormTemplate
+    from app.services import contact_form_service
+
+    missing_id = 987654
+    assert contact_form_service.get_template_questions(missing_id) == get_default_contact_form_questions()
+    assert missing_id not in contact_form_service._template_questions_cache
+
+    questions = [{"question": "Qual o orçamento?", "type": "text", "required": False}]
+    db.add(ContactFormTemplate(id=missing_id, name="late", version=1, questions_json=json.dumps(questions)))
+    db.commit()
+    assert contact_form_service.get_template_questions(missing_id) == questions
+
+
+def test_submit_is_idempotent(client, db, make_supplier):
+    """Test that retrying a submission with the same Idempotency-Key stores it once."""
+    supplier, _ = make_supplier()
+    form = _create_form(db, supplier)
+    payload = {"answers": _answers("2026-05-05", 60, "Aniversário")}
+    headers = {"Idempotency-Key": "retry-123"}
+
+    for _ in range(3):
+        response = client.post(f"/contact-forms/{form.id}/submit", json=payload, headers=headers)
+        assert response.status_code == 202
+        assert response.json()["data"]["idempotency_key"] == "retry-123"
+        assert submission_queue.flush()
+
+    count = db.query(ContactFormSubmission).filter(ContactFormSubmission.contact_form_id == form.id).count()
+    assert count == 1
+
+
+def test_idempotency_keys_are_scoped_to_the_form(client, db, make_supplier, monkeypatch):
+    """Test that a key reused on another form neither collides nor leaks, and a different payload is a 409."""
+    from app.routes import contact_form_routes
+    first = _create_form(db, make_supplier("Buffet Um")[0])
+    second = _create_form(db, make_supplier("Buffet Dois")[0])
+    headers = {"Idempotency-Key": "shared-key"}
+    original = {"answers": _answers("2026-05-05", 60, "Aniversário")}
+    other = {"answers": _answers("2026-08-08", 20, "Outro")}
+
+    assert client.post(f"/contact-forms/{first.id}/submit", json=original, headers=headers).status_code == 202
+    # Still pending in the queue, then committed
+    assert client.post(f"/contact-forms/{first.id}/submit", json=other, headers=headers).status_code == 409
+    assert submission_queue.flush()
+    assert client.post(f"/contact-forms/{first.id}/submit", json=other, headers=headers).status_code == 409
+    assert client.post(f"/contact-forms/{second.id}/submit", json=other, headers=headers).status_code == 202
+    assert submission_queue.flush()
+    for form in (first, second):
+        assert db.query(ContactFormSubmission).filter(ContactFormSubmission.contact_form_id == form.id).count() == 1
+
+    # Synchronous path: the replay returns this form's own submission, never another form's
+    monkeypatch.setattr(contact_form_routes, "WRITE_BEHIND_ENABLED", False)
+    response = client.post(f"/contact-forms/{second.id}/submit", json=other, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["data"]["contact_form_id"] == second.id
+    assert response.json()["data"]["answers"]["Tipo de evento"] == "Outro"
+    assert client.post(f"/contact-forms/{second.id}/submit", json=original, headers=headers).status_code == 409
+
+
+def test_forms_share_default_template_until_customized(client, db, make_user):
+    """Test that new forms point to the default template and copy questions only on update."""
+    _, headers = make_user("client")
+    response = client.post("/fornecedores/", json={
+        "fantasy_name": "Doces da Ana",
+        "city": "Campinas",
+        "state": "SP",
+        "phone": "19999999999",
+        "email": "ana@example.com",
+    }, headers=headers)
+    assert response.status_code == 200
+    supplier_id = response.json()["data"]["id"]
+
+    form = db.query(ContactForm).filter(ContactForm.supplier_id == supplier_id).first()
+    assert form.questions_json is None
+    assert form.template_id is not None
+
+    response = client.get(f"/contact-forms/supplier/{supplier_id}")
+    assert response.json()["data"]["questions"] == get_default_contact_form_questions()
+
+    custom = [{"question": "Data do evento", "type": "date", "required": True}]
+    response = client.put(f"/contact-forms/{form.id}", json={"questions": custom}, headers=headers)
+    assert response.status_code == 200
+    db.refresh(form)
+    assert form.template_id is None
+    assert json.loads(form.questions_json)[0]["question"] == "Data do evento"
+
+    response = client.post(f"/contact-forms/{form.id}/reset-to-default", headers=headers)
+    assert response.json()["data"]["questions"] == get_default_contact_form_questions()
+    db.refresh(form)
+    assert form.questions_json is None
+
+
+def test_inbox_counters_and_cursor_pagination(client, db, make_supplier):
+    """Test that counters follow submit/mark-read and cursor pages don't overlap."""
+    supplier, headers = make_supplier()
+    form = _create_form(db, supplier)
+    for guests in range(1, 6):
+        client.post(f"/contact-forms/{form.id}/submit", json={"answers": _answers("2026-07-01", guests, "Outro")})
+    assert submission_queue.flush()
+
+    url = f"/contact-forms/{form.id}/submissions"
+    first = client.get(url, params={"page_size": 3}, headers=headers).json()
+    assert first["total"] == 5
+    assert first["unread_count"] == 5
+    second = client.get(url, params={"page_size": 3, "cursor": first["next_cursor"]}, headers=headers).json()
+    ids = [s["id"] for s in first["data"]] + [s["id"] for s in second["data"]]
+    assert len(ids) == len(set(ids)) == 5
+    assert second["next_cursor"] is None
+
+    client.put(f"{url}/{ids[0]}/mark-read", headers=headers)
+    client.put(f"{url}/{ids[0]}/mark-read", headers=headers)
+    response = client.get(url, params={"read": False}, headers=headers).json()
+    assert response["unread_count"] == 4
+    assert response["total"] == 4
+
+
+def test_cursor_pagination_with_mixed_created_at_formats(client, db, make_supplier):
+    """Test that cursor pages follow insertion order whatever format created_at was stored in."""
+    supplier, headers = make_supplier()
+    form = _create_form(db, supplier)
+    # Formats found in SQLite databases: CURRENT_TIMESTAMP, isoformat() with and without offset/micros
+    created = ["2026-01-02 10:00:00", "2026-01-01T10:00:00.123456+00:00", "2026-01-02T09:00:00", "2026-01-01 23:59:59.5"]
+    for value in created:
+        db.execute(
+            text(
+                "INSERT INTO contact_form_submissions (contact_form_id, answers_json, read, archived, created_at) "
+                "VALUES (:form_id, '{}', 0, 0, :created_at)"
+            ),
+            {"form_id": form.id, "created_at": value},
+        )
+    db.commit()
+    inserted = [row[0] for row in db.execute(
+        text("SELECT id FROM contact_form_submissions WHERE contact_form_id = :form_id ORDER BY id"), {"form_id": form.id}
+    )]
+
+    url = f"/contact-forms/{form.id}/submissions"
+    for sort_order, expected in (("desc", inserted[::-1]), ("asc", inserted)):
+        seen, cursor = [], None
+        while True:
+            params = {"page_size": 1, "sort_order": sort_order, **({"cursor": cursor} if cursor else {})}
+            page = client.get(url, params=params, headers=headers).json()
+            seen += [s["id"] for s in page["data"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == expected
+
+
+def test_bulk_archive_and_mark_read(client, db, make_supplier):
+    """Test bulk actions report per-id results and keep the counters right."""
+    supplier, headers = make_supplier()
+    form = _create_form(db, supplier)
+    for guests in range(1, 5):
+        client.post(f"/contact-forms/{form.id}/submit", json={"answers": _answers("2026-08-01", guests, "Outro")})
+    assert submission_queue.flush()
+
+    url = f"/contact-forms/{form.id}/submissions"
+    ids = [s["id"] for s in client.get(url, headers=headers).json()["data"]]
+
+    response = client.post(f"{url}/bulk", json={"action": "mark_read", "submission_ids": ids[:2] + [999999]}, headers=headers)
+    statuses = [r["status"] for r in response.json()["data"]["results"]]
+    assert statuses == ["updated", "updated", "not_found"]
+    assert response.json()["data"]["unread_count"] == 2
+
+    response = client.post(f"{url}/bulk", json={"action": "archive", "submission_ids": ids[1:3]}, headers=headers)
+    data = response.json()["data"]
+    assert data["updated"] == 2
+    assert data["total"] == 2
+    assert data["unread_count"] == 1
+
+    archived = client.get(url, params={"archived": True}, headers=headers).json()
+    assert sorted(s["id"] for s in archived["data"]) == sorted(ids[1:3])
+
+    # Everything older than the newest submission: only the oldest one is left to archive
+    data = client.post(f"{url}/bulk", json={"action": "archive", "before_id": ids[0]}, headers=headers).json()["data"]
+    assert (data["updated"], data["total"], data["unread_count"]) == (1, 1, 0)
+
+
+def test_submission_queue_recovers_dead_workers_logs_once(db, make_supplier):
+    """Test per-process logs: a dead worker's log is replayed by exactly one process, then removed."""
+    import os
+    import subprocess
+    import sys
+    import tempfile
+    from app.services.submission_queue import SubmissionQueue, new_submission_record
+
+    supplier, _ = make_supplier()
+    form = _create_form(db, supplier)
+    base = os.path.join(tempfile.mkdtemp(), "queue.log")
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    record = new_submission_record(form.id, _answers("2026-07-07", 30, "Aniversário"), "Ana", None, None)
+    with open(f"{base}.{dead.pid}", "w", encoding="utf-8") as orphan:
+        orphan.write(json.dumps(record) + "\n")
+    with open(f"{base}.{os.getppid()}", "w", encoding="utf-8") as alive:  # A live worker's log: not touched
+        alive.write(json.dumps(new_submission_record(form.id, {}, None, None, None)) + "\n")
+
+    first, second = SubmissionQueue(base), SubmissionQueue(base)
+    first.start()
+    assert first.flush()
+    second.start()
+    assert second.flush()
+    first.stop()
+    second.stop()
+
+    stored = db.query(ContactFormSubmission).filter(ContactFormSubmission.idempotency_key == record["idempotency_key"])
+    assert stored.count() == 1
+    assert sorted(os.listdir(os.path.dirname(base))) == [f"queue.log.{os.getppid()}"]
@@ -0,0 +1,260 @@
+# app/tests/test_database.py
+"""
+Tests for database engine configuration.
+"""
+import os
+import tempfile
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database import create_sqlite_engines
+
+
+def test_sqlite_production_profile_splits_reads_and_writes():
+    """Test WAL/pragmas on the writer and read-only pooled connections on the reader."""
+    path = os.path.join(tempfile.mkdtemp(), "profile.db")
+    writer, reader = create_sqlite_engines(f"sqlite:///{path}", production=True, read_pool_size=2)
+    try:
+        with writer.begin() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+            conn.execute(text("INSERT INTO items (name) VALUES ('a')"))
+        assert writer.pool.size() == 1
+
+        with reader.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM items")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+            with pytest.raises(OperationalError):
+                conn.execute(text("INSERT INTO items (name) VALUES ('b')"))
+    finally:
+        writer.dispose()
+        reader.dispose()
+
+
+def test_sqlite_default_profile_has_no_read_engine():
+    """Test that without the production profile a single engine serves reads and writes."""
+    path = os.path.join(tempfile.mkdtemp(), "default.db")
+    writer, reader = create_sqlite_engines(f"sqlite:///{path}", production=False)
+    try:
+        assert reader is None
+        with writer.connect() as conn:
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    finally:
+        writer.dispose()
+
+
+def test_write_executor_group_commits_with_per_unit_errors():
+    """Test that concurrent units share commits and a failing unit only fails its own caller."""
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import event
+    from sqlalchemy.orm import sessionmaker
+    from app.core.write_executor import WriteExecutor
+    from app.database import create_write_executor_engine
+
+    path = os.path.join(tempfile.mkdtemp(), "executor.db")
+    executor_engine = create_write_executor_engine(f"sqlite:///{path}")
+    with executor_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)"))
+    commits = []
+    event.listen(executor_engine, "commit", lambda conn: commits.append(1))
+    executor = WriteExecutor(sessionmaker(bind=executor_engine), linger_seconds=0.05)
+
+    def insert(name):
+        def unit(session):
+            session.execute(text("INSERT INTO items (name) VALUES (:name)"), {"name": name})
+            return name
+        return unit
+
+    names = [f"item-{i}" for i in range(20)] + ["item-0"]  # the duplicate must fail alone
+    try:
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            futures = [pool.submit(executor.run, insert(name)) for name in names]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        assert len(errors) == 1
+        assert sorted(f.result() for f in futures if f.exception() is None) == sorted(set(names))
+        assert len(commits) < 20
+        with executor_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM items")).scalar() == 20
+    finally:
+        executor.stop()
+        executor_engine.dispose()
+
+
+def test_write_executor_cancels_units_that_time_out_before_starting():
+    """Test that a unit still queued when its caller times out never runs."""
+    import threading
+    from concurrent.futures import TimeoutError as FutureTimeoutError
+    from sqlalchemy.orm import sessionmaker
+    from app.core.write_executor import WriteExecutor
+    from app.database import create_write_executor_engine
+
+    executor_engine = create_write_executor_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'executor.db')}")
+    executor = WriteExecutor(sessionmaker(bind=executor_engine), linger_seconds=0)
+    started, release, ran = threading.Event(), threading.Event(), []
+
+    def blocking_unit(session):
+        started.set()
+        return release.wait(5)
+
+    try:
+        blocker = executor.submit(blocking_unit)
+        assert started.wait(5)
+        with pytest.raises(FutureTimeoutError):
+            executor.run(lambda session: ran.append(1), timeout=0.05)
+        release.set()
+        assert blocker.result(5) is True
+        assert executor.run(lambda session: "next", timeout=5) == "next"
+        assert ran == []
+    finally:
+        executor.stop()
+        executor_engine.dispose()
+
+
+def test_run_write_async_keeps_the_unit_off_the_event_loop(db):
+    """Test that without the executor the unit and its commit run in a worker thread."""
+    import asyncio
+    import threading
+    from app.core.write_executor import run_write_async
+
+    async def write():
+        loop_thread = threading.get_ident()
+        unit_thread = await run_write_async(db, lambda session: threading.get_ident())
+        return loop_thread, unit_thread
+
+    loop_thread, unit_thread = asyncio.run(write())
+    assert unit_thread != loop_thread
+
+
+def test_create_review_through_write_executor(client, make_user, make_supplier, monkeypatch):
+    """Test a write endpoint with the executor enabled: results and errors reach the caller."""
+    from app.core import write_executor
+    monkeypatch.setattr(write_executor, "WRITE_EXECUTOR_ENABLED", True)
+    supplier, _ = make_supplier()
+    _, headers = make_user()
+    payload = {"supplier_id": supplier.id, "rating": 5, "comment": "Excelente atendimento!"}
+
+    response = client.post("/reviews", json=payload, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["data"]["supplier_id"] == supplier.id
+    assert response.json()["data"]["created_at"] is not None
+
+    response = client.post("/reviews", json=payload, headers=headers)
+    assert response.status_code == 400
+
+
+def test_write_executor_writes_count_for_read_your_writes(db, monkeypatch):
+    """Test that a write committed by the executor flags the request, so its client gets the last-write cookie."""
+    import asyncio
+    from app.core import write_executor
+    from app.core.read_replicas import ReadYourWritesMiddleware, ReplicaSet, RoutingState, _routing_state
+    monkeypatch.setattr(write_executor, "WRITE_EXECUTOR_ENABLED", True)
+
+    state = RoutingState()
+    token = _routing_state.set(state)
+    try:
+        write_executor.run_write(db, lambda session: session.execute(text("UPDATE categories SET name = name WHERE 0 = 1")))
+    finally:
+        _routing_state.reset(token)
+    assert state.wrote
+
+    # End to end through the middleware: the executor's commit sets the cookie
+    async def endpoint(scope, receive, send):
+        write_executor.run_write(db, lambda session: None)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = ReadYourWritesMiddleware(endpoint, ReplicaSet([]))
+    asyncio.run(middleware({"type": "http", "headers": []}, None, send))
+    assert any(name == b"set-cookie" and value.startswith(b"db_last_write=") for name, value in sent[0]["headers"])
+
+
+def test_async_urls_use_async_drivers():
+    """Test the sync -> async driver mapping used by the async engine."""
+    from app.database import to_async_url
+    assert to_async_url("sqlite:////tmp/app.db") == "sqlite+aiosqlite:////tmp/app.db"
+    assert to_async_url("postgresql://user:secret@db:5432/eventdb") == "postgresql+asyncpg://user:secret@db:5432/eventdb"
+    assert to_async_url("postgresql+psycopg2://user:secret@db/eventdb") == "postgresql+asyncpg://user:secret@db/eventdb"
+
+
+def test_routing_session_reads_from_replicas_until_a_write():
+    """Test round-robin replica reads, primary stickiness after a write and unhealthy replica fallback."""
+    from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+    from sqlalchemy.orm import sessionmaker
+    from app.core.read_replicas import (
+        Replica, ReplicaSet, RoutingSession, RoutingState, _routing_state, must_read_primary, track_primary_writes,
+    )
+
+    directory = tempfile.mkdtemp()
+    metadata = MetaData()
+    items = Table("items", metadata, Column("id", Integer, primary_key=True), Column("name", String))
+    engines = {}
+    for name in ("primary", "replica1", "replica2"):
+        engines[name] = create_engine(f"sqlite:///{os.path.join(directory, name + '.db')}")
+        metadata.create_all(engines[name])
+        with engines[name].begin() as conn:
+            conn.execute(insert(items).values(name=name))
+    track_primary_writes(engines["primary"])
+    replica_set = ReplicaSet([Replica(engines["replica1"]), Replica(engines["replica2"])], check_interval=3600)
+    factory = sessionmaker(class_=RoutingSession, primary=engines["primary"], replica_set=replica_set)
+    read_name = lambda db: db.execute(select(items.c.name)).scalar()
+
+    token = _routing_state.set(RoutingState())
+    try:
+        with factory() as db:
+            assert {read_name(db), read_name(db)} == {"replica1", "replica2"}
+            db.execute(insert(items).values(name="new"))
+            db.commit()
+            assert read_name(db) == "primary"  # Reads after a write stick to the primary
+
+        _routing_state.set(RoutingState())
+        replica_set.replicas[0].healthy = False
+        with factory() as db:
+            assert [read_name(db), read_name(db)] == ["replica2", "replica2"]
+        replica_set.replicas[1].healthy = False
+        with factory() as db:
+            assert read_name(db) == "primary"
+
+        # Read-your-writes window: lasts at least STICKY_SECONDS, longer while replicas lag
+        replica_set.replicas[0].healthy = True
+        replica_set.replicas[0].lag_seconds = 60
+        assert must_read_primary(1000.0, replica_set, now=1030.0)
+        assert not must_read_primary(1000.0, replica_set, now=1061.0)
+        assert not must_read_primary(None, replica_set)
+    finally:
+        _routing_state.reset(token)
+        for e in engines.values():
+            e.dispose()
+
+
+def test_response_cache_stores_only_primary_reads():
+    """Test that a cache miss moves the request's reads to the primary and replica-built bodies are not stored."""
+    from starlette.requests import Request
+    from app.core.read_replicas import RoutingState, _routing_state
+    from app.core.response_cache import ResponseCache
+
+    cache = ResponseCache(name="replica_test")
+    make_request = lambda: Request({"type": "http", "method": "GET", "path": "/replica-test", "query_string": b"", "headers": []})
+
+    state = RoutingState()
+    token = _routing_state.set(state)
+    try:
+        request = make_request()
+        assert cache.get(request) is None
+        assert state.force_primary
+        state.read_replica = True  # e.g. a read that was routed before the miss
+        cache.put(request, {"data": "maybe stale"})
+        assert len(cache) == 0
+
+        _routing_state.set(RoutingState())
+        request = make_request()
+        assert cache.get(request) is None
+        cache.put(request, {"data": "from the primary"})
+        assert len(cache) == 1
+    finally:
+        _routing_state.reset(token)
@@ -0,0 +1,113 @@
+# app/tests/test_monitoring.py
+"""
+Tests for request instrumentation and operational endpoints.
+"""
+import json
+import logging
+from app.core.sql_instrumentation import fingerprint, RequestSQLStats
+
+
+def test_fingerprint_ignores_parameters():
+    """Test that statements differing only by literals or IN-list size share a fingerprint."""
+    assert fingerprint("SELECT * FROM users WHERE id = 3") == fingerprint("SELECT *  FROM users\nWHERE id = 42")
+    assert fingerprint("SELECT * FROM reviews WHERE id IN (?, ?, ?)") == "SELECT * FROM reviews WHERE id IN (...)"
+    assert fingerprint("SELECT * FROM users WHERE name = 'Ana'") == "SELECT * FROM users WHERE name = ?"
+
+    stats = RequestSQLStats()
+    for user_id in range(6):
+        stats.record(f"SELECT * FROM users WHERE id = {user_id}", 1.0)
+    stats.record("SELECT * FROM reviews", 1.0)
+    assert stats.repeated(threshold=5) == [{"fingerprint": "SELECT * FROM users WHERE id = ?", "count": 6}]
+
+
+def test_requests_report_sql_stats(client, make_user, make_supplier, caplog):
+    """Test the Server-Timing header and the structured log line for a request."""
+    supplier, _ = make_supplier()
+    with caplog.at_level(logging.INFO, logger="app.sql"):
+        response = client.get(f"/reviews/supplier/{supplier.id}")
+
+    assert response.headers["server-timing"].startswith("db;dur=")
+    records = [json.loads(r.getMessage()) for r in caplog.records if r.name == "app.sql"]
+    record = records[-1]
+    assert record["path"] == f"/reviews/supplier/{supplier.id}"
+    assert record["status"] == 200
+    assert record["db_queries"] >= 2
+    assert f'desc="{record["db_queries"]} queries"' in response.headers["server-timing"]
+    assert "n_plus_one" not in record
+
+
+def test_metrics_endpoint_exposes_route_histograms(client, make_supplier):
+    """Test that /metrics reports per-route latency, pool, threadpool and cache metrics."""
+    supplier, _ = make_supplier()
+    client.get(f"/reviews/supplier/{supplier.id}")
+    client.get("/reviews/approved")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/reviews/supplier/{supplier_id}",status="200"}' in body
+    assert 'db_pool_checked_out_connections{pool="primary"}' in body
+    assert 'db_pool_checked_out_connections{pool="async_read"}' in body
+    assert "threadpool_max_threads" in body
+    assert 'cache_requests_total{cache="recent_approved_reviews"' in body
+
+
+def test_readiness_reports_checks_and_is_cached(client, make_user, monkeypatch):
+    """Test /health/ready: ok with details, 503 when a check fails, cached between probes."""
+    from app.services import health_service
+    health_service.readiness.invalidate()
+    make_user()  # a committed write
+
+    assert client.get("/health/live").json() == {"status": "ok"}
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["checks"]["database"]["ok"] is True
+    assert "free_mb" in body["checks"]["disk"]
+    assert body["last_write"]["age_seconds"] is not None
+
+    monkeypatch.setattr(health_service, "check_database", lambda: {"ok": False, "error": "locked"})
+    assert client.get("/health/ready").status_code == 200  # still cached
+
+    health_service.readiness.invalidate()
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"]["error"] == "locked"
+    health_service.readiness.invalidate()
+
+
+def test_admin_requests_can_be_profiled(client, make_user, make_supplier, monkeypatch):
+    """Test that X-Profile: 1 stores a capped report for admins and is ignored for others."""
+    from app.core import profiler
+    from app.core.profiler import profile_store
+    from app.routes.supplier_routes import supplier_flights
+    monkeypatch.setattr(profile_store, "max_reports", 2)
+    monkeypatch.setattr(supplier_flights, "grace_seconds", 0)  # Every profiled request runs the query
+    _, admin_headers = make_user("admin")
+    _, client_headers = make_user("client")
+    make_supplier()
+
+    response = client.get("/fornecedores/", headers={**client_headers, "X-Profile": "1"})
+    assert "x-profile-id" not in response.headers
+    response = client.get("/fornecedores/", headers=admin_headers)
+    assert "x-profile-id" not in response.headers
+
+    for _ in range(3):
+        response = client.get("/fornecedores/", headers={**admin_headers, "X-Profile": "1"})
+    profile_id = response.headers["x-profile-id"]
+
+    listing = client.get("/profiles", headers=admin_headers).json()["data"]
+    assert len(listing) == 2
+    assert listing[0]["id"] == profile_id
+
+    report = client.get(f"/profiles/{profile_id}", headers=admin_headers).json()["data"]
+    assert report["path"] == "/fornecedores/"
+    assert report["sql"]["count"] >= 1
+    assert any("supplier_routes.py" in f["function"] for f in report["functions"])
+    assert client.get(f"/profiles/{profile_id}", headers=client_headers).status_code == 403
+
+    # One profiled request per worker at a time
+    with profiler._profiling_lock:
+        response = client.get("/fornecedores/", headers={**admin_headers, "X-Profile": "1"})
+    assert response.status_code == 409
+    assert "x-profile-id" not in response.headers
@@ -0,0 +1,272 @@
+# app/tests/test_review.py
+"""
+Tests for review endpoints.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.core.response_cache import response_cache
+from app.database import engine, async_engine
+from app.models.review_model import Review
+from app.services import review_service
+from app.services.review_service import recent_approved_reviews
+from app.utils import moderation
+
+
+@contextmanager
+def count_statements():
+    """Count SQL statements executed on the sync and async engines inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+def _create_reviews(db, supplier, users, status="pending"):
+    reviews = []
+    for index, user in enumerate(users):
+        review = Review(
+            user_id=user.id,
+            supplier_id=supplier.id,
+            rating=(index % 5) + 1,
+            comment="Serviço excelente, recomendo!",
+            status=status,
+        )
+        db.add(review)
+        reviews.append(review)
+    db.commit()
+    for review in reviews:
+        db.refresh(review)
+    return reviews
+
+
+def test_bulk_moderate_reports_per_id_results(client, db, make_user, make_supplier):
+    """Test that bulk moderation only touches pending reviews and reports each id."""
+    _, admin_headers = make_user("admin")
+    supplier, _ = make_supplier()
+    users = [make_user()[0] for _ in range(3)]
+    reviews = _create_reviews(db, supplier, users)
+    reviews[2].status = "rejected"
+    db.commit()
+
+    ids = [r.id for r in reviews] + [999999]
+    response = client.post("/reviews/bulk-moderate", json={"action": "approve", "review_ids": ids}, headers=admin_headers)
+    assert response.status_code == 200
+    statuses = [r["status"] for r in response.json()["data"]["results"]]
+    assert statuses == ["approved", "approved", "already_rejected", "not_found"]
+
+    newer = _create_reviews(db, supplier, [make_user()[0] for _ in range(2)])
+    response = client.post("/reviews/bulk-moderate", json={"action": "reject", "before_id": newer[1].id}, headers=admin_headers)
+    assert response.status_code == 200
+    for review in newer:
+        db.refresh(review)
+    assert [r.status for r in newer] == ["rejected", "pending"]  # Strictly older than before_id
+
+
+def test_bulk_moderate_requires_admin(client, make_user):
+    """Test that non-admin users cannot bulk moderate."""
+    _, headers = make_user("client")
+    response = client.post("/reviews/bulk-moderate", json={"action": "approve", "review_ids": [1]}, headers=headers)
+    assert response.status_code == 403
+
+
+def test_review_feeds_use_fixed_number_of_queries(client, db, make_user, make_supplier):
+    """Test that a page of 50 reviews costs at most two statements (no N+1 lazy loads)."""
+    _, admin_headers = make_user("admin")
+    supplier, _ = make_supplier()
+    users = [make_user()[0] for _ in range(50)]
+    _create_reviews(db, supplier, users, status="approved")
+
+    requests = [
+        (f"/reviews/supplier/{supplier.id}", {"page_size": 50}, {}),
+        ("/reviews/approved", {"limit": 50}, {}),
+        ("/reviews/all", {"page_size": 50}, admin_headers),
+        ("/reviews/pending", {"page_size": 50}, admin_headers),
+    ]
+    for url, params, headers in requests:
+        with count_statements() as statements:
+            response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        assert len(statements) <= 2, (url, statements)
+
+    response = client.get(f"/reviews/supplier/{supplier.id}", params={"page_size": 50})
+    assert response.json()["total"] == 50
+    assert len(response.json()["data"]) == 50
+
+
+def test_approved_reviews_served_from_buffer_with_etag(client, db, make_user, make_supplier):
+    """Test that the carousel follows moderation, skips the database when warm and honours ETags."""
+    recent_approved_reviews.invalidate()
+    _, admin_headers = make_user("admin")
+    supplier, _ = make_supplier()
+    review = _create_reviews(db, supplier, [make_user()[0]])[0]
+
+    client.put(f"/reviews/{review.id}/approve", headers=admin_headers)
+    client.get("/reviews/approved")  # warm up
+
+    with count_statements() as statements:
+        response = client.get("/reviews/approved")
+    assert statements == []
+    assert response.json()["data"][0]["id"] == review.id
+    assert response.json()["data"][0]["supplier_name"] == supplier.fantasy_name
+
+    etag = response.headers["etag"]
+    response = client.get("/reviews/approved", headers={"If-None-Match": f"W/{etag}"})
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == response_cache.cache_control
+
+    client.put(f"/reviews/{review.id}", json={"rating": 2}, headers=admin_headers)
+    response = client.get("/reviews/approved", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert review.id not in [r["id"] for r in response.json()["data"]]
+
+
+def test_claimed_reviews_are_disjoint_and_leases_expire(client, db, make_user, make_supplier):
+    """Test that two admins claim different reviews, expired leases return and leased reviews are protected."""
+    _, first_headers = make_user("admin")
+    _, second_headers = make_user("admin")
+    supplier, _ = make_supplier()
+    _create_reviews(db, supplier, [make_user()[0] for _ in range(6)])
+
+    first = client.post("/reviews/pending/claim", params={"limit": 3}, headers=first_headers).json()["data"]
+    second = client.post("/reviews/pending/claim", params={"limit": 3}, headers=second_headers).json()["data"]
+    first_ids = {r["id"] for r in first}
+    second_ids = {r["id"] for r in second}
+    assert len(first_ids) == 3
+    assert len(second_ids) == 3
+    assert first_ids.isdisjoint(second_ids)
+
+    leased = next(iter(first_ids))
+    response = client.put(f"/reviews/{leased}/approve", headers=second_headers)
+    assert response.status_code == 409
+    response = client.put(f"/reviews/{leased}/approve", headers=first_headers)
+    assert response.status_code == 200
+
+    # Expire the first admin's remaining leases: they go back to the queue
+    expired = first_ids - {leased}
+    db.query(Review).filter(Review.id.in_(expired)).update(
+        {Review.claim_expires_at: datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False
+    )
+    db.commit()
+    reclaimed = client.post("/reviews/pending/claim", params={"limit": 50}, headers=second_headers).json()["data"]
+    assert expired <= {r["id"] for r in reclaimed}
+
+    params = {"page_size": 50}
+    visible = client.get("/reviews/pending", params={**params, "unclaimed_only": True}, headers=first_headers)
+    everything = client.get("/reviews/pending", params=params, headers=first_headers)
+    assert everything.json()["total"] - visible.json()["total"] >= len(second_ids) + len(expired)
+
+    client.post("/reviews/pending/release", headers=second_headers)
+    visible = client.get("/reviews/pending", params={**params, "unclaimed_only": True}, headers=first_headers)
+    assert visible.json()["total"] == everything.json()["total"]
+
+
+def test_term_matcher_finds_overlapping_whole_words():
+    """Test the Aho–Corasick matcher: overlapping terms, accents and word boundaries."""
+    matcher = moderation.build_matcher(["golpe", "golpista", "filho da puta", "puta"])
+    text = moderation.normalize_text("GOLPISTA! Filho da puta... golpe no computador")
+    assert sorted(term for term, _ in matcher.find(text)) == ["filho da puta", "golpe", "golpista", "puta"]
+
+    score, flags = moderation.screen_comment("Ótimo buffet, ligue (11) 98765-4321 ou www.outro.com.br")
+    assert flags == ["url", "phone"]
+    assert score == moderation.URL_WEIGHT + moderation.PHONE_WEIGHT
+    assert moderation.screen_comment("Veja festas.com/promo ou ligue 11 3456-7890") == (80, ["url", "phone"])
+
+    # Ordinary text: missing spaces after a period, order numbers, CNPJ and dates
+    for comment in (
+        "Adorei.me atenderam muito bem",
+        "Pedido 12345678 entregue no prazo",
+        "Empresa séria, CNPJ 12.345.678/0001-90",
+        "Festa em 15.03.2024, nota 9.5",
+    ):
+        assert moderation.screen_comment(comment) == (0, []), comment
+
+
+def test_reviews_are_screened_sorted_by_risk_and_auto_approved(client, db, make_user, make_supplier, monkeypatch):
+    """Test that risky reviews float to the top of the queue and clean ones can skip it."""
+    _, admin_headers = make_user("admin")
+    supplier, _ = make_supplier()
+    _, clean_headers = make_user()
+    _, risky_headers = make_user()
+
+    client.post("/reviews", json={"supplier_id": supplier.id, "rating": 5, "comment": "Festa impecável, recomendo."}, headers=clean_headers)
+    response = client.post("/reviews", json={"supplier_id": supplier.id, "rating": 1, "comment": "Isso é golpe, chame no whatsapp"}, headers=risky_headers)
+    risky_id = response.json()["data"]["id"]
+
+    response = client.get("/reviews/pending", params={"sort": "risk"}, headers=admin_headers)
+    first = response.json()["data"][0]
+    assert first["id"] == risky_id
+    assert first["risk_score"] > 0
+    assert "term:golpe" in first["risk_flags"]
+
+    monkeypatch.setattr(moderation, "AUTO_APPROVE_BELOW", 20)
+    _, headers = make_user()
+    response = client.post("/reviews", json={"supplier_id": supplier.id, "rating": 4, "comment": "Comida deliciosa e equipe atenciosa."}, headers=headers)
+    assert response.json()["data"]["status"] == "approved"
+    distribution = client.get(f"/fornecedores/{supplier.id}").json()["data"]["rating_distribution"]
+    assert distribution["counts"]["4"] == 1
+
+    response = client.put(f"/reviews/{risky_id}", json={"comment": "Isso é golpe, chame no whatsapp!!"}, headers=risky_headers)
+    assert response.json()["data"]["status"] == "pending"
+
+
+def test_reviews_summary_for_many_suppliers(client, db, make_user, make_supplier):
+    """Test that one request summarizes many suppliers, from cache until ratings change."""
+    _, admin_headers = make_user("admin")
+    suppliers = [make_supplier(name=f"Fornecedor {i}")[0] for i in range(3)]
+    reviews = _create_reviews(db, suppliers[0], [make_user()[0] for _ in range(2)])  # ratings 1 and 2
+    for review in reviews:
+        client.put(f"/reviews/{review.id}/approve", headers=admin_headers)
+
+    ids = ",".join(str(s.id) for s in reversed(suppliers)) + ",999999"
+    response = client.get("/reviews/summary", params={"supplier_ids": ids})
+    body = response.json()
+    assert body["data"][str(suppliers[0].id)] == {
+        "average": 1.5, "count": 2, "distribution": {"1": 1, "2": 1, "3": 0, "4": 0, "5": 0},
+    }
+    assert body["data"][str(suppliers[1].id)]["count"] == 0
+    assert body["not_found"] == [999999]
+
+    # Same id set in another order: served from cache, no SQL
+    same_ids = ",".join(str(s.id) for s in suppliers) + ",999999"
+    with count_statements() as statements:
+        cached = client.get("/reviews/summary", params={"supplier_ids": same_ids})
+    assert statements == []
+    assert cached.headers["etag"] == response.headers["etag"]
+    assert cached.headers["cache-control"] == response_cache.cache_control
+    revalidated = client.get(
+        "/reviews/summary", params={"supplier_ids": same_ids}, headers={"If-None-Match": f'"other", W/{response.headers["etag"]}'}
+    )
+    assert revalidated.status_code == 304
+
+    client.delete(f"/reviews/{reviews[0].id}", headers=admin_headers)
+    response = client.get("/reviews/summary", params={"supplier_ids": same_ids})
+    assert response.json()["data"][str(suppliers[0].id)]["count"] == 1
+
+
+def test_rating_changes_invalidate_once_per_commit(db, make_supplier, monkeypatch):
+    """Test that rating caches are invalidated once per commit, and not after a rollback."""
+    supplier, _ = make_supplier()
+    invalidated = []
+    monkeypatch.setattr(review_service.rating_summaries, "invalidate", lambda: invalidated.append("summaries"))
+    monkeypatch.setattr(review_service.response_cache, "invalidate", lambda *tags: invalidated.append(tags))
+
+    review_service.apply_rating_changes(db, {supplier.id: {5: 1}})
+    db.rollback()
+    db.commit()
+    assert invalidated == []
+
+    review_service.apply_rating_changes(db, {supplier.id: {5: 1}})
+    review_service.apply_rating_changes(db, {supplier.id: {4: 1}})
+    db.commit()
+    db.commit()
+    assert invalidated == ["summaries", (f"supplier:{supplier.id}",)]
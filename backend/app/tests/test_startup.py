@@ -0,0 +1,66 @@
+# app/tests/test_startup.py
+"""
+Tests for application startup: migrations match the models, and import/startup
+stay within budget without touching the schema.
+"""
+import os
+import subprocess
+import sys
+import time
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.database import Base, engine
+from app.main import create_app
+from app.tests.conftest import BACKEND_DIR
+
+# Budgets, in seconds (override on slow CI machines)
+IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "5.0"))
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_LIFESPAN_BUDGET_SECONDS", "1.0"))
+
+SCHEMA_STATEMENTS = ("CREATE", "ALTER", "DROP", "PRAGMA TABLE_INFO", "PRAGMA MAIN.TABLE_INFO")
+
+
+def test_migrations_match_models():
+    """Test that `alembic upgrade head` produces exactly the schema the models describe."""
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+
+
+def test_import_time_within_budget(record_property):
+    """Test that importing app.main (fresh interpreter) does no DDL and stays within budget."""
+    code = (
+        "import time; started = time.perf_counter(); import app.main; "
+        "print(time.perf_counter() - started)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=os.environ.copy(),
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    seconds = float(result.stdout.strip().splitlines()[-1])
+    record_property("import_seconds", round(seconds, 3))
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+def test_startup_warms_pool_without_schema_statements(record_property):
+    """Test that the lifespan only opens connections: no DDL, no reflection."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.strip().upper())
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        started = time.perf_counter()
+        with TestClient(create_app()) as client:
+            seconds = time.perf_counter() - started
+            assert client.get("/health/live").status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    record_property("startup_seconds", round(seconds, 3))
+    assert "SELECT 1" in statements
+    assert not [s for s in statements if s.startswith(SCHEMA_STATEMENTS) or "SQLITE_MASTER" in s]
+    assert seconds < STARTUP_BUDGET_SECONDS
@@ -0,0 +1,234 @@
+# app/tests/test_supplier.py
+"""
+Tests for supplier endpoints.
+"""
+from app.models.review_model import Review
+
+
+def test_rating_distribution_follows_moderation(client, db, make_user, make_supplier):
+    """Test that the histogram changes when reviews enter or leave the approved state."""
+    _, admin_headers = make_user("admin")
+    supplier, _ = make_supplier()
+    other, _ = make_supplier("Outro Fornecedor")
+    reviews = []
+    for rating in [5, 5, 3]:
+        review = Review(user_id=make_user()[0].id, supplier_id=supplier.id, rating=rating,
+                        comment="Atendimento muito bom!", status="pending")
+        db.add(review)
+        reviews.append(review)
+    db.commit()
+
+    client.put(f"/reviews/{reviews[0].id}/approve", headers=admin_headers)
+    client.post("/reviews/bulk-moderate", json={"action": "approve", "review_ids": [reviews[1].id, reviews[2].id]},
+                headers=admin_headers)
+
+    distribution = client.get(f"/fornecedores/{supplier.id}").json()["data"]["rating_distribution"]
+    assert distribution["counts"] == {"1": 0, "2": 0, "3": 1, "4": 0, "5": 2}
+    assert distribution["total"] == 3
+    assert distribution["average"] == 4.3
+
+    client.delete(f"/reviews/{reviews[0].id}", headers=admin_headers)
+    client.put(f"/reviews/{reviews[2].id}", json={"rating": 1}, headers=admin_headers)
+
+    response = client.get("/fornecedores/rating-distributions", params={"ids": f"{supplier.id},{other.id}"})
+    data = response.json()["data"]
+    assert data[str(supplier.id)]["counts"]["5"] == 1
+    assert data[str(supplier.id)]["total"] == 1
+    assert data[str(other.id)]["total"] == 0
+
+
+def test_supplier_page_is_served_from_response_cache(client, make_supplier):
+    """Test cache hits without SQL, 304 on If-None-Match, and invalidation by the update endpoint."""
+    from app.tests.test_review import count_statements
+
+    supplier, owner_headers = make_supplier("Buffet Cacheado")
+    first = client.get(f"/fornecedores/{supplier.id}")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    assert "stale-while-revalidate=" in first.headers["cache-control"]
+
+    with count_statements() as statements:
+        again = client.get(f"/fornecedores/{supplier.id}")
+        not_modified = client.get(f"/fornecedores/{supplier.id}", headers={"If-None-Match": etag})
+    assert statements == []
+    assert again.json() == first.json()
+    assert not_modified.status_code == 304
+
+    client.put(f"/fornecedores/{supplier.id}", json={"fantasy_name": "Buffet Renomeado"}, headers=owner_headers)
+    updated = client.get(f"/fornecedores/{supplier.id}", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["data"]["fantasy_name"] == "Buffet Renomeado"
+    assert updated.headers["etag"] != etag
+
+
+def test_single_flight_coalesces_concurrent_identical_queries():
+    """Test one computation per key for concurrent callers, the grace window, and cancellation safety."""
+    import asyncio
+    from app.core.single_flight import SingleFlight
+
+    flights = SingleFlight("test", grace_seconds=0.05)
+    calls = []
+
+    async def compute(key):
+        calls.append(key)
+        await asyncio.sleep(0.02)
+        return f"result {key}"
+
+    async def scenario():
+        results = await asyncio.gather(
+            *[flights.do("a", lambda: compute("a")) for _ in range(50)],
+            *[flights.do("b", lambda: compute("b")) for _ in range(50)],
+        )
+        assert set(results) == {"result a", "result b"}
+        assert sorted(calls) == ["a", "b"]
+
+        assert await flights.do("a", lambda: compute("a")) == "result a"  # Within the grace window
+        assert len(calls) == 2
+        await asyncio.sleep(0.06)
+        await flights.do("a", lambda: compute("a"))
+        assert len(calls) == 3
+
+        # A cancelled caller doesn't cancel the computation the others wait on
+        first = asyncio.ensure_future(flights.do("c", lambda: compute("c")))
+        second = asyncio.ensure_future(flights.do("c", lambda: compute("c")))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "result c"
+
+        flights.clear()
+        await flights.do("c", lambda: compute("c"))
+        assert calls.count("c") == 2
+
+    asyncio.run(scenario())
+
+
+def test_swr_cache_serves_stale_and_refreshes_once():
+    """Test that a stale value is served at once while exactly one background refresh runs, and the LRU bound."""
+    import threading
+    import time
+    from app.core.swr_cache import SWRCache
+
+    refreshed = threading.Event()
+    cache = SWRCache("test", soft_ttl=0.05, hard_ttl=60, max_entries=2, on_refresh=lambda key: refreshed.set())
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(len(calls) + 1)
+        if len(calls) > 1:
+            release.wait(5)  # A slow recompute
+        return len(calls)
+
+    assert cache.get("k", compute) == 1  # First fill: computed synchronously
+    assert cache.get("k", compute) == 1  # Fresh
+    time.sleep(0.06)
+
+    started = time.perf_counter()
+    assert [cache.get("k", compute) for _ in range(20)] == [1] * 20  # Stale: served without waiting
+    assert time.perf_counter() - started < 0.5
+    release.set()
+    assert refreshed.wait(5)
+    assert cache.get("k", compute) == 2
+    assert calls == [1, 2]  # Exactly one recompute for 20 stale reads
+
+    cache.mark_stale("k")
+    refreshed.clear()
+    assert cache.get("k", compute) == 2
+    assert refreshed.wait(5)
+    assert cache.get("k", compute) == 3
+
+    cache.get("a", lambda: "a")
+    cache.get("b", lambda: "b")
+    assert len(cache) == 2
+    assert cache.get("k", lambda: "recomputed") == "recomputed"  # Least recently used, evicted
+
+
+def test_swr_refresh_started_before_a_write_is_not_stored():
+    """Test that a recompute running when the key is marked stale cannot store its pre-write value."""
+    import threading
+    import time
+    from app.core.swr_cache import SWRCache
+
+    cache = SWRCache("test_generation", soft_ttl=0.05, hard_ttl=60)
+    started, release = threading.Event(), threading.Event()
+    values = iter(["initial", "pre-write", "post-write"])
+
+    def compute():
+        value = next(values)
+        if value == "pre-write":
+            started.set()
+            release.wait(5)
+        return value
+
+    assert cache.get("k", compute) == "initial"
+    time.sleep(0.06)
+    assert cache.get("k", compute) == "initial"  # Starts the slow refresh
+    assert started.wait(5)
+    cache.mark_stale("k")  # A write lands while the refresh runs
+    release.set()
+    served, deadline = [], time.monotonic() + 5
+    while not served or served[-1] != "post-write":  # The dropped refresh lets the next read refresh again
+        assert time.monotonic() < deadline
+        served.append(cache.get("k", compute))
+        time.sleep(0.01)
+    assert "pre-write" not in served
+
+
+def test_invalidation_bus_reaches_other_workers():
+    """Test that an invalidation published by one worker is applied by the others, not echoed back."""
+    import os
+    import tempfile
+    import threading
+    from app.core.invalidation_bus import InvalidationBus, SQLiteLogTransport
+
+    path = os.path.join(tempfile.mkdtemp(), "bus.db")
+    workers = [InvalidationBus(SQLiteLogTransport(path, poll_interval=0.005)) for _ in range(3)]
+    received = {index: [] for index in range(3)}
+    delivered = threading.Barrier(3, timeout=5)  # Both other workers + the test
+    for index, bus in enumerate(workers):
+        def handler(*tags, index=index):
+            received[index].append(tags)
+            delivered.wait()
+        bus.subscribe("response.invalidate", handler)
+        bus.start()
+    try:
+        workers[0].publish("response.invalidate", "supplier:7", "categories")
+        delivered.wait()
+        assert received == {0: [], 1: [("supplier:7", "categories")], 2: [("supplier:7", "categories")]}
+    finally:
+        for bus in workers:
+            bus.stop()
+
+
+def test_catalog_snapshot_serves_listing_and_swaps_on_rebuild(client, db, make_user, make_supplier, monkeypatch):
+    """Test listing filters/ordering over the mmap snapshot, and remapping after an atomic rebuild."""
+    import os
+    import tempfile
+    from app.routes import supplier_routes
+    from app.services.catalog_snapshot import CatalogSnapshotReader, build_snapshot
+
+    city = "Snapshotópolis"
+    first, _ = make_supplier("Buffet Snapshot A", city=city, price_range="$$")
+    second, _ = make_supplier("Buffet Snapshot B", city=city, price_range="$$$")
+    db.add(Review(user_id=make_user()[0].id, supplier_id=first.id, rating=5,
+                  comment="Atendimento muito bom!", status="approved"))
+    db.commit()
+
+    path = os.path.join(tempfile.mkdtemp(), "catalog.snap")
+    build_snapshot(db, path)
+    reader = CatalogSnapshotReader(path, check_interval=0)
+    snapshot = reader.current()
+    assert snapshot.select(city="snapshotÓpolis") == [second.id, first.id]  # Newest first
+    assert snapshot.select(city=city, order_by="rating") == [first.id, second.id]
+    assert snapshot.select(city=city, price_range="$$$") == [second.id]
+
+    monkeypatch.setattr(supplier_routes, "catalog_snapshot", reader)
+    response = client.get("/fornecedores/", params={"city": city, "order_by": "rating", "page_size": 1})
+    assert response.json()["total"] == 2
+    assert [s["id"] for s in response.json()["data"]] == [first.id]
+
+    third, _ = make_supplier("Buffet Snapshot C", city=city)
+    build_snapshot(db, path)
+    assert reader.current() is not snapshot
+    assert reader.current().select(city=city)[0] == third.id
+    assert snapshot.select(city=city) == [second.id, first.id]  # The old mapping stays readable
@@ -2,7 +2,8 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db
 from app.models.user_model import User
 from app.utils.jwt_handler import decode_token
 
@@ -44,4 +45,24 @@ def get_current_user(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication token"
-        )
\ No newline at end of file
+        )
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Same as get_current_user, for async endpoints (uses the async session).
+    """
+    try:
+        payload = decode_token(credentials.credentials)
+        user_id = payload.get("sub")
+        user = await db.get(User, int(user_id)) if user_id is not None else None
+    except Exception:
+        user = None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication token"
+        )
+    return user
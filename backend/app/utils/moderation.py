@@ -0,0 +1,196 @@
+# app/utils/moderation.py
+"""
+Review comment pre-screening.
+
+Comments are scanned once against a term list compiled into an Aho–Corasick
+automaton (cost linear in the comment length, whatever the size of the list),
+plus URL and phone number detectors. The result is a 0-100 risk score that
+orders the moderation queue and can auto-approve clean reviews.
+"""
+import os
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+# Default Portuguese term list (accents and case are ignored when matching).
+# Override with MODERATION_TERMS_FILE: one term per line, optionally "term;weight".
+DEFAULT_TERMS = {
+    "golpe": 40,
+    "golpista": 50,
+    "fraude": 40,
+    "ladrão": 50,
+    "ladrões": 50,
+    "roubo": 40,
+    "lixo": 30,
+    "idiota": 50,
+    "imbecil": 50,
+    "otário": 50,
+    "babaca": 50,
+    "merda": 60,
+    "porcaria": 30,
+    "vagabundo": 50,
+    "desgraçado": 60,
+    "filho da puta": 80,
+    "puta": 60,
+    "caralho": 60,
+    "porra": 60,
+    "vai se foder": 80,
+    "chame no whatsapp": 40,
+    "me chama no zap": 40,
+    "promoção": 20,
+    "clique aqui": 40,
+}
+DEFAULT_TERM_WEIGHT = 40
+
+URL_WEIGHT = 40
+PHONE_WEIGHT = 40
+MAX_SCORE = 100
+
+# Links: a scheme or "www.", or a bare domain ending the text or followed by whitespace or a path.
+# ".me" is left to the first form: "adorei.me" is a missing space, not a link.
+URL_PATTERN = re.compile(
+    r"(?:https?://|www\.)\S+"
+    r"|\b[a-z0-9-]+(?:\.[a-z0-9-]+)*\.(?:com|net|org|io|ly|br)(?:\.br)?(?=[/\s]|$)",
+    re.IGNORECASE,
+)
+# Brazilian phone numbers: optional +55, area code (DDD), then an 8-9 digit number split by a separator.
+# Bare digit runs (order numbers, CNPJ fragments) do not match.
+PHONE_PATTERN = re.compile(r"(?<![\d./-])(?:\+?55[\s.-]?)?(?:\(\d{2}\)|\b\d{2})[\s.-]?9?\d{4}[\s.-]\d{4}\b")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents, so "Ladrão" and "ladrao" match the same term."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class TermMatcher:
+    """
+    Aho–Corasick automaton over a set of terms.
+
+    Matches are reported only on word boundaries, so "puta" does not match "computador".
+
+    Args:
+        terms: Mapping of term -> weight
+    """
+
+    def __init__(self, terms: Dict[str, int]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, int]]] = [[]]
+        for term, weight in terms.items():
+            self._add(normalize_text(term).strip(), weight)
+        self._build_failure_links()
+
+    def _add(self, term: str, weight: int) -> None:
+        if not term:
+            return
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append((term, weight))
+
+    def _build_failure_links(self) -> None:
+        # Breadth-first: a state's failure link is the longest proper suffix that is also a prefix
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Return (term, weight) for every whole-word occurrence in text.
+        text must already be normalized with normalize_text().
+        """
+        matches = []
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for term, weight in self._output[state]:
+                start = end - len(term) + 1
+                before = text[start - 1] if start > 0 else " "
+                after = text[end + 1] if end + 1 < len(text) else " "
+                if not before.isalnum() and not after.isalnum():
+                    matches.append((term, weight))
+        return matches
+
+
+def load_terms(path: str | None = None) -> Dict[str, int]:
+    """Load "term" or "term;weight" lines from path, falling back to DEFAULT_TERMS."""
+    path = path or os.getenv("MODERATION_TERMS_FILE")
+    if not path:
+        return dict(DEFAULT_TERMS)
+    terms = {}
+    with open(path, "r", encoding="utf-8") as terms_file:
+        for line in terms_file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            term, _, weight = line.partition(";")
+            terms[term.strip()] = int(weight) if weight.strip() else DEFAULT_TERM_WEIGHT
+    return terms
+
+
+def screen_comment(text: str, matcher: "TermMatcher | None" = None) -> Tuple[int, List[str]]:
+    """
+    Score a review comment.
+
+    Args:
+        text: Comment (raw or HTML-escaped)
+        matcher: Term automaton (defaults to the module-level one)
+
+    Returns:
+        tuple[int, list[str]]: (risk score 0-100, flags such as "term:golpe", "url", "phone")
+    """
+    if not text:
+        return 0, []
+    matcher = matcher or term_matcher
+    normalized = normalize_text(text)
+
+    score = 0
+    flags = []
+    for term, weight in matcher.find(normalized):
+        flag = f"term:{term}"
+        if flag not in flags:
+            flags.append(flag)
+            score += weight
+    if URL_PATTERN.search(normalized):
+        flags.append("url")
+        score += URL_WEIGHT
+    if PHONE_PATTERN.search(normalized):
+        flags.append("phone")
+        score += PHONE_WEIGHT
+    return min(score, MAX_SCORE), flags
+
+
+def build_matcher(terms: Iterable[str] | Dict[str, int] | None = None) -> TermMatcher:
+    """Compile a matcher from a term list or a term -> weight mapping (defaults to load_terms())."""
+    if terms is None:
+        terms = load_terms()
+    if not isinstance(terms, dict):
+        terms = {term: DEFAULT_TERM_WEIGHT for term in terms}
+    return TermMatcher(terms)
+
+
+# Compiled once per process
+term_matcher = build_matcher()
+
+# Reviews scoring strictly below this are approved without a moderator (-1 disables auto-approval)
+AUTO_APPROVE_BELOW = int(os.getenv("REVIEW_AUTO_APPROVE_BELOW", "-1"))
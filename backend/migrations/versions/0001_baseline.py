@@ -0,0 +1,151 @@
+"""Baseline schema (tables as created by create_all before migrations were introduced)
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases created by create_all before Alembic already have this schema: adopt them as-is
+    if sa.inspect(op.get_bind()).has_table("users"):
+        return
+
+    op.create_table('categories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('origin', sa.String(length=20), nullable=True),
+        sa.Column('active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_categories_id'), 'categories', ['id'], unique=False)
+    op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('type', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('suppliers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('supplier_type', sa.String(length=20), nullable=True),
+        sa.Column('fantasy_name', sa.String(length=150), nullable=False),
+        sa.Column('legal_name', sa.String(length=150), nullable=True),
+        sa.Column('cnpj', sa.String(length=18), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('address', sa.String(length=255), nullable=True),
+        sa.Column('zip_code', sa.String(length=10), nullable=True),
+        sa.Column('city', sa.String(length=100), nullable=False),
+        sa.Column('state', sa.String(length=100), nullable=False),
+        sa.Column('price_range', sa.String(length=100), nullable=True),
+        sa.Column('phone', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('instagram_url', sa.String(length=255), nullable=True),
+        sa.Column('whatsapp_url', sa.String(length=255), nullable=True),
+        sa.Column('site_url', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+    )
+    op.create_index('idx_suppliers_category', 'suppliers', ['category_id'], unique=False)
+    op.create_index('idx_suppliers_city', 'suppliers', ['city'], unique=False)
+    op.create_index('idx_suppliers_city_state', 'suppliers', ['city', 'state'], unique=False)
+    op.create_index('idx_suppliers_state', 'suppliers', ['state'], unique=False)
+    op.create_index('idx_suppliers_status', 'suppliers', ['status'], unique=False)
+    op.create_index(op.f('ix_suppliers_id'), 'suppliers', ['id'], unique=False)
+    op.create_table('contact_forms',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('supplier_id', sa.Integer(), nullable=False),
+        sa.Column('questions_json', sa.Text(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['supplier_id'], ['suppliers.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('supplier_id')
+    )
+    op.create_index(op.f('ix_contact_forms_id'), 'contact_forms', ['id'], unique=False)
+    op.create_table('media_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('supplier_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('url', sa.String(length=255), nullable=False),
+        sa.Column('upload_date', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['supplier_id'], ['suppliers.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_media_items_id'), 'media_items', ['id'], unique=False)
+    op.create_table('reviews',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('supplier_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['supplier_id'], ['suppliers.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'supplier_id', name='uq_user_supplier_review')
+    )
+    op.create_index('idx_reviews_status', 'reviews', ['status'], unique=False)
+    op.create_index('idx_reviews_supplier', 'reviews', ['supplier_id'], unique=False)
+    op.create_index('idx_reviews_supplier_status', 'reviews', ['supplier_id', 'status'], unique=False)
+    op.create_index(op.f('ix_reviews_id'), 'reviews', ['id'], unique=False)
+    op.create_table('contact_form_submissions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('contact_form_id', sa.Integer(), nullable=False),
+        sa.Column('answers_json', sa.Text(), nullable=False),
+        sa.Column('submitter_name', sa.String(length=120), nullable=True),
+        sa.Column('submitter_email', sa.String(length=120), nullable=True),
+        sa.Column('submitter_phone', sa.String(length=50), nullable=True),
+        sa.Column('read', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['contact_form_id'], ['contact_forms.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_contact_form_submissions_id'), 'contact_form_submissions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_contact_form_submissions_id'), table_name='contact_form_submissions')
+    op.drop_table('contact_form_submissions')
+    op.drop_index(op.f('ix_reviews_id'), table_name='reviews')
+    op.drop_index('idx_reviews_supplier_status', table_name='reviews')
+    op.drop_index('idx_reviews_supplier', table_name='reviews')
+    op.drop_index('idx_reviews_status', table_name='reviews')
+    op.drop_table('reviews')
+    op.drop_index(op.f('ix_media_items_id'), table_name='media_items')
+    op.drop_table('media_items')
+    op.drop_index(op.f('ix_contact_forms_id'), table_name='contact_forms')
+    op.drop_table('contact_forms')
+    op.drop_index(op.f('ix_suppliers_id'), table_name='suppliers')
+    op.drop_index('idx_suppliers_status', table_name='suppliers')
+    op.drop_index('idx_suppliers_state', table_name='suppliers')
+    op.drop_index('idx_suppliers_city_state', table_name='suppliers')
+    op.drop_index('idx_suppliers_city', table_name='suppliers')
+    op.drop_index('idx_suppliers_category', table_name='suppliers')
+    op.drop_table('suppliers')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_categories_id'), table_name='categories')
+    op.drop_table('categories')
@@ -0,0 +1,124 @@
+"""Typed per-question answers for contact form submissions
+
+One row per answered question (one per selected option for multiselect), so
+submissions can be filtered and sorted in SQL. Built for existing submissions.
+
+Revision ID: 0002_typed_answers
+Revises: 0001_baseline
+Create Date: 2026-10-19
+"""
+import json
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_typed_answers"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('contact_form_answers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('submission_id', sa.Integer(), nullable=False),
+        sa.Column('question', sa.String(length=255), nullable=False),
+        sa.Column('question_type', sa.String(length=20), nullable=False),
+        sa.Column('value_text', sa.Text(), nullable=True),
+        sa.Column('value_number', sa.Float(), nullable=True),
+        sa.Column('value_date', sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(['submission_id'], ['contact_form_submissions.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_answers_question_date', 'contact_form_answers', ['question', 'value_date'], unique=False)
+    op.create_index('idx_answers_question_number', 'contact_form_answers', ['question', 'value_number'], unique=False)
+    op.create_index('idx_answers_question_text', 'contact_form_answers', ['question', 'value_text'], unique=False)
+    op.create_index('idx_answers_submission', 'contact_form_answers', ['submission_id'], unique=False)
+    op.create_index(op.f('ix_contact_form_answers_id'), 'contact_form_answers', ['id'], unique=False)
+    _backfill_answer_rows()
+
+
+def _question_meta(question):
+    if isinstance(question, dict):
+        return question
+    return {"question": str(question), "type": "text"}
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _parse_number(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _answer_rows(submission_id, questions, answers):
+    """
+    Typed answer rows for one submission, as the application built them when this
+    revision was written (kept here so the migration doesn't change with the app code).
+    """
+    rows = []
+    for idx, raw_question in enumerate(questions):
+        question = _question_meta(raw_question)
+        question_text = question.get("question", f"Question {idx+1}")
+        answer = answers.get(str(idx))
+        if answer is None:
+            answer = answers.get(question_text)
+        if answer is None or (isinstance(answer, str) and not answer.strip()):
+            continue
+
+        question_type = question.get("type") or "text"
+        for value in answer if isinstance(answer, list) else [answer]:
+            rows.append({
+                "submission_id": submission_id,
+                "question": question_text[:255],
+                "question_type": question_type,
+                "value_text": str(value),
+                "value_number": _parse_number(value) if question_type == "number" else None,
+                "value_date": _parse_date(value) if question_type in ["date", "datetime"] else None,
+            })
+    return rows
+
+
+def _backfill_answer_rows() -> None:
+    """Typed answers for existing submissions."""
+    bind = op.get_bind()
+    answers_table = sa.table(
+        'contact_form_answers',
+        sa.column('submission_id', sa.Integer), sa.column('question', sa.String),
+        sa.column('question_type', sa.String), sa.column('value_text', sa.Text),
+        sa.column('value_number', sa.Float), sa.column('value_date', sa.Date),
+    )
+    form_questions = {
+        form_id: json.loads(questions_json or "[]")
+        for form_id, questions_json in bind.execute(sa.text("SELECT id, questions_json FROM contact_forms"))
+    }
+    rows = []
+    submissions = bind.execute(sa.text("SELECT id, contact_form_id, answers_json FROM contact_form_submissions"))
+    for submission_id, form_id, answers_json in submissions:
+        try:
+            answers = json.loads(answers_json)
+        except ValueError:
+            continue
+        if not isinstance(answers, dict):
+            continue
+        rows.extend(_answer_rows(submission_id, form_questions.get(form_id, []), answers))
+    if rows:
+        op.bulk_insert(answers_table, rows)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_contact_form_answers_id'), table_name='contact_form_answers')
+    op.drop_index('idx_answers_submission', table_name='contact_form_answers')
+    op.drop_index('idx_answers_question_text', table_name='contact_form_answers')
+    op.drop_index('idx_answers_question_number', table_name='contact_form_answers')
+    op.drop_index('idx_answers_question_date', table_name='contact_form_answers')
+    op.drop_table('contact_form_answers')
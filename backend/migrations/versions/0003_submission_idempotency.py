@@ -0,0 +1,29 @@
+"""Idempotency key on contact form submissions
+
+Dedupes client retries and write-behind queue replays.
+
+Revision ID: 0003_submission_idempotency
+Revises: 0002_typed_answers
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_submission_idempotency"
+down_revision = "0002_typed_answers"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Batch mode: SQLite recreates the table for the constraint; a plain ALTER elsewhere
+    with op.batch_alter_table('contact_form_submissions') as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_contact_form_submissions_idempotency_key', ['idempotency_key'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('contact_form_submissions') as batch_op:
+        batch_op.drop_constraint('uq_contact_form_submissions_idempotency_key', type_='unique')
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,52 @@
+"""Shared versioned contact form templates
+
+Existing forms keep their own questions_json (they count as customized;
+resetting a form points it at the shared template).
+
+Revision ID: 0004_contact_form_templates
+Revises: 0003_submission_idempotency
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_contact_form_templates"
+down_revision = "0003_submission_idempotency"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('contact_form_templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('questions_json', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name', 'version', name='uq_template_name_version')
+    )
+    op.create_index(op.f('ix_contact_form_templates_id'), 'contact_form_templates', ['id'], unique=False)
+
+    with op.batch_alter_table('contact_forms') as batch_op:
+        batch_op.add_column(sa.Column('template_id', sa.Integer(), nullable=True))
+        batch_op.alter_column('questions_json', existing_type=sa.Text(), nullable=True)
+        batch_op.create_foreign_key('fk_contact_forms_template_id', 'contact_form_templates', ['template_id'], ['id'])
+
+
+def downgrade() -> None:
+    # Forms pointing at a shared template get their own copy back before the column goes away
+    op.execute("""
+        UPDATE contact_forms SET questions_json = (
+            SELECT t.questions_json FROM contact_form_templates t WHERE t.id = contact_forms.template_id
+        )
+        WHERE questions_json IS NULL
+    """)
+    with op.batch_alter_table('contact_forms') as batch_op:
+        batch_op.drop_constraint('fk_contact_forms_template_id', type_='foreignkey')
+        batch_op.alter_column('questions_json', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('template_id')
+
+    op.drop_index(op.f('ix_contact_form_templates_id'), table_name='contact_form_templates')
+    op.drop_table('contact_form_templates')
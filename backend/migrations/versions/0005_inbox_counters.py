@@ -0,0 +1,48 @@
+"""Denormalized inbox counters on contact forms
+
+submissions_count/unread_count, recomputed for existing forms, plus the inbox indexes.
+
+Revision ID: 0005_inbox_counters
+Revises: 0004_contact_form_templates
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_inbox_counters"
+down_revision = "0004_contact_form_templates"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('contact_forms') as batch_op:
+        batch_op.add_column(sa.Column('submissions_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('contact_form_submissions') as batch_op:
+        batch_op.create_index('idx_submissions_form_created', ['contact_form_id', 'created_at'], unique=False)
+        batch_op.create_index('idx_submissions_form_read_created', ['contact_form_id', 'read', 'created_at'], unique=False)
+
+    op.execute("""
+        UPDATE contact_forms SET
+            submissions_count = (
+                SELECT count(*) FROM contact_form_submissions s
+                WHERE s.contact_form_id = contact_forms.id
+            ),
+            unread_count = (
+                SELECT count(*) FROM contact_form_submissions s
+                WHERE s.contact_form_id = contact_forms.id AND (s.read IS NULL OR s.read = false)
+            )
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('contact_form_submissions') as batch_op:
+        batch_op.drop_index('idx_submissions_form_read_created')
+        batch_op.drop_index('idx_submissions_form_created')
+
+    with op.batch_alter_table('contact_forms') as batch_op:
+        batch_op.drop_column('unread_count')
+        batch_op.drop_column('submissions_count')
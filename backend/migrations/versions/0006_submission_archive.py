@@ -0,0 +1,26 @@
+"""Archived flag on contact form submissions
+
+Archived submissions are hidden from the inbox.
+
+Revision ID: 0006_submission_archive
+Revises: 0005_inbox_counters
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_submission_archive"
+down_revision = "0005_inbox_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('contact_form_submissions') as batch_op:
+        batch_op.add_column(sa.Column('archived', sa.Boolean(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('contact_form_submissions') as batch_op:
+        batch_op.drop_column('archived')
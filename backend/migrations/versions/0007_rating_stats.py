@@ -0,0 +1,47 @@
+"""Per-supplier rating histograms
+
+Maintained incrementally by moderation; recomputed here from approved reviews.
+
+Revision ID: 0007_rating_stats
+Revises: 0006_submission_archive
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_rating_stats"
+down_revision = "0006_submission_archive"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('supplier_rating_stats',
+        sa.Column('supplier_id', sa.Integer(), nullable=False),
+        sa.Column('rating_1', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_2', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_3', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_4', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_5', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['supplier_id'], ['suppliers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('supplier_id')
+    )
+    op.execute("""
+        INSERT INTO supplier_rating_stats (supplier_id, rating_1, rating_2, rating_3, rating_4, rating_5, total)
+        SELECT supplier_id,
+               sum(CASE WHEN rating = 1 THEN 1 ELSE 0 END),
+               sum(CASE WHEN rating = 2 THEN 1 ELSE 0 END),
+               sum(CASE WHEN rating = 3 THEN 1 ELSE 0 END),
+               sum(CASE WHEN rating = 4 THEN 1 ELSE 0 END),
+               sum(CASE WHEN rating = 5 THEN 1 ELSE 0 END),
+               count(*)
+        FROM reviews
+        WHERE status = 'approved'
+        GROUP BY supplier_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('supplier_rating_stats')
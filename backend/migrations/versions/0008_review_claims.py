@@ -0,0 +1,32 @@
+"""Lease-based claims for review moderation
+
+claimed_by/claim_expires_at, plus the oldest-pending-first queue index.
+
+Revision ID: 0008_review_claims
+Revises: 0007_rating_stats
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_review_claims"
+down_revision = "0007_rating_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('reviews') as batch_op:
+        batch_op.add_column(sa.Column('claimed_by', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('claim_expires_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_foreign_key('fk_reviews_claimed_by', 'users', ['claimed_by'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('idx_reviews_status_created', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reviews') as batch_op:
+        batch_op.drop_index('idx_reviews_status_created')
+        batch_op.drop_constraint('fk_reviews_claimed_by', type_='foreignkey')
+        batch_op.drop_column('claim_expires_at')
+        batch_op.drop_column('claimed_by')
@@ -0,0 +1,30 @@
+"""Risk score for review pre-screening
+
+risk_score/risk_flags, plus the riskiest-first queue index. Existing reviews score 0.
+
+Revision ID: 0009_review_risk
+Revises: 0008_review_claims
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009_review_risk"
+down_revision = "0008_review_claims"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('reviews') as batch_op:
+        batch_op.add_column(sa.Column('risk_score', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('risk_flags', sa.String(length=255), nullable=True))
+        batch_op.create_index('idx_reviews_status_risk', ['status', 'risk_score'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reviews') as batch_op:
+        batch_op.drop_index('idx_reviews_status_risk')
+        batch_op.drop_column('risk_flags')
+        batch_op.drop_column('risk_score')
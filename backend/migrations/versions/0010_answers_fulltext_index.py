@@ -0,0 +1,34 @@
+"""Full-text index on contact form answers (PostgreSQL)
+
+GIN index on to_tsvector('simple', value_text), used by the submission search.
+Other databases search answers with ILIKE and get no index here; the index is
+not declared on the model, as SQLite cannot create it.
+
+Revision ID: 0010_answers_fulltext_index
+Revises: 0009_review_risk
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010_answers_fulltext_index"
+down_revision = "0009_review_risk"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.create_index(
+        'idx_answers_value_text_fts', 'contact_form_answers',
+        [sa.text("to_tsvector('simple', value_text)")],
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index('idx_answers_value_text_fts', table_name='contact_form_answers')
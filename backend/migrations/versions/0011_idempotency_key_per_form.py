@@ -0,0 +1,32 @@
+"""Scope submission idempotency keys to their form
+
+Clients choose the Idempotency-Key: a key unique across every form let one
+form's replay collide with (and look up) another form's submission.
+
+Revision ID: 0011_idempotency_key_per_form
+Revises: 0010_answers_fulltext_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011_idempotency_key_per_form"
+down_revision = "0010_answers_fulltext_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('contact_form_submissions') as batch_op:
+        batch_op.drop_constraint('uq_contact_form_submissions_idempotency_key', type_='unique')
+        batch_op.create_unique_constraint(
+            'uq_submissions_form_idempotency_key', ['contact_form_id', 'idempotency_key']
+        )
+
+
+def downgrade() -> None:
+    # Fails if two forms share a key by then, as the old constraint would not hold
+    with op.batch_alter_table('contact_form_submissions') as batch_op:
+        batch_op.drop_constraint('uq_submissions_form_idempotency_key', type_='unique')
+        batch_op.create_unique_constraint('uq_contact_form_submissions_idempotency_key', ['idempotency_key'])
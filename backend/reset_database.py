@@ -97,12 +97,12 @@ def reset_database():
         
         # Recriar tabelas e popular com seeds
         print("\n🌱 Recriando tabelas e populando com dados de seed...")
-        from app.database import Base, engine, SessionLocal
-        from app.models import user_model, supplier_model, category_model, review_model, media_model, contact_form_model
+        from alembic import command
+        from alembic.config import Config
         
-        # Criar todas as tabelas
+        # Criar todas as tabelas (migrations do Alembic)
         print("📦 Criando tabelas...")
-        Base.metadata.create_all(bind=engine)
+        command.upgrade(Config(os.path.join(os.path.dirname(__file__), "alembic.ini")), "head")
         print("✅ Tabelas criadas!")
         
         # Popular com seeds
@@ -91,6 +91,7 @@ ENVIRONMENT=development
 # Popular banco de dados
 Write-Host "  Criando banco de dados e populando com dados de teste..." -ForegroundColor Yellow
 Set-Location backend
+& $venvPython -m alembic upgrade head
 & $venvPython -m app.seeds.seed_all
 Set-Location ..
 
@@ -67,6 +67,7 @@ fi
 # Popular banco de dados
 echo "  Criando banco de dados e populando com dados de teste..."
 cd backend
+alembic upgrade head
 python -m app.seeds.seed_all
 cd ..
 
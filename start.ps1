@@ -13,7 +13,7 @@ if (-not (Test-Path "backend\venv")) {
 
 # Iniciar backend em novo terminal
 Write-Host "📡 Iniciando Backend (porta 8000)..." -ForegroundColor Yellow
-Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$PWD\backend'; .\venv\Scripts\Activate.ps1; Write-Host '🚀 Backend iniciando...' -ForegroundColor Green; uvicorn app.main:app --reload --host 127.0.0.1 --port 8000"
+Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$PWD\backend'; .\venv\Scripts\Activate.ps1; alembic upgrade head; Write-Host '🚀 Backend iniciando...' -ForegroundColor Green; uvicorn app.main:app --reload --host 127.0.0.1 --port 8000"
 
 # Aguardar um pouco para o backend iniciar
 Start-Sleep -Seconds 3
@@ -26,6 +26,7 @@ trap cleanup SIGINT SIGTERM
 echo "📡 Iniciando Backend (porta 8000)..."
 cd backend
 source venv/bin/activate
+alembic upgrade head
 uvicorn app.main:app --reload --host 127.0.0.1 --port 8000 &
 BACKEND_PID=$!
 cd ..